@@ -0,0 +1,93 @@
+"""
+timings of GitCommitSequenceCommand for 10, 1k and 50k files
+committed to a repository with local bare remote
+
+run from repository root:
+    python -m benchmarks.commit_sequence [files ...]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from git.engine import run
+from git.commands import GitCommitSequenceCommand, GitPushCommand, \
+    FolderCommand
+from git.exceptions import GitException
+
+LEGACY_MAX_FILES = 1000  # per-file process chain is too slow above
+
+
+def git(cwd: str, *args: str):
+    subprocess.run(("git",) + args, cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def make_repository(root: str, files: int) -> str:
+    """
+    create repository with pushed initial commit, bare remote
+    and number of new untracked files
+    :param root: temporary directory
+    :param files: number of files to create
+    :return: path to working tree
+    """
+    remote = os.path.join(root, "remote.git")
+    work = os.path.join(root, "work")
+    git(root, "init", "-q", "--bare", remote)
+    git(root, "init", "-q", work)
+    git(work, "config", "user.email", "bench@example.com")
+    git(work, "config", "user.name", "bench")
+    git(work, "config", "gc.auto", "0")  # no background gc after commit
+    git(remote, "config", "gc.auto", "0")
+    git(work, "commit", "-q", "--allow-empty", "-m", "initial")
+    git(work, "remote", "add", "origin", remote)
+    git(work, "push", "-q", "-u", "origin", "HEAD")
+    for i in range(files):
+        directory = os.path.join(work, "dir {}".format(i // 1000))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "file {}.txt".format(i)), "w") as f:
+            f.write(str(i))
+    return work
+
+
+def paths(work: str):
+    return [
+        os.path.relpath(os.path.join(directory, name), work)
+        for directory, _, names in os.walk(work)
+        if ".git" not in directory.split(os.sep)
+        for name in names
+    ]
+
+
+def timed(command) -> float:
+    start = time.perf_counter()
+    run(command)
+    elapsed = time.perf_counter() - start
+    if isinstance(command.result, GitException):
+        raise RuntimeError(command.result)
+    return elapsed
+
+
+def main(sizes):
+    print("{:>8}{:>12}{:>14}".format("files", "batched s", "per-file s"))
+    for files in sizes:
+        with tempfile.TemporaryDirectory() as root:
+            work = make_repository(root, files)
+            batched = timed(GitCommitSequenceCommand(
+                work, paths(work), [], "batched")) \
+                + timed(GitPushCommand(work))
+
+        legacy = float("nan")
+        if files <= LEGACY_MAX_FILES:
+            with tempfile.TemporaryDirectory() as root:
+                work = make_repository(root, files)
+                legacy_chain = ['git add "{}"'.format(path)
+                                for path in paths(work)]
+                legacy_chain += ['git commit -q -m legacy', "git push -q"]
+                legacy = timed(FolderCommand(work, legacy_chain))
+        print("{:>8}{:>12.2f}{:>14.2f}".format(files, batched, legacy))
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [10, 1000, 50000])
@@ -0,0 +1,90 @@
+"""
+memory benchmark of status snapshot representations:
+PQFileModel objects (twice, as speaker and list controller kept them)
+against FileTable columns, every representation is built in its own
+process and measured as growth of resident memory
+
+run from repository root:
+    python -m benchmarks.file_table [entries]
+"""
+import gc
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.status_parse import make_output
+from git.porcelain import parse_porcelain_v2
+
+KINDS = ("PQFileModel", "FileTable")
+
+
+def resident() -> int:
+    """
+    :return: resident memory of the process in bytes, 0 if unknown
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def build(kind: str, entries):
+    if kind == "FileTable":
+        from model.file_table import FileTable
+        return FileTable.from_entries(entries)
+    from PyQt5.QtCore import QCoreApplication
+    from model.file import PQFileModel
+    build.app = QCoreApplication(sys.argv)
+    files = [
+        PQFileModel(entry.staged is not None, entry.staged or entry.unstaged,
+                    entry.path, entry.staged, entry.unstaged,
+                    entry.untracked, entry.orig_path)
+        for entry in entries
+    ]
+    return files, [file.copy() for file in files]
+
+
+def child(kind: str, entries: int):
+    """
+    print resident and python heap growth and build time
+    """
+    _, parsed = parse_porcelain_v2(make_output(entries))
+    if kind != "FileTable":
+        from PyQt5.QtCore import QCoreApplication  # load library upfront
+    start = time.perf_counter()
+    build(kind, parsed)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    before = resident()
+    tracemalloc.start()
+    snapshot = build(kind, parsed)
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    gc.collect()
+    print(resident() - before, heap, seconds)
+    del snapshot
+
+
+def main(entries: int):
+    print("entries: {}".format(entries))
+    print("{:<14}{:>14}{:>14}{:>12}".format(
+        "snapshot", "resident MB", "py heap MB", "build ms"))
+    for kind in KINDS:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.file_table", "--child",
+             kind, str(entries)],
+            check=True, stdout=subprocess.PIPE, universal_newlines=True
+        ).stdout.split()
+        rss, heap, seconds = int(output[0]), int(output[1]), float(output[2])
+        print("{:<14}{:>14.1f}{:>14.1f}{:>12.1f}".format(
+            kind, rss / 2 ** 20, heap / 2 ** 20, seconds * 1000))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,103 @@
+"""
+deterministic generator of local git repositories for benchmarks:
+committed files in nested directories, modified and renamed files
+and untracked directories, each repository has bare remote
+
+run from repository root to keep a repository for manual testing:
+    python -m benchmarks.generator SCENARIO DIRECTORY
+"""
+import os
+import subprocess
+import sys
+from typing import NamedTuple
+
+
+class Scenario(NamedTuple):
+    """
+    Shape of generated repository
+    """
+    files: int  # committed files
+    width: int = 100  # files per directory
+    depth: int = 1  # directory levels above files
+    modified: int = 10  # every n-th committed file is modified, 0 for none
+    renamed: int = 0  # committed files moved to other directory
+    untracked: int = 0  # new files in one untracked directory
+
+
+SCENARIOS = {
+    "1k": Scenario(1000),
+    "10k": Scenario(10000),
+    "100k": Scenario(100000),
+    "deep": Scenario(5000, width=10, depth=12),
+    "renames": Scenario(10000, renamed=2000),
+    "untracked": Scenario(1000, untracked=20000),
+}
+
+
+def git(cwd: str, *args: str):
+    subprocess.run(("git",) + args, cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def file_path(scenario: Scenario, i: int) -> str:
+    """
+    :return: relative path of i-th committed file
+    """
+    directory = i // scenario.width
+    parts = ["level {}".format(level) for level in range(scenario.depth - 1)]
+    parts += ["dir {}".format(directory), "file {}.txt".format(i)]
+    return os.path.join(*parts)
+
+
+def write(path: str, text: str, mode: str = "w"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode) as f:
+        f.write(text)
+
+
+def generate(root: str, scenario: Scenario) -> str:
+    """
+    create repository in root, repeated calls make identical trees
+    :param root: empty directory
+    :param scenario: shape of repository
+    :return: path to working tree
+    """
+    remote = os.path.join(root, "remote.git")
+    work = os.path.join(root, "work")
+    git(root, "init", "-q", "--bare", remote)
+    git(root, "init", "-q", work)
+    for repository in (work, remote):
+        git(repository, "config", "gc.auto", "0")  # no background gc
+    git(work, "config", "user.email", "bench@example.com")
+    git(work, "config", "user.name", "bench")
+    git(work, "remote", "add", "origin", remote)
+
+    for i in range(scenario.files):
+        write(os.path.join(work, file_path(scenario, i)),
+              "line {}\n".format(i) * 4)
+    git(work, "add", "-A")
+    git(work, "commit", "-q", "-m", "initial")
+    git(work, "push", "-q", "-u", "origin", "HEAD")
+
+    for i in range(scenario.renamed):
+        # renamed files are staged, so git pairs them with removed ones
+        source = file_path(scenario, scenario.files - 1 - i)
+        target = os.path.join("moved", source)
+        os.makedirs(os.path.dirname(os.path.join(work, target)),
+                    exist_ok=True)
+        os.rename(os.path.join(work, source), os.path.join(work, target))
+    if scenario.renamed:
+        git(work, "add", "-A")
+    if scenario.modified:
+        for i in range(0, scenario.files - scenario.renamed,
+                       scenario.modified):
+            write(os.path.join(work, file_path(scenario, i)),
+                  "changed\n", "a")
+    for i in range(scenario.untracked):
+        write(os.path.join(work, "build", "part {}".format(i // 1000),
+                           "object {}.o".format(i)), "object\n")
+    return work
+
+
+if __name__ == '__main__':
+    print(generate(sys.argv[2], SCENARIOS[sys.argv[1]]))
@@ -0,0 +1,157 @@
+"""
+startup benchmark: time from interpreter start to the first paint
+of PQGitHelper window and to its subcontrollers being ready,
+with precompiled gui modules and with runtime .ui parsing.
+Time to useful content: to the first files shown and to fresh status
+of generated repository, opened at once when window is ready
+and restored from saved status snapshot
+
+run from repository root after 'python -m gui.build':
+    python -m benchmarks.startup [runs] [scenario]
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.generator import SCENARIOS, generate
+from git.engine import GitEngine
+from git.snapshot import Snapshot, save_snapshot
+
+CHILD = """
+import time
+start = time.perf_counter()
+import sys
+import config
+config.GUI_PRECOMPILED = {precompiled}
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+import main
+marks = {{}}
+
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and "paint" not in marks:
+            marks["paint"] = time.perf_counter() - start
+        return False
+
+
+def ready():
+    marks["ready"] = time.perf_counter() - start
+    app.quit()
+
+
+first_paint = FirstPaint()
+app.installEventFilter(first_paint)
+window = main.PQGitHelper()
+window.ready.connect(ready)
+app.exec_()
+print(marks["paint"], marks["ready"])
+"""
+
+
+CONTENT_CHILD = """
+import time
+start = time.perf_counter()
+import sys
+import config
+config.STATUS_SNAPSHOT = {snapshot!r}
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+import main
+marks = {{}}
+
+
+def files_changed(delta):
+    if len(delta.table) and "content" not in marks:
+        marks["content"] = time.perf_counter() - start
+
+
+def traced(trace):
+    if trace.kind.endswith("StatusCommand"):
+        marks["fresh"] = time.perf_counter() - start
+        app.quit()
+
+
+def ready():
+    window.git.files_changed.connect(files_changed)
+    window.git.traced.connect(traced)
+    if len(window.list.model):  # restored from snapshot
+        marks["content"] = time.perf_counter() - start
+    if not window.git.path:
+        window.open_repository({path!r})
+
+
+window = main.PQGitHelper()
+window.ready.connect(ready)
+app.exec_()
+print(marks["content"], marks["fresh"])
+"""
+
+
+def measure(precompiled: bool, runs: int):
+    """
+    :return: median seconds to first paint and to ready window
+    """
+    environment = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    paints, readies = [], []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD.format(precompiled=precompiled)],
+            env=environment, check=True, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, universal_newlines=True
+        ).stdout.split()
+        paints.append(float(output[-2]))
+        readies.append(float(output[-1]))
+    return statistics.median(paints), statistics.median(readies)
+
+
+def measure_content(path: str, snapshot: str, runs: int):
+    """
+    :param path: repository opened by window
+    :param snapshot: snapshot file restored on start, '' for none
+    :return: median seconds to the first files shown and to fresh status
+    """
+    environment = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    contents, fresh = [], []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c",
+             CONTENT_CHILD.format(snapshot=snapshot, path=path)],
+            env=environment, check=True, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, universal_newlines=True
+        ).stdout.split()
+        contents.append(float(output[-2]))
+        fresh.append(float(output[-1]))
+    return statistics.median(contents), statistics.median(fresh)
+
+
+def main(runs: int, scenario: str):
+    print("{:<14}{:>16}{:>12}".format("gui", "first paint ms", "ready ms"))
+    for name, precompiled in (("precompiled", True), (".ui parsing", False)):
+        paint, ready = measure(precompiled, runs)
+        print("{:<14}{:>16.1f}{:>12.1f}".format(
+            name, paint * 1000, ready * 1000))
+
+    with tempfile.TemporaryDirectory() as root:
+        work = generate(root, SCENARIOS[scenario])
+        engine = GitEngine(work)
+        asyncio.run(engine.status())
+        snapshot = os.path.join(root, "snapshot.bin")
+        save_snapshot(snapshot, Snapshot(work, engine.branch, engine.files))
+        print("\n{} ({} changed files)".format(scenario, len(engine.files)))
+        print("{:<14}{:>16}{:>12}".format("start", "first files ms",
+                                          "fresh ms"))
+        for name, file in (("empty", ""), ("snapshot", snapshot)):
+            content, fresh = measure_content(work, file, runs)
+            print("{:<14}{:>16.1f}{:>12.1f}".format(
+                name, content * 1000, fresh * 1000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+         sys.argv[2] if len(sys.argv) > 2 else "10k")
@@ -0,0 +1,81 @@
+"""
+parse-throughput benchmark for 'git status --porcelain=v2 -z' output
+
+run from repository root:
+    python -m benchmarks.status_parse [entries]
+"""
+import sys
+import time
+
+from git.commands import GitStatusCommand
+from git.porcelain import parse_porcelain_v2
+
+ZERO_OID = "0" * 40
+OID = "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+
+
+def make_output(entries: int) -> bytes:
+    """
+    build synthetic porcelain v2 output with a mix of record types,
+    paths with spaces and non-ascii characters
+    :param entries: number of path records
+    :return: raw output bytes
+    """
+    records = [
+        "# branch.oid " + OID,
+        "# branch.head master",
+        "# branch.upstream origin/master",
+        "# branch.ab +1 -2",
+    ]
+    for i in range(entries):
+        path = "src/dir {}/файл_{}.py".format(i % 100, i)
+        kind = i % 4
+        if kind == 0:
+            records.append(
+                "1 .M N... 100644 100644 100644 {0} {0} {1}".format(OID, path)
+            )
+        elif kind == 1:
+            records.append(
+                "1 A. N... 000000 100644 100644 {0} {1} {2}".format(
+                    ZERO_OID, OID, path)
+            )
+        elif kind == 2:
+            records.append(
+                "2 R. N... 100644 100644 100644 {0} {0} R100 {1}".format(
+                    OID, path)
+            )
+            records.append(path + ".orig")
+        else:
+            records.append("? " + path)
+    return ("\0".join(records) + "\0").encode("utf-8")
+
+
+def measure(function, *args, repeat: int = 3) -> float:
+    """
+    :return: best wall time of function call in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(entries: int):
+    data = make_output(entries)
+    command = GitStatusCommand("C:/repository")
+
+    parse_time = measure(parse_porcelain_v2, data)
+    map_time = measure(command.map_result, data, "")
+
+    print("entries: {}, output size: {:.1f} MB".format(
+        entries, len(data) / 2 ** 20))
+    for name, seconds in (("parse", parse_time), ("map_result", map_time)):
+        print("{:<12}{:>10.1f} ms{:>14,.0f} entries/s{:>10.1f} MB/s".format(
+            name, seconds * 1000, entries / seconds,
+            len(data) / 2 ** 20 / seconds))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
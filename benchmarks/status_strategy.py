@@ -0,0 +1,87 @@
+"""
+latency of status strategies for slow repositories: untracked files
+listed one by one, by directories, skipped, listed with untracked cache
+and status of one changed directory
+
+run from repository root:
+    python -m benchmarks.status_strategy [--repeat N] [SCENARIO ...]
+"""
+import argparse
+import subprocess
+import tempfile
+import time
+from typing import List, Optional
+
+from benchmarks.generator import SCENARIOS, file_path, generate
+from git.commands import EnableFastStatusCommand, GitStatusCommand
+from git.engine import run
+from git.exceptions import GitException
+from git.strategy import FAST_STATUS_CONFIG, UntrackedMode
+
+
+def best(args: List[str], cwd: str, repeat: int) -> float:
+    """
+    :return: best wall time of git call in seconds
+    """
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=cwd, check=True, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def status_args(work: str, untracked: UntrackedMode,
+                directories: Optional[List[str]] = None) -> List[str]:
+    return GitStatusCommand(work, directories, untracked=untracked).args
+
+
+def measure(name: str, repeat: int):
+    scenario = SCENARIOS[name]
+    with tempfile.TemporaryDirectory() as root:
+        work = generate(root, scenario)
+        every_file = status_args(work, UntrackedMode.configured)
+        every_file.insert(every_file.index("status") + 1,
+                          "--untracked-files=all")
+        directory = file_path(scenario, 0).rsplit("/", 1)[0] + "/"
+        rows = [
+            ("untracked files", best(every_file, work, repeat)),
+            ("untracked directories", best(
+                status_args(work, UntrackedMode.normal), work, repeat)),
+            ("untracked skipped", best(
+                status_args(work, UntrackedMode.none), work, repeat)),
+            ("changed directory", best(
+                status_args(work, UntrackedMode.normal, [directory]),
+                work, repeat)),
+        ]
+        command = EnableFastStatusCommand(work, FAST_STATUS_CONFIG)
+        if isinstance(run(command), GitException):
+            raise RuntimeError(command.result)
+        rows.insert(2, ("untracked cache", best(
+            status_args(work, UntrackedMode.normal), work, repeat)))
+
+    full = rows[0][1]
+    print("{} ({} files, {} untracked)".format(
+        name, scenario.files, scenario.untracked))
+    for strategy, seconds in rows:
+        print("  {:<24}{:>10.1f} ms{:>10.0%} saved".format(
+            strategy, seconds * 1000, 1 - seconds / full))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                        default=["untracked", "10k"])
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+    for name in options.scenarios:
+        if name not in SCENARIOS:
+            parser.error("unknown scenario {}, choose from {}".format(
+                name, ", ".join(SCENARIOS)))
+    for name in options.scenarios:
+        measure(name, options.repeat)
+
+
+if __name__ == '__main__':
+    main()
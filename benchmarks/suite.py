@@ -0,0 +1,193 @@
+"""
+benchmark suite: stages of status refresh and commit, measured end to end
+on generated repositories of benchmarks.generator scenarios.
+Results are compared with JSON baseline, stages slower than baseline
+by more than tolerance are reported as regressions
+
+run from repository root, offline, Qt uses offscreen platform:
+    python -m benchmarks.suite [--scenario NAME ...] [--repeat N]
+                               [--save FILE] [--compare FILE]
+                               [--tolerance FRACTION]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.generator import SCENARIOS, generate
+from git.commands import GitCommitSequenceCommand, GitStatusCommand
+from git.engine import execute, spawn
+from git.exceptions import GitException
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # Qt is imported later
+
+STAGES = ("spawn", "git_status", "map_result", "file_models", "populate",
+          "status_command", "commit")
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "baselines", "linux.json")
+TOLERANCE = 0.25  # allowed slowdown against baseline
+NOISE = 0.005  # seconds, differences below are not regressions
+
+
+def best(function: Callable[[], None], repeat: int) -> float:
+    """
+    :return: best wall time of function call in seconds
+    """
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+async def spawn_round_trip():
+    process = await spawn(["git", "--version"], None)
+    await process.communicate()
+
+
+def status_output(work: str) -> bytes:
+    return subprocess.run(
+        GitStatusCommand(work).args, cwd=work, check=True,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+
+
+def file_models(entries) -> list:
+    """
+    :return: PQFileModel objects the way speaker made them before FileTable
+    """
+    from model.file import PQFileModel
+    return [
+        PQFileModel(entry.staged is not None, entry.staged or entry.unstaged,
+                    entry.path, entry.staged, entry.unstaged,
+                    entry.untracked, entry.orig_path)
+        for entry in entries
+    ]
+
+
+def measure(work: str, repeat: int) -> Dict[str, float]:
+    """
+    :param work: generated working tree, it is committed at the end
+    :param repeat: calls of each stage, best one is taken
+    :return: seconds by stage
+    """
+    from PyQt5.QtWidgets import QApplication
+    from controllers.file import PQFileListController
+    from git.porcelain import parse_porcelain_v2
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    result = {"spawn": best(
+        lambda: asyncio.run(spawn_round_trip()), repeat)}
+    result["git_status"] = best(lambda: status_output(work), repeat)
+    output = status_output(work)
+    command = GitStatusCommand(work)
+    result["map_result"] = best(lambda: command.map_result(output, ""),
+                                repeat)
+    table = command.map_result(output, "")
+    _, entries = parse_porcelain_v2(output)
+    result["file_models"] = best(lambda: file_models(entries), repeat)
+
+    controller = PQFileListController()
+    controller.view.show()
+
+    def populate():
+        controller.populate(table)
+        app.processEvents()  # view lays out and paints rows
+    result["populate"] = best(populate, repeat)
+    controller.view.close()
+
+    def status():
+        status_command = GitStatusCommand(work)
+        asyncio.run(execute(status_command))
+        if isinstance(status_command.result, GitException):
+            raise RuntimeError(status_command.result)
+    result["status_command"] = best(status, repeat)
+
+    commit = GitCommitSequenceCommand(
+        work, [file.path for file in table], [], "benchmark")
+    start = time.perf_counter()
+    asyncio.run(execute(commit))
+    result["commit"] = time.perf_counter() - start
+    if isinstance(commit.result, GitException):
+        raise RuntimeError(commit.result)
+    return result
+
+
+def environment() -> Dict[str, str]:
+    git_version = subprocess.run(["git", "--version"], check=True,
+                                 stdout=subprocess.PIPE,
+                                 universal_newlines=True).stdout.strip()
+    return {"python": platform.python_version(),
+            "platform": platform.platform(), "git": git_version,
+            "cpus": str(os.cpu_count())}
+
+
+def regressions(results: Dict[str, Dict[str, float]],
+                baseline: Dict[str, Dict[str, float]],
+                tolerance: float) -> List[str]:
+    """
+    :param results: seconds by stage by scenario
+    :param baseline: the same from baseline file
+    :param tolerance: allowed slowdown, 0.25 for 25%
+    :return: descriptions of stages slower than baseline
+    """
+    found = []
+    for scenario, stages in results.items():
+        for stage, seconds in stages.items():
+            before = baseline.get(scenario, {}).get(stage)
+            if before is not None and seconds > before * (1 + tolerance) \
+                    and seconds - before > NOISE:
+                found.append("{} {}: {:.1f} ms, baseline {:.1f} ms".format(
+                    scenario, stage, seconds * 1000, before * 1000))
+    return found
+
+
+def parse_arguments(arguments: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS),
+                        default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", metavar="FILE",
+                        help="write results as new baseline")
+    parser.add_argument("--compare", metavar="FILE", nargs="?",
+                        const=BASELINE, help="baseline to compare with")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    return parser.parse_args(arguments)
+
+
+def main(arguments: List[str]) -> int:
+    options = parse_arguments(arguments)
+    results = {}
+    print("{:<10}".format("ms") + "".join(
+        "{:>15}".format(stage) for stage in STAGES))
+    for name in options.scenario:
+        with tempfile.TemporaryDirectory() as root:
+            results[name] = measure(generate(root, SCENARIOS[name]),
+                                    options.repeat)
+        print("{:<10}".format(name) + "".join(
+            "{:>15.1f}".format(results[name][stage] * 1000)
+            for stage in STAGES), flush=True)
+
+    if options.save:
+        with open(options.save, "w") as f:
+            json.dump({"environment": environment(), "results": results},
+                      f, indent=2, sort_keys=True)
+            f.write("\n")
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline["results"], options.tolerance)
+        for regression in found:
+            print("regression: " + regression)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
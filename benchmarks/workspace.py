@@ -0,0 +1,85 @@
+"""
+wall time of workspace scan: status of many repositories queried
+concurrently and one by one
+
+run from repository root:
+    python -m benchmarks.workspace [repositories] [files]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from config import WORKSPACE_WORKERS
+from git.workspace import discover, scan
+
+
+def git(cwd: str, *args: str):
+    subprocess.run(("git",) + args, cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def make_workspace(root: str, repositories: int, files: int):
+    """
+    create repositories in groups of ten, each with committed files,
+    a tenth of them modified and a few untracked
+    :param root: temporary directory
+    :param repositories: number of repositories
+    :param files: number of committed files in each repository
+    :return: None
+    """
+    for i in range(repositories):
+        work = os.path.join(root, "group {}".format(i // 10),
+                            "repository {}".format(i))
+        os.makedirs(work)
+        git(work, "init", "-q")
+        git(work, "config", "user.email", "bench@example.com")
+        git(work, "config", "user.name", "bench")
+        for j in range(files):
+            directory = os.path.join(work, "dir {}".format(j // 100))
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "file {}".format(j)), "w") as f:
+                f.write(str(j))
+        git(work, "add", "-A")
+        git(work, "commit", "-q", "-m", "initial")
+        for j in range(0, files, 10):
+            with open(os.path.join(work, "dir {}".format(j // 100),
+                                   "file {}".format(j)), "a") as f:
+                f.write("changed")
+        for j in range(i % 3):
+            with open(os.path.join(work, "new {}".format(j)), "w") as f:
+                f.write("new")
+
+
+def timed(paths, workers: int) -> float:
+    start = time.perf_counter()
+    summaries = asyncio.run(scan(paths, workers))
+    elapsed = time.perf_counter() - start
+    errors = [summary for summary in summaries if summary.error]
+    if errors:
+        raise RuntimeError(errors[0].error)
+    return elapsed
+
+
+def main(repositories: int, files: int):
+    with tempfile.TemporaryDirectory() as root:
+        make_workspace(root, repositories, files)
+        start = time.perf_counter()
+        paths = discover(root)
+        print("discovered {} repositories in {:.1f} ms".format(
+            len(paths), (time.perf_counter() - start) * 1000))
+        timed(paths, WORKSPACE_WORKERS)  # warm file system caches
+        sequential = timed(paths, 1)
+        concurrent = timed(paths, WORKSPACE_WORKERS)
+        print("{:>12}{:>14}{:>16}".format("files", "sequential s",
+                                          "concurrent s"))
+        print("{:>12}{:>14.2f}{:>16.2f}  ({} workers, x{:.1f})".format(
+            files, sequential, concurrent, WORKSPACE_WORKERS,
+            sequential / concurrent))
+
+
+if __name__ == '__main__':
+    arguments = [int(argument) for argument in sys.argv[1:]]
+    main(*(arguments + [60, 2000][len(arguments):]))
@@ -0,0 +1,256 @@
+"""
+command line interface without Qt, for scripts and CI:
+    python cli.py status [--json] [--stream] PATH [PATH ...]
+    python cli.py commit [--json] [--no-push] -m MESSAGE
+                         [--all] [--add FILE]... [--reset FILE]... PATH
+    python cli.py workspace [--json] [--depth N] [--workers N] ROOT
+repositories of one call are processed concurrently,
+--trace FILE before command writes Chrome trace-event file of git commands
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from config import CMD_WORKERS, WORKSPACE_DEPTH, WORKSPACE_WORKERS
+from git.cache import StatusCache
+from git.engine import GitEngine
+from git.exceptions import GitException
+from git.porcelain import CODES
+from git.trace import ChromeTraceFile, tracer
+from git.workspace import RepositorySummary, discover, scan
+from model.file_table import bitmask
+from model.push import PushProgress
+from model.status import FileStatus
+
+LETTERS = {status: chr(code) for code, status in CODES.items()}
+
+
+def letter(status: Optional[FileStatus]) -> str:
+    """
+    :return: porcelain letter of status, '.' for no changes
+    """
+    return "." if status is None else LETTERS[status]
+
+
+def describe(engine: GitEngine) -> Dict[str, Any]:
+    """
+    :return: JSON-serializable status of repository
+    """
+    branch = engine.branch._asdict() if engine.branch is not None else None
+    return {
+        "path": engine.path,
+        "branch": branch,
+        "files": [
+            {
+                "path": file.path,
+                "staged": file.staged.name if file.staged else None,
+                "unstaged": file.unstaged.name if file.unstaged else None,
+                "untracked": file.untracked,
+                "orig_path": file.orig_path,
+            }
+            for file in engine.files
+        ],
+    }
+
+
+def print_status(engine: GitEngine):
+    """
+    print status in the form of 'git status --short'
+    """
+    branch = engine.branch
+    if branch is not None:
+        print("## {}{}".format(
+            branch.head or "HEAD (no branch)",
+            "...{} [ahead {}, behind {}]".format(
+                branch.upstream, branch.ahead, branch.behind)
+            if branch.upstream else ""
+        ))
+    for file in engine.files:
+        if file.untracked:
+            print("?? " + file.path)
+        else:
+            print("{}{} {}{}".format(
+                letter(file.staged), letter(file.unstaged), file.path,
+                " <- " + file.orig_path if file.orig_path else ""))
+
+
+async def status(paths: List[str], stream: bool, as_json: bool) -> int:
+    """
+    :param paths: repositories to query
+    :param stream: print number of files found while git is running
+    :param as_json: print JSON document instead of text
+    :return: exit code
+    """
+    workers = asyncio.Semaphore(CMD_WORKERS)
+    cache = StatusCache()
+
+    async def query(path: str) -> Dict[str, Any]:
+        engine = GitEngine(path, cache)
+        async with workers:
+            try:
+                await engine.status(
+                    (lambda delta: print("{}: {} files so far".format(
+                        path, len(delta.table)), file=sys.stderr))
+                    if stream else None)
+            except GitException as e:
+                return {"path": path, "error": str(e) or type(e).__name__}
+        if not as_json:
+            print_status(engine)
+        return describe(engine)
+
+    results = await asyncio.gather(*(query(path) for path in paths))
+    for result in results:
+        if "error" in result:
+            print("{}: {}".format(result["path"], result["error"]),
+                  file=sys.stderr)
+    if as_json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return 1 if any("error" in result for result in results) else 0
+
+
+async def commit(path: str, message: str, add: List[str], reset: List[str],
+                 add_all: bool, push: bool, as_json: bool) -> int:
+    """
+    commit files staged in git with choices from command line applied
+    :return: exit code
+    """
+    engine = GitEngine(path)
+    finished = set()
+
+    def print_push_progress(progress: PushProgress):
+        if progress.percent == 100 and progress.stage not in finished:
+            finished.add(progress.stage)
+            print("{}: {}, done.".format(progress.stage, progress.total),
+                  file=sys.stderr)
+
+    try:
+        await engine.status()
+        files = engine.files
+        add, reset = set(add), set(reset)
+        choices = files.with_tracked(bitmask((
+            (add_all or files.is_tracked(row) or file in add)
+            and file not in reset
+            for row, file in enumerate(files.paths)
+        ), len(files)))
+        await engine.commit(
+            choices, message, push,
+            push_progress=None if as_json else print_push_progress)
+        committed = [
+            file for row, file in enumerate(choices.paths)
+            if choices.is_tracked(row)
+        ]
+    except GitException as e:
+        error = str(e) or type(e).__name__
+        if as_json:
+            json.dump({"path": path, "error": error}, sys.stdout)
+            print()
+        print("{}: {}".format(path, error), file=sys.stderr)
+        return 1
+    if as_json:
+        json.dump({"path": path, "committed": committed, "pushed": push},
+                  sys.stdout)
+        print()
+    else:
+        print("committed {} files".format(len(committed)))
+    return 0
+
+
+def print_summary(summary: RepositorySummary):
+    """
+    print one line summary of repository of workspace
+    """
+    if summary.error:
+        print("{}: {}".format(summary.path, summary.error), file=sys.stderr)
+        return
+    print("{}  {}{}  {} changed".format(
+        summary.path, summary.head or "HEAD (no branch)",
+        " [ahead {}, behind {}]".format(summary.ahead, summary.behind)
+        if summary.upstream else "",
+        summary.files))
+
+
+async def workspace(root: str, depth: int, workers: int,
+                    as_json: bool) -> int:
+    """
+    :param root: directory with repositories
+    :param depth: levels of directories searched under root
+    :param workers: number of repositories queried simultaneously
+    :param as_json: print JSON document instead of text
+    :return: exit code
+    """
+    paths = discover(root, depth)
+    summaries = await scan(paths, workers, None if as_json else print_summary)
+    if as_json:
+        json.dump([
+            dict(summary._asdict(), dirty=summary.dirty)
+            for summary in summaries
+        ], sys.stdout, indent=2)
+        print()
+    return 1 if any(summary.error for summary in summaries) else 0
+
+
+def parse_arguments(arguments: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write timings of git commands to FILE")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    status_parser = commands.add_parser("status", help="show status")
+    status_parser.add_argument("paths", nargs="+", metavar="PATH")
+    status_parser.add_argument("--json", action="store_true")
+    status_parser.add_argument("--stream", action="store_true")
+
+    commit_parser = commands.add_parser("commit", help="commit and push")
+    commit_parser.add_argument("path", metavar="PATH")
+    commit_parser.add_argument("-m", "--message", required=True)
+    # one file per flag, so PATH after them is not taken for a file
+    commit_parser.add_argument("--add", action="append", default=[],
+                               metavar="FILE", help="repeat for more files")
+    commit_parser.add_argument("--reset", action="append", default=[],
+                               metavar="FILE", help="repeat for more files")
+    commit_parser.add_argument("--all", action="store_true",
+                               help="commit all changed files")
+    commit_parser.add_argument("--no-push", action="store_true")
+    commit_parser.add_argument("--json", action="store_true")
+
+    workspace_parser = commands.add_parser(
+        "workspace", help="show status of repositories under directory")
+    workspace_parser.add_argument("root", metavar="ROOT")
+    workspace_parser.add_argument("--depth", type=int, default=WORKSPACE_DEPTH)
+    workspace_parser.add_argument("--workers", type=int,
+                                  default=WORKSPACE_WORKERS)
+    workspace_parser.add_argument("--json", action="store_true")
+    return parser.parse_args(arguments)
+
+
+def main(arguments: List[str]) -> int:
+    options = parse_arguments(arguments)
+    if options.trace:
+        tracer.add_sink(ChromeTraceFile(options.trace))
+    try:
+        return run_command(options)
+    finally:
+        tracer.close()
+
+
+def run_command(options: argparse.Namespace) -> int:
+    if options.command == "status":
+        return asyncio.run(status(
+            [os.path.abspath(path) for path in options.paths],
+            options.stream, options.json))
+    if options.command == "workspace":
+        return asyncio.run(workspace(
+            os.path.abspath(options.root), options.depth, options.workers,
+            options.json))
+    return asyncio.run(commit(
+        os.path.abspath(options.path), options.message, options.add, options.reset,
+        options.all, not options.no_push, options.json))
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
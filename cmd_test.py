@@ -1,17 +1,17 @@
 import sys
 
-from PyQt5.uic import loadUi
 from PyQt5.QtWidgets import QMainWindow, QApplication, QFileDialog
 
 from git.commands import GitStatusCommand
 from git.cmd import PQCmd
+from gui import load_view
 
 
 class Test(QMainWindow):
     def __init__(self):
         super().__init__()
         self.result = ""
-        loadUi("gui/cmd_test.ui", self)
+        load_view("cmd_test", self)
         self.start_button.clicked.connect(self.test)
         self.cmd = PQCmd()
         self.cmd.executed.connect(self.cmd_dispatch)
@@ -3,15 +3,41 @@ config file
 """
 
 WIN_ENCODING = "cp866"  # standard console encoding
-GIT_NOT_TRACKED_MARKER = """
-(use "git checkout -- <file>..." to discard changes in working directory)
-""".strip()  # standard git string before new/updated files section
-GIT_TRACKED_NO_COMMIT_MARKER = """
-(use "git add <file>..." to include in what will be committed)
-""".strip()  # standard git string before new/updated files section when not added any commits
-GIT_TRACKED_MARKER = """
-(use "git reset HEAD <file>..." to unstage)
-""".strip()  # standard git string before new/updated files already added to commit
+CMD_WORKERS = 4  # number of console commands executed simultaneously
 NOT_GIT_MARKER = """
-fatal: Not a git repository (or any of the parent directories): .git
+fatal: not a git repository (or any of the parent directories): .git
 """.strip()  # standard git string if path is not a git repository
+GIT_INDEX_STATUS = False  # read status from .git/index in-process if possible
+WATCH_REPOSITORY = True  # refresh status automatically on file changes
+WATCH_DEBOUNCE_MS = 300  # quiet time after last change before refresh
+WATCH_MAX_WAIT_MS = 2000  # refresh during steady changes at least this often
+WATCH_MAX_DIRECTORIES = 8192  # limit of watched directories (inotify watches)
+STATUS_CACHE = True  # reuse status of repositories with unchanged fingerprint
+STATUS_CACHE_REPOSITORIES = 32  # results kept in status cache
+STATUS_CACHE_ENTRIES = 500000  # files kept in status cache of all repositories
+STATUS_SNAPSHOT = "~/.cache/git-helper/snapshot.bin"  # status of last repository
+# kept between launches, None to start with empty window
+STATUS_ADAPTIVE = True  # choose faster status strategy for slow repositories
+STATUS_SLOW = 1.0  # seconds of full status making repository slow
+STATUS_FULL_EVERY = 10  # rescans of slow repository listing untracked files
+GUI_PRECOMPILED = True  # use modules built by "python -m gui.build" if present
+STATUS_STREAM = True  # show files of the first status while git is running
+STREAM_CHUNK = 65536  # bytes of process output read at once when streaming
+STREAM_FIRST_BATCH = 256  # files in the first streamed batch, next ones double
+WORKSPACE_DEPTH = 3  # directory levels searched for repositories of workspace
+WORKSPACE_WORKERS = 8  # repositories of workspace queried simultaneously
+TRACE_FILE = None  # path of Chrome trace-event file commands are written to
+TRACE_PANEL = False  # show panel with timings of recent commands
+TRACE_HISTORY = 100  # commands listed by the panel
+COMMAND_TIMEOUT = None  # seconds a command may run, None for no limit
+COMMIT_TIMEOUT = 600  # seconds add, reset and commit may run, hooks may be slow
+PUSH_TIMEOUT = 600  # seconds push may run, it waits for network
+PUSH_AFTER_COMMIT = True  # push in background when commit is done
+PUSH_RETRIES = 2  # failed pushes repeated, except ones remote rejected
+PUSH_RETRY_DELAY = 2.0  # seconds before the first retry, next ones double
+TERMINATE_GRACE = 2.0  # seconds stopped processes get to exit before kill
+DIFF_CACHE_BYTES = 8 * 2 ** 20  # characters of rendered diffs kept in memory
+DIFF_MAX_BYTES = 256 * 2 ** 10  # longer diffs are truncated
+DIFF_MAX_LINES = 5000  # diffs with more lines are truncated
+DIFF_PREFETCH = 3  # diffs of rows around selected one loaded while idle
+DIFF_PREFETCH_DELAY = 150  # ms without selection changes before prefetch
@@ -1,3 +1,9 @@
-from controllers.file import PQFileController, PQFileListController
+from controllers.diff import PQDiffController
+from controllers.file import PQFileListController
+from controllers.trace import PQTraceController
+from controllers.workspace import PQWorkspaceController
 
-__all__ = ("PQFileController", "PQFileListController")
+__all__ = (
+    "PQDiffController", "PQFileListController", "PQTraceController",
+    "PQWorkspaceController"
+)
@@ -0,0 +1,72 @@
+from typing import Optional
+
+from PyQt5.QtCore import QObject, pyqtSlot
+from PyQt5.QtGui import QColor, QSyntaxHighlighter, QTextCharFormat, \
+    QTextDocument
+
+from gui import load_view, load_style
+from model.diff import DiffText
+
+
+class PQDiffHighlighter(QSyntaxHighlighter):
+    """
+    Colors added, removed and hunk header lines of unified diff
+    """
+    colors = {"+": "#00ff00", "-": "#ff0000", "@": "#00ffff"}
+
+    def __init__(self, document: QTextDocument):
+        super().__init__(document)
+        self.__formats = {}
+        for prefix, color in self.colors.items():
+            text_format = QTextCharFormat()
+            text_format.setForeground(QColor(color))
+            self.__formats[prefix] = text_format
+
+    def highlightBlock(self, text: str):
+        if text[:1] in self.__formats and text[:3] not in ("+++", "---"):
+            self.setFormat(0, len(text), self.__formats[text[0]])
+
+
+class PQDiffController(QObject):
+    """
+    Controller for diff pane of selected file,
+    diffs of other files arriving late are not shown
+    """
+    def __init__(self):
+        super().__init__()
+        self.path = None  # type: Optional[str]
+
+        # loading view
+        self.view = load_view('git_diff')
+
+        # setting styles
+        self.view.setStyleSheet(load_style('git_diff'))
+
+        self.highlighter = PQDiffHighlighter(self.view.diff_text.document())
+
+    def select(self, path: Optional[str]):
+        """
+        wait for diff of file
+        :param path: relative path of selected file, None for no file
+        :return: None
+        """
+        if path == self.path:
+            return
+        self.path = path
+        self.view.title.setText(path or "Diff")
+        self.view.diff_text.setPlainText("loading..." if path else "")
+
+    @pyqtSlot(DiffText)
+    def show_diff(self, diff: DiffText):
+        """
+        Handler for PQGitSpeaker.diff_loaded signal
+        :param diff: loaded diff
+        :return: None
+        """
+        if diff.path != self.path:
+            return
+        text = diff.text
+        if diff.truncated:
+            text += "\n... diff is truncated"
+        if text != self.view.diff_text.toPlainText():
+            self.view.diff_text.setPlainText(text)
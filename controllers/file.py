@@ -1,126 +1,278 @@
-import os
-from typing import List
+import re
+from typing import List, Optional
 
-from PyQt5.uic import loadUi
-from PyQt5.QtCore import QObject, pyqtSlot
+from PyQt5.QtCore import QModelIndex, QObject, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QHeaderView
 
-from model.file import PQFileModel
+from gui import load_view, load_style
+from model.file_list import PQFileListModel
+from model.file_tree import PQFileTreeModel
+from model.file_table import FileDelta, FileRow, FileTable
+from model.selection import all_rows, pattern_rows, status_rows
+from model.status import FileStatus
 
 
 class PQFileListController(QObject):
     """
-    Controller for list of git files widget
+    Controller for list of git files widget.
+    Files are shown by item view over PQFileListModel, so only visible
+    rows are painted and no widget is created per file. Files may be
+    grouped by directory in tree view over the same model.
+    Bulk choices change the bitmask of the model at once, views
+    get one notification per operation
     """
+    ROW_HEIGHT = 24  # fixed, so view does not measure every row
+    AUTO_EXPAND = 200  # filtered trees with less files are expanded
+    selected = pyqtSignal(object)  # FileRow of current row or None
+
     def __init__(self):
         super().__init__()
-        self.__model = []
+        self.__model = PQFileListModel()
+        self.__tree = PQFileTreeModel(self.__model)
+        self.__tree_stale = True  # snapshot changed while tree was hidden
+        self.__unfiltered = None  # type: Optional[List[str]]
 
         # loading view
-        view_path = os.path.join('gui', 'git_file_list.ui')
-        view_path = os.path.abspath(view_path)
-        self.view = loadUi(view_path)
+        self.view = load_view('git_file_list')
 
         # setting styles
-        style_path = os.path.join('gui', 'git_file_list.qss')
-        style_path = os.path.abspath(style_path)
-        self.view.setStyleSheet(open(style_path, 'r').read())
+        self.view.setStyleSheet(load_style('git_file_list'))
 
+        # binding model
+        files_view = self.view.files_view
+        files_view.setModel(self.__model)
+        vertical_header = files_view.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(self.ROW_HEIGHT)
+        horizontal_header = files_view.horizontalHeader()
+        horizontal_header.setSectionResizeMode(QHeaderView.Interactive)
+        horizontal_header.setStretchLastSection(True)
+        files_view.selectionModel().currentRowChanged.connect(
+            self.current_changed)
+        tree_view = self.view.tree_view
+        tree_view.setModel(self.__tree)
+        tree_view.header().setStretchLastSection(True)
+        tree_view.selectionModel().currentChanged.connect(
+            self.current_changed)
 
+        # adding handlers to view
+        self.view.tree_toggle.toggled.connect(self.show_tree)
+        self.view.path_filter.textChanged.connect(self.filter_tree)
+        self.view.select_all.clicked.connect(self.select_all)
+        self.view.select_none.clicked.connect(self.select_none)
+        self.view.select_invert.clicked.connect(self.select_invert)
+        self.view.select_pattern.returnPressed.connect(self.select_pattern)
+        self.view.select_pattern.textChanged.connect(self.pattern_changed)
+        self.view.select_status.addItems(
+            ["select status"] + [status.name for status in FileStatus])
+        self.view.select_status.activated.connect(self.select_status)
 
-    @pyqtSlot(list)
-    def populate(self, files: List[PQFileModel]):
+    @pyqtSlot(FileTable)
+    def populate(self, files: FileTable):
         """
-        set model as copy of provided list (will differ with original
-        git.git.PQGitSpeaker files list)
-        :param files: list of PQFileModel to be copied
+        set model rows from provided snapshot, commit choices
+        of the user are kept apart from git.git.PQGitSpeaker files
+        :param files: status snapshot to be shown
         :return: None
         """
-        self.clear_view()
-        self.__model = [file.copy() for file in files]
-        for child_model in self.model:
-            child_view = PQFileController(child_model).view
-            self.view.children_layout.addWidget(child_view)
-            child_view.show()
+        self.__model.populate(files)
+        self.refresh_tree()
 
-    @pyqtSlot()
-    def clear(self):
+    @pyqtSlot(FileDelta)
+    def apply(self, delta: FileDelta):
         """
-        clear model and view
+        update rows changed since the shown snapshot,
+        commit choices of the user are kept
+        :param delta: changes of git.git.PQGitSpeaker files
         :return: None
         """
-        self.__model = []
-        self.clear_view()
+        self.__model.apply(delta)
+        if not delta.empty:
+            self.refresh_tree()
 
-    def clear_view(self):
+    @pyqtSlot(bool)
+    def set_stale(self, stale: bool):
         """
-        removes all widgets from view
-        and deletes them
+        mark shown files as saved status of previous launch
+        which is being refreshed
+        :param stale: files may differ from git state
         :return: None
         """
-        layout = self.view.children_layout
-        while layout.count() > 0:
-            item = layout.takeAt(0)
-            widget = item.widget()
-            layout.removeWidget(widget)
-            widget.deleteLater()
+        self.view.stale_label.setVisible(stale)
 
-    @property
-    def model(self)->List[PQFileModel]:
-        return self.__model
+    @pyqtSlot()
+    def select_all(self):
+        self.__model.choose(all_rows(self.__model.table), True)
 
-    @model.setter
-    def model(self, val: List[PQFileModel]):
-        self.populate(val)
+    @pyqtSlot()
+    def select_none(self):
+        self.__model.choose(all_rows(self.__model.table), False)
 
+    @pyqtSlot()
+    def select_invert(self):
+        self.__model.invert()
 
-class PQFileController(QObject):
-    def __init__(self, model: PQFileModel):
+    @pyqtSlot()
+    def select_pattern(self):
         """
-        :param model: PQFileModel of controller 
+        Handler for pattern field: choose files which paths match
+        glob or regular expression, wrong expression is marked
+        :return: None
         """
-        super().__init__()
-        self.__model = model
-        self.__model.changed.connect(self.redraw)
+        field = self.view.select_pattern
+        if not field.text():
+            return
+        try:
+            rows = pattern_rows(self.__model.table, field.text(),
+                                self.view.pattern_regex.isChecked())
+        except re.error as e:
+            self.mark_pattern(str(e))
+            return
+        self.__model.choose(rows, True)
 
-        # loading view
-        view_path = os.path.join('gui', 'git_file.ui')
-        view_path = os.path.abspath(view_path)
-        self.view = loadUi(view_path)
-
-        # adding handlers
-        self.add_view_handlers()
-        self.view.committed.clicked.connect(self.checkbox_clicked)
+    @pyqtSlot(str)
+    def pattern_changed(self, text: str):
+        self.mark_pattern(None)
 
-        # setting styles
-        style_path = os.path.join('gui', 'git_file.qss')
-        style_path = os.path.abspath(style_path)
-        self.view.setStyleSheet(open(style_path, 'r').read())
+    def mark_pattern(self, error: Optional[str]):
+        """
+        :param error: error of regular expression, None if it is valid
+        :return: None
+        """
+        field = self.view.select_pattern
+        field.setToolTip(error or "")
+        field.setProperty("invalid", error is not None)
+        field.style().unpolish(field)  # restyle by property
+        field.style().polish(field)
 
-        self.redraw()
+    @pyqtSlot(int)
+    def select_status(self, item: int):
+        """
+        Handler for status box: choose files with selected status
+        :param item: item of box, the first one is a title
+        :return: None
+        """
+        if item > 0:
+            self.__model.choose(
+                status_rows(self.__model.table, FileStatus(item)), True)
+            self.view.select_status.setCurrentIndex(0)
 
     @pyqtSlot(bool)
-    def checkbox_clicked(self, state: bool):
-        self.__model.tracked = state
-
-    def add_view_handlers(self):
-        """  
-        this method exists because of a weird glitch: while gui contained in
-        separate attribute, method slots are not working if not added to 
-        gui object
+    def show_tree(self, tree: bool):
+        """
+        Handler for tree toggle: switch between flat list
+        and files grouped by directory
+        :param tree: show tree
+        :return: None
+        """
+        self.view.files_view.setVisible(not tree)
+        self.view.tree_view.setVisible(tree)
+        self.view.path_filter.setVisible(tree)
+        if tree and self.__tree_stale:
+            self.refresh_tree()
+        self.selected.emit(self.current)
+
+    @pyqtSlot(str)
+    def filter_tree(self, text: str):
+        """
+        Handler for path filter: show files which paths contain text
+        :param text: part of path
+        :return: None
+        """
+        expanded = self.expanded_directories()
+        if text and self.__unfiltered is None:
+            self.__unfiltered = expanded  # restored when filter is cleared
+        elif not text and self.__unfiltered is not None:
+            expanded, self.__unfiltered = self.__unfiltered, None
+        self.__tree.set_filter(text)
+        if text and self.__tree.size <= self.AUTO_EXPAND:
+            self.view.tree_view.expandAll()
+        else:
+            self.expand_directories(expanded)
+
+    def refresh_tree(self):
+        """
+        rebuild tree of new snapshot keeping expanded directories,
+        hidden tree is rebuilt when it is shown
+        :return: None
+        """
+        if not self.view.tree_toggle.isChecked():
+            self.__tree_stale = True
+            return
+        expanded = self.expanded_directories()
+        self.__tree.rebuild()
+        self.__tree_stale = False
+        self.expand_directories(expanded)
+
+    def expanded_directories(self) -> List[str]:
+        """
+        :return: prefixes of directories expanded in tree view
+        """
+        tree_view = self.view.tree_view
+        return [
+            node.prefix for node in self.__tree.expanded_nodes()
+            if node.parent is not None and tree_view.isExpanded(
+                self.__tree.createIndex(node.position, 0, node))
+        ]
+
+    def expand_directories(self, prefixes: List[str]):
+        """
+        :param prefixes: directories to expand, missing ones are skipped
         :return: None
         """
-        self.view.checkbox_clicked = self.checkbox_clicked
+        for prefix in sorted(prefixes):  # parents are expanded first
+            index = self.__tree.find(prefix)
+            if index.isValid():
+                self.view.tree_view.expand(index)
+
+    @pyqtSlot(QModelIndex, QModelIndex)
+    def current_changed(self, current: QModelIndex, previous: QModelIndex):
+        self.selected.emit(self.current)
+
+    @property
+    def current(self) -> Optional[FileRow]:
+        """
+        :return: row of file under cursor or None
+        """
+        files = self.__model.files()
+        if self.view.tree_toggle.isChecked():
+            index = self.view.tree_view.currentIndex()
+            row = self.__tree.node(index).row if index.isValid() else None
+            return files[row] if row is not None else None
+        index = self.view.files_view.currentIndex()
+        if not index.isValid():
+            return None
+        return files[index.row()]
+
+    def neighbours(self, count: int) -> List[FileRow]:
+        """
+        :param count: number of rows taken on each side
+        :return: rows around current one, nearest first
+        """
+        current = self.current
+        if current is None:
+            return []
+        files = current.table
+        rows = []
+        for distance in range(1, count + 1):
+            rows += [row for row in (current.row + distance,
+                                     current.row - distance)
+                     if 0 <= row < len(files)]
+        return [files[row] for row in rows]
 
     @pyqtSlot()
-    def redraw(self):
+    def clear(self):
         """
-        set actual model attributes to view widgets
+        clear model and view
         :return: None
         """
-        self.view.status.setText(
-            self.__model.status.name
-        )
-        self.view.path.setText(self.__model.path)
-        self.view.committed.setChecked(1 if self.__model.tracked else 0)
-        self.view.show()
+        self.__model.clear()
+
+    @property
+    def model(self)->FileTable:
+        return self.__model.files()
+
+    @model.setter
+    def model(self, val: FileTable):
+        self.populate(val)
 
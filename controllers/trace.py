@@ -0,0 +1,58 @@
+from PyQt5.QtCore import QObject, pyqtSlot
+from PyQt5.QtWidgets import QFileDialog, QHeaderView, QMessageBox
+
+from git.trace import CommandTrace, export_chrome_trace
+from gui import load_view, load_style
+from model.trace import PQTraceModel
+
+
+class PQTraceController(QObject):
+    """
+    Controller for panel of recent commands with durations
+    of their phases and output sizes
+    """
+    def __init__(self):
+        super().__init__()
+        self.__model = PQTraceModel()
+
+        # loading view
+        self.view = load_view('git_trace')
+
+        # setting styles
+        self.view.setStyleSheet(load_style('git_trace'))
+
+        # binding model
+        traces_view = self.view.traces_view
+        traces_view.setModel(self.__model)
+        header = traces_view.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(PQTraceModel.COMMAND, QHeaderView.Stretch)
+
+        # adding handlers
+        self.view.export_button.clicked.connect(self.export)
+
+    @pyqtSlot(CommandTrace)
+    def record(self, trace: CommandTrace):
+        """
+        Handler for PQGitSpeaker.traced signal
+        :param trace: trace of command which result is applied
+        :return: None
+        """
+        self.__model.append(trace)
+
+
+    @pyqtSlot()
+    def export(self):
+        """
+        Handler for export button: listed commands are saved
+        as Chrome trace-event file chosen by the user
+        :return: None
+        """
+        path, _ = QFileDialog.getSaveFileName(
+            self.view, "Export trace", "trace.json", "Trace (*.json)")
+        if not path:
+            return
+        try:
+            export_chrome_trace(self.__model.traces(), path)
+        except OSError as e:
+            QMessageBox.warning(self.view, "Export trace", str(e))
@@ -0,0 +1,84 @@
+from PyQt5.QtCore import QModelIndex, QObject, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QHeaderView
+
+from git.scanner import PQWorkspaceScanner
+from git.workspace import RepositorySummary
+from gui import load_view, load_style
+from model.workspace import PQWorkspaceModel
+
+
+class PQWorkspaceController(QObject):
+    """
+    Controller for workspace widget: repositories found under root
+    are listed at once and their status fills in as it arrives
+    """
+    repository_selected = pyqtSignal(str)  # path of activated repository
+
+    def __init__(self):
+        super().__init__()
+        self.__model = PQWorkspaceModel()
+        self.__seconds = None
+        self.scanner = PQWorkspaceScanner()
+
+        # loading view
+        self.view = load_view('git_workspace')
+
+        # setting styles
+        self.view.setStyleSheet(load_style('git_workspace'))
+
+        # binding model
+        repositories_view = self.view.repositories_view
+        repositories_view.setModel(self.__model)
+        repositories_view.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeToContents)
+        repositories_view.activated.connect(self.activated)
+
+        # adding handlers to scanner
+        self.scanner.discovered.connect(self.discovered)
+        self.scanner.scanned.connect(self.scanned)
+        self.scanner.completed.connect(self.completed)
+
+    @pyqtSlot(str)
+    def scan(self, root: str):
+        """
+        show repositories of workspace
+        :param root: workspace directory
+        :return: None
+        """
+        self.__model.clear()
+        self.__seconds = None
+        self.scanner.scan(root)
+        self.redraw()
+
+    @pyqtSlot(list)
+    def discovered(self, paths: list):
+        self.__model.populate(self.scanner.root, paths)
+        self.redraw()
+
+    @pyqtSlot(RepositorySummary)
+    def scanned(self, summary: RepositorySummary):
+        self.__model.update(summary)
+        self.redraw()
+
+    @pyqtSlot(float)
+    def completed(self, seconds: float):
+        self.__seconds = seconds
+        self.redraw()
+
+    @pyqtSlot(QModelIndex)
+    def activated(self, index: QModelIndex):
+        self.repository_selected.emit(self.__model.path(index.row()))
+
+    @pyqtSlot()
+    def redraw(self):
+        """
+        show progress of scan in title
+        :return: None
+        """
+        model = self.__model
+        text = "Workspace {}: {}/{} scanned, {} with changes".format(
+            self.scanner.root or "", model.scanned, model.rowCount(),
+            model.dirty)
+        if self.__seconds is not None:
+            text += " in {:.2f} s".format(self.__seconds)
+        self.view.title.setText(text)
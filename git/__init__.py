@@ -1,6 +1,22 @@
-from git.exceptions import GitException, NotAGitRepository, NothingChanged
-from git.git import PQGitSpeaker
+from git.exceptions import GitException, NotAGitRepository, NothingChanged,\
+    CommandCancelled, CommandTimedOut, PushRejected
 
 __all__ = (
-    "GitException", "NotAGitRepository", "NothingChanged", "PQGitSpeaker"
+    "GitException", "NotAGitRepository", "NothingChanged", "CommandCancelled",
+    "CommandTimedOut", "PushRejected", "PQGitSpeaker", "PQWorkspaceScanner"
 )
+
+
+def __getattr__(name: str):
+    """
+    Qt facade is imported on first access,
+    so the package can be used without Qt
+    """
+    if name == "PQGitSpeaker":
+        from git.git import PQGitSpeaker
+        return PQGitSpeaker
+    if name == "PQWorkspaceScanner":
+        from git.scanner import PQWorkspaceScanner
+        return PQWorkspaceScanner
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
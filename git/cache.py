@@ -0,0 +1,250 @@
+import hashlib
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from config import STATUS_CACHE_REPOSITORIES, STATUS_CACHE_ENTRIES, \
+    DIFF_CACHE_BYTES
+from model.branch import BranchInfo
+from model.diff import DiffText
+from .gitconfig import config_paths, path_value, read_config
+from .ignore import global_excludes_file, is_ignored, read_patterns
+from .refs import find_git_dir, read_head
+from .strategy import UntrackedMode
+
+
+def fingerprint(path: str) -> Optional[bytes]:
+    """
+    Cheap digest of repository state: stat data of .git/index, commit
+    HEAD points to and mtimes of not ignored worktree directories.
+    Directory mtime changes when files are created, deleted or renamed
+    (editors saving through a temporary file included), writes to
+    existing files are not seen and have to be reported with
+    StatusCache.invalidate
+    :param path: path to the root of working tree
+    :return: digest or None if path is not a root of working tree
+    """
+    git_dir = find_git_dir(path)
+    if git_dir is None:
+        return None
+    digest = hashlib.blake2b(digest_size=20)
+    try:
+        index = os.stat(os.path.join(git_dir, "index"))
+        digest.update(b"%d %d\0" % (index.st_mtime_ns, index.st_size))
+    except OSError:
+        digest.update(b"no index\0")
+    ref, oid = read_head(git_dir)
+    digest.update("{} {}\0".format(ref, oid).encode("utf-8", "surrogateescape"))
+
+    config = read_config(config_paths(git_dir))
+    patterns = read_patterns(global_excludes_file(
+        path_value(config, "core.excludesfile")), "") + \
+        read_patterns(os.path.join(git_dir, "info", "exclude"), "")
+    pending = [("", patterns)]
+    while pending:
+        directory, patterns = pending.pop()
+        absolute = os.path.join(path, directory)
+        try:
+            digest.update(b"%d\0" % os.stat(absolute).st_mtime_ns)
+            patterns = patterns + read_patterns(
+                os.path.join(absolute, ".gitignore"), directory)
+            with os.scandir(absolute) as scanner:
+                for item in scanner:
+                    name = directory + item.name
+                    if item.name != ".git" \
+                            and item.is_dir(follow_symlinks=False) \
+                            and not is_ignored(patterns, name, True):
+                        pending.append((name + "/", patterns))
+        except OSError:
+            digest.update(b"missing\0")
+    return digest.digest()
+
+
+class CachedStatus(NamedTuple):
+    fingerprint: bytes
+    branch: Optional[BranchInfo]
+    files: List[Any]
+
+
+class StatusCache:
+    """
+    Thread-safe LRU cache of status results keyed by repository path
+    and untracked mode, modes list different untracked files.
+    Results are valid while repository fingerprint is the same, cache
+    is limited by number of results and total number of files
+    """
+    def __init__(self, max_repositories: int = STATUS_CACHE_REPOSITORIES,
+                 max_entries: int = STATUS_CACHE_ENTRIES):
+        """
+        :param max_repositories: maximal number of cached results
+        :param max_entries: maximal number of files in all cached results
+        """
+        self.max_repositories = max_repositories
+        self.max_entries = max_entries
+        self.__lock = Lock()
+        # (repository, untracked mode) -> CachedStatus
+        self.__items = OrderedDict()
+        self.__entries = 0
+
+    @property
+    def entries(self) -> int:
+        """
+        :return: number of files in all cached results
+        """
+        return self.__entries
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    def get(self, repository: str, current: bytes,
+            untracked: UntrackedMode = UntrackedMode.configured)\
+            -> Optional[CachedStatus]:
+        """
+        :param repository: normalized repository path
+        :param current: current fingerprint of repository
+        :param untracked: untracked mode of the query
+        :return: cached status or None if there is none or it is stale
+        """
+        key = (repository, untracked)
+        with self.__lock:
+            cached = self.__items.get(key)
+            if cached is None:
+                return None
+            if cached.fingerprint != current:
+                self.__remove(key)
+                return None
+            self.__items.move_to_end(key)
+            return cached
+
+    def put(self, repository: str, current: bytes,
+            branch: Optional[BranchInfo], files: List[Any],
+            untracked: UntrackedMode = UntrackedMode.configured):
+        """
+        store status and evict least recently used results
+        while limits are exceeded
+        :param repository: normalized repository path
+        :param current: fingerprint taken before status was queried
+        :param branch: branch header
+        :param files: status result
+        :param untracked: untracked mode status was queried in
+        :return: None
+        """
+        if len(files) > self.max_entries:
+            return
+        key = (repository, untracked)
+        with self.__lock:
+            self.__remove(key)
+            self.__items[key] = CachedStatus(current, branch, files)
+            self.__entries += len(files)
+            while len(self.__items) > self.max_repositories \
+                    or self.__entries > self.max_entries:
+                self.__remove(next(iter(self.__items)))
+
+    def invalidate(self, repository: Optional[str] = None):
+        """
+        :param repository: normalized repository path, None for all
+        :return: None
+        """
+        with self.__lock:
+            if repository is None:
+                self.__items.clear()
+                self.__entries = 0
+            else:
+                for key in [key for key in self.__items
+                            if key[0] == repository]:
+                    self.__remove(key)
+
+    def __remove(self, key: Tuple[str, UntrackedMode]):
+        cached = self.__items.pop(key, None)
+        if cached is not None:
+            self.__entries -= len(cached.files)
+
+
+def file_stamp(path: str, file: str) -> Optional[Tuple]:
+    """
+    State diff of file depends on: stat data of file itself,
+    of .git/index for staged changes and commit HEAD points to
+    :param path: path to the root of working tree
+    :param file: relative path of file
+    :return: stamp or None if path is not a root of working tree
+    """
+    git_dir = find_git_dir(path)
+    if git_dir is None:
+        return None
+    stamps = []
+    for stat_path in (os.path.join(path, file),
+                      os.path.join(git_dir, "index")):
+        try:
+            stat = os.stat(stat_path)
+            stamps.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps) + read_head(git_dir)
+
+
+class DiffCache:
+    """
+    Thread-safe LRU cache of rendered diffs keyed by repository
+    and file path. Diffs are valid while file stamp is the same,
+    cache is limited by total size of diff texts
+    """
+    def __init__(self, max_size: int = DIFF_CACHE_BYTES):
+        """
+        :param max_size: maximal number of characters of all diffs
+        """
+        self.max_size = max_size
+        self.__lock = Lock()
+        self.__items = OrderedDict()  # (repository, file) -> (stamp, diff)
+        self.__size = 0
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    def get(self, repository: str, file: str, stamp: Tuple)\
+            -> Optional[DiffText]:
+        """
+        :param repository: normalized repository path
+        :param file: relative path of file
+        :param stamp: current stamp of file
+        :return: cached diff or None if there is none or it is stale
+        """
+        key = (repository, file)
+        with self.__lock:
+            cached = self.__items.get(key)
+            if cached is None:
+                return None
+            if cached[0] != stamp:
+                self.__remove(key)
+                return None
+            self.__items.move_to_end(key)
+            return cached[1]
+
+    def put(self, repository: str, file: str, stamp: Tuple, diff: DiffText):
+        """
+        store diff and evict least recently used ones
+        while size limit is exceeded
+        :param repository: normalized repository path
+        :param file: relative path of file
+        :param stamp: stamp taken before diff was queried
+        :param diff: rendered diff
+        :return: None
+        """
+        if diff.size > self.max_size:
+            return
+        key = (repository, file)
+        with self.__lock:
+            self.__remove(key)
+            self.__items[key] = (stamp, diff)
+            self.__size += diff.size
+            while self.__size > self.max_size:
+                self.__remove(next(iter(self.__items)))
+
+    def __remove(self, key: Tuple[str, str]):
+        cached = self.__items.pop(key, None)
+        if cached is not None:
+            self.__size -= cached[1].size
@@ -1,65 +1,151 @@
-from subprocess import Popen, PIPE
+import asyncio
+from typing import List
 
-from PyQt5.QtCore import pyqtSignal, pyqtSlot, QThread
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QThread
 
-from config import WIN_ENCODING
+from config import CMD_WORKERS
 from .commands import ConsoleCommand
+from .engine import execute
+from .exceptions import GitException
+from .scheduler import CommandScheduler
 
 
-class PQCmd(QThread):
+class PQCmdWorker(QThread):
     """
-    Background thread for dealing with cmd queries
+    Background thread executing commands taken from shared scheduler
     """
     executed = pyqtSignal(ConsoleCommand)
-    aborted = pyqtSignal()
+    progress = pyqtSignal(ConsoleCommand, int, int)
+    partial = pyqtSignal(ConsoleCommand, object)
 
-    def __init__(self):
+    def __init__(self, scheduler: CommandScheduler):
         super().__init__()
-        self.__dead = False
-        self.__commands = []
+        self.__scheduler = scheduler
 
     def run(self):
-        while not self.__dead:
-            while self.__commands:
-                self.__execute(self.__commands.pop(0))
-            self.sleep(1)
+        loop = asyncio.new_event_loop()  # commands run one at a time
+        try:
+            while True:
+                command = self.__scheduler.take()
+                if command is None:
+                    break
+                try:
+                    try:
+                        loop.run_until_complete(self.__execute(command))
+                    except Exception as e:  # like missing folder of command
+                        command.set_error(GitException(str(e)))
+                    # emitted before done() so results of one repository
+                    # are delivered in order they were submitted
+                    self.executed.emit(command)
+                    for follower in command.followers:
+                        follower.adopt(command)
+                        self.executed.emit(follower)
+                finally:
+                    self.__scheduler.done(command)
+        finally:
+            loop.close()
+
+    async def __execute(self, command: ConsoleCommand):
+        """
+        execute particular console command
+        :param command: command to execute
+        :return: None
+        """
+        await execute(
+            command,
+            lambda done, total: self.progress.emit(command, done, total),
+            lambda result: self.partial.emit(command, result)
+        )
+
+
+class PQCmd(QObject):
+    """
+    Pool of background threads for dealing with cmd queries.
+    Commands of one repository are executed in order they were added,
+    read-only commands and commands of different repositories
+    are executed in parallel
+    """
+    executed = pyqtSignal(ConsoleCommand)
+    progress = pyqtSignal(ConsoleCommand, int, int)  # finished/all steps
+    partial = pyqtSignal(ConsoleCommand, object)  # result streamed so far
+    aborted = pyqtSignal()
+
+    def __init__(self, workers: int = CMD_WORKERS):
+        """
+        :param workers: number of commands executed simultaneously
+        """
+        super().__init__()
+        self.__scheduler = CommandScheduler()
+        self.__workers = [
+            PQCmdWorker(self.__scheduler) for _ in range(max(1, workers))
+        ]
+        for worker in self.__workers:
+            worker.executed.connect(self.executed)
+            worker.progress.connect(self.progress)
+            worker.partial.connect(self.partial)
+
+    def start(self):
+        """
+        start all worker threads
+        :return: None
+        """
+        for worker in self.__workers:
+            worker.start()
+
+    def wait(self):
+        """
+        block until all worker threads are finished
+        :return: None
+        """
+        for worker in self.__workers:
+            worker.wait()
 
     def execute(self, command: ConsoleCommand):
         """
-        add command for execution
-        :param command: 
-        :return: 
+        add command for execution, free worker is woken up immediately
+        :param command: command to execute
+        :return: None
+        """
+        self.__scheduler.submit(command)
+
+    @property
+    def depth(self) -> int:
         """
-        self.__commands.append(command)
+        :return: number of commands waiting for execution
+        """
+        return self.__scheduler.depth
 
     @pyqtSlot()
     def kill(self):
         """
-        stop thread
+        stop all threads, running commands are terminated
         :return: None
         """
-        self.__dead = True
+        self.__scheduler.stop()
+        self.cancel_running()
         self.aborted.emit()
 
     @pyqtSlot()
-    def abort(self):
+    def abort(self) -> List[ConsoleCommand]:
         """
-        abort all planned actions
-        :return: None
+        abort all planned actions, running commands are terminated
+        and report git.exceptions.CommandCancelled
+        :return: planned commands which are dropped without report
         """
-        self.__commands = []
+        pending = self.__scheduler.clear()
+        self.cancel_running()
         self.aborted.emit()
+        return pending
 
-    def __execute(self, command: ConsoleCommand):
+    def cancel_running(self):
         """
-        execute particular console command
-        :param command: command to execute
+        terminate processes of running commands
         :return: None
         """
-        print(command.text)
-        process = Popen(command.text, stdin=PIPE, stdout=PIPE, stderr=PIPE, shell=True)
-        command.set_result(*map(lambda x: x.decode(WIN_ENCODING), process.communicate()))
-        self.executed.emit(command)
+        for command in self.__scheduler.running:
+            command.cancel()
 
     def __del__(self):
+        self.__scheduler.stop()
+        self.cancel_running()
         self.wait()
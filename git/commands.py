@@ -1,23 +1,69 @@
+import os
 import re
-from typing import Union, List, Iterable, Any
-from enum import Enum
+from typing import Union, List, Iterable, Any, Optional, NamedTuple, \
+    Callable
 
-from config import GIT_NOT_TRACKED_MARKER, GIT_TRACKED_MARKER,\
-    NOT_GIT_MARKER, GIT_TRACKED_NO_COMMIT_MARKER
-from git.exceptions import GitException, NotAGitRepository
-from model.file import PQFileModel
+from config import NOT_GIT_MARKER, WIN_ENCODING, STREAM_FIRST_BATCH, \
+    COMMAND_TIMEOUT, COMMIT_TIMEOUT, DIFF_MAX_BYTES, PUSH_TIMEOUT
+from git.exceptions import GitException, NotAGitRepository, PushRejected
+from git.cache import DiffCache, StatusCache, file_stamp, fingerprint
+from git.objects import ObjectNotFound, ObjectReader
+from git.porcelain import PorcelainParser, StatusEntry, parse_porcelain_v2
+from git.progress import ProgressParser
+from git.refs import RefReader, find_git_dir, read_head
+from git.strategy import UNTRACKED_ARGUMENTS, UntrackedMode
+from git.trace import CommandTrace
+from git.worktree import UnsupportedRepository, read_status
+from model.branch import BranchInfo
+from model.diff import DiffText, render_diff, render_new_file
+from model.file_table import FileTable, FileTableBuilder
+from model.push import PushProgress
+
+
+PRIORITY_USER = 0  # command of user action
+PRIORITY_BACKGROUND = 1  # refresh nobody asked for explicitly
+
+
+class CommandStep(NamedTuple):
+    """
+    One process spawned while executing a command
+    """
+    args: Union[str, List[str]]  # shell text or list of program arguments
+    input: Optional[bytes] = None  # data fed to process stdin
+
+    def describe(self) -> str:
+        """
+        :return: human readable text of the step
+        """
+        if isinstance(self.args, str):
+            return self.args
+        text = " ".join(self.args)
+        if self.input is not None:
+            text += " < {} paths".format(self.input.count(b"\0") + 1)
+        return text
 
 
 class ConsoleCommand:
     """
     Simple wrapper for one Windows console command
     """
+    read_only = False  # command does not change any repository state
+    streaming = False  # stdout is passed to feed() in chunks as it arrives
+    timeout = COMMAND_TIMEOUT  # seconds all steps may run, None for no limit
+    priority = PRIORITY_USER  # commands with lower value are executed first
+
     def __init__(self, text: Union[str, List[str]]):
         """
         :param text: text of command or list of command texts
         """
         self.text = text if isinstance(text, str) else " && ".join(text)
         self.__result = None
+        self.cancelled = False
+        self.__cancel_handler = None  # type: Optional[Callable[[], None]]
+        self.returncode = None  # exit code of the last executed step
+        self.queued_at = None  # time.perf_counter() value at submission
+        self.trace = CommandTrace(self.text, type(self).__name__)
+        self.followers = []  # type: List[ConsoleCommand]
 
     def map_result(self, answer: str, error: str) -> Union[Any, GitException]:
         """
@@ -34,6 +80,88 @@ class ConsoleCommand:
         """
         return self.__result
 
+    @property
+    def repository(self) -> Optional[str]:
+        """
+        :return: normalized path of repository command works with,
+        None if command is not bound to any repository
+        """
+        return None
+
+    @property
+    def cwd(self) -> Optional[str]:
+        """
+        :return: working directory for command processes
+        """
+        return None
+
+    def steps(self) -> List[CommandStep]:
+        """
+        processes to run one after another, execution stops
+        at the first failed one like with ' && ' chain
+        :return: list of steps
+        """
+        return [CommandStep(self.text)]
+
+    def execute_in_process(self) -> bool:
+        """
+        try to get result without spawning any process
+        :return: True if result is set, False if steps have to be executed
+        """
+        return False
+
+    def feed(self, chunk: bytes) -> Any:
+        """
+        consume next part of stdout of streaming command
+        :param chunk: raw output
+        :return: partial result to report, None if there is nothing new
+        """
+        return None
+
+    def feed_error(self, chunk: bytes) -> Any:
+        """
+        look at next part of stderr of streaming command,
+        it is passed to set_raw_result() as well
+        :param chunk: raw error output
+        :return: partial result to report, None if there is nothing new
+        """
+        return None
+
+    def covers(self, other: "ConsoleCommand") -> bool:
+        """
+        :param other: pending command submitted together with this one
+        :return: True if result of this command makes other one needless
+        """
+        return False
+
+    def adopt(self, other: "ConsoleCommand"):
+        """
+        take result of command this one was merged into
+        :param other: executed command covering this one
+        :return: None
+        """
+        self.returncode = other.returncode
+        self.set_value(other.result)
+
+    def cancel(self):
+        """
+        stop the command, may be called from any thread: running process
+        is terminated with its process group, next steps are not started
+        :return: None
+        """
+        self.cancelled = True
+        handler = self.__cancel_handler
+        if handler is not None:
+            handler()
+
+    def set_cancel_handler(self, handler: Optional[Callable[[], None]]):
+        """
+        :param handler: called by cancel() while command is executed,
+        None when execution is over
+        :return: None
+        """
+        self.__cancel_handler = handler
+
     def set_result(self, answer: str, error: str):
         """
         :param answer: 
@@ -42,6 +170,35 @@ class ConsoleCommand:
         """
         self.__result = self.map_result(answer, error)
 
+    def set_value(self, value: Any):
+        """
+        set result computed without running the steps
+        :param value: resulting value
+        :return: None
+        """
+        self.__result = value
+
+    def set_error(self, error: GitException):
+        """
+        set result to error that happened outside of the processes
+        :param error: occurred error
+        :return: None
+        """
+        self.__result = error
+
+    def set_raw_result(self, answer: bytes, error: bytes):
+        """
+        decode raw process output and set result
+        :param answer: raw stdout of the command
+        :param error: raw stderr of the command
+        :return: None
+        """
+        with self.trace.span("decode"):
+            answer, error = \
+                answer.decode(WIN_ENCODING), error.decode(WIN_ENCODING)
+        with self.trace.span("parse"):
+            self.set_result(answer, error)
+
 
 class FolderCommand(ConsoleCommand):
     """
@@ -55,100 +212,307 @@ class FolderCommand(ConsoleCommand):
         :param path: path to folder where commands should be ran
         :param text: text of command or list of command texts
         """
-        parsed_path = self.is_path.match(path)
-        if parsed_path is None:
+        if self.is_path.match(path) is None and not os.path.isabs(path):
             raise ValueError("{} not seem like path".format(path))
-        partition, folder = parsed_path.groups()
+        self.path = path
         if isinstance(text, str):
             text = text.split(" && ")
-        super().__init__(
-            [
-                partition,
-                "cd " + folder
-            ] + text)
+        self.commands = text
+        super().__init__(text)
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        """
+        :param path: path to folder
+        :return: path in form used as repository key
+        """
+        return os.path.normcase(os.path.normpath(path))
+
+    @property
+    def repository(self) -> str:
+        return self.normalize(self.path)
+
+    @property
+    def cwd(self) -> str:
+        return self.path
+
+    def steps(self) -> List[CommandStep]:
+        return [CommandStep(text) for text in self.commands]
 
 
 class GitStatusCommand(FolderCommand):
     """
     'git status' command that returns files in directory:
-    newly created and updated, tracked and not yet added to git
+    newly created and updated, tracked and not yet added to git.
+    Uses machine-readable porcelain v2 output, so result does not
+    depend on git localization and paths are not quoted
     """
-    is_file = re.compile(
-        r"\t((?:modified:)|(?:new\sfile:)|(?:deleted:)|(?:renamed:))?[\s]*(.+)"
-    )
-
-    StatusStates = Enum('StatusStates', 'BEFORE_ALL NOT_TRACKED TRACKED')
+    read_only = True
 
-    def __init__(self, path: str):
+    def __init__(self, path: str, directories: Optional[List[str]] = None,
+                 cache: Optional[StatusCache] = None, stream: bool = False,
+                 untracked: UntrackedMode = UntrackedMode.configured):
         """
         :param path: path to the git folder
+        :param directories: limit status to these directories relative
+        to the git folder ('a/b/'), None for whole repository
+        :param cache: cache to take unchanged result from and store to
+        :param stream: parse output while git is running and report
+        files found so far in batches
+        :param untracked: how untracked files are listed,
+        with UntrackedMode.none result has no untracked files
         """
-        super().__init__(path, "git status")
+        # --no-optional-locks: status must not rewrite index,
+        # watchers would take it for a change of repository
+        self.args = [
+            "git", "--no-optional-locks", "--literal-pathspecs",
+            "status", "--porcelain=v2", "-z", "--branch"
+        ] + UNTRACKED_ARGUMENTS[untracked]
+        if directories is not None:
+            self.args += ["--"] + directories
+        self.directories = directories
+        self.untracked = untracked
+        super().__init__(path, " ".join(self.args))
+        self.branch = None
+        # partial results are not cached
+        self.cache = cache if directories is None \
+            and untracked != UntrackedMode.none else None
+        self.fingerprint = None
+        self.cached = False  # result is taken from cache
+        self.in_process = False  # result is read without git
+        self.streaming = stream
+        self.__parser = PorcelainParser()
+        self.__builder = FileTableBuilder()
+        self.__next_batch = STREAM_FIRST_BATCH
 
-    def map_result(self, answer: str, error: str)\
-            -> Union[List[PQFileModel], GitException]:
+    def steps(self) -> List[CommandStep]:
+        return [CommandStep(self.args)]
+
+    def covers(self, other: ConsoleCommand) -> bool:
+        """
+        status of whole repository covers status of its directories,
+        status listing untracked files covers one skipping them
+        """
+        return isinstance(other, GitStatusCommand) \
+            and other.repository == self.repository \
+            and (self.directories is None
+                 or self.directories == other.directories) \
+            and (self.untracked != UntrackedMode.none
+                 or other.untracked == UntrackedMode.none)
+
+    def adopt(self, other: ConsoleCommand):
+        self.branch = other.branch
+        super().adopt(other)
+
+    def feed(self, chunk: bytes) -> Optional[FileTable]:
+        """
+        parse complete records of the chunk, batches grow twice,
+        so all reported snapshots together are copied in linear time
+        :param chunk: raw output of 'git status'
+        :return: files found so far or None if batch is not full yet
+        """
+        self.__builder.extend(self.__parser.feed(chunk))
+        if len(self.__builder) < self.__next_batch:
+            return None
+        self.__next_batch = len(self.__builder) * 2
+        return self.__builder.table()
+
+    def execute_in_process(self) -> bool:
+        """
+        take result from cache if repository is not changed since
+        :return: True on cache hit
+        """
+        if self.cache is None:
+            return False
+        self.fingerprint = fingerprint(self.path)
+        if self.fingerprint is None:
+            return False
+        cached = self.cache.get(self.repository, self.fingerprint,
+                                self.untracked)
+        if cached is None:
+            return False
+        self.branch = cached.branch
+        self.cached = True
+        self.set_value(cached.files)
+        return True
+
+    def set_value(self, value: Any):
+        super().set_value(value)
+        self.store()
+
+    def set_result(self, answer: Union[bytes, str], error: str):
+        super().set_result(answer, error)
+        self.store()
+
+    def store(self):
+        """
+        put successful result to cache
+        :return: None
+        """
+        if self.cache is not None and self.fingerprint is not None \
+                and not self.cached \
+                and not isinstance(self.result, GitException):
+            self.cache.put(self.repository, self.fingerprint, self.branch,
+                           self.result, self.untracked)
+
+    def set_raw_result(self, answer: bytes, error: bytes):
+        """
+        porcelain output is NUL separated bytes, so it is parsed undecoded
+        :param answer: raw stdout of the command
+        :param error: raw stderr of the command
+        :return: None
+        """
+        with self.trace.span("parse"):
+            self.set_result(answer, error.decode(WIN_ENCODING))
+
+    def map_result(self, answer: Union[bytes, str], error: str)\
+            -> Union[FileTable, GitException]:
         """
-        Mapper for 'git status' console response extracting files
-        from cmd answer
-        :param answer: stdout string of 'git status' command
+        Mapper for 'git status --porcelain=v2 -z' console response
+        extracting files from cmd answer
+        :param answer: stdout of 'git status' command
         :param error: stderr string of 'git status' command
-        :return: list of File named tuples or CmdException exception
+        :return: FileTable or CmdException exception
         """
 
         if error:
-            if NOT_GIT_MARKER in error:
+            if NOT_GIT_MARKER.lower() in error.lower():
                 return NotAGitRepository()
             else:
                 return GitException(error)
 
-        state = self.StatusStates.BEFORE_ALL
-        lines = answer.split("\n")
-        result = []
-
-        def _add_if_file(tracked: bool, line: str):
-            """
-            If line looks like a file adds it to result
-            :param tracked: is file already tracked by git 
-            :param line: line that may represent a file
-            """
-            match = self.is_file.match(line)
-            if match is not None:
-                result.append(PQFileModel(
-                    tracked=tracked,
-                    status=match.group(1),
-                    path=match.group(2)
-                ))
-
-        for line in lines:
-            if state is self.StatusStates.BEFORE_ALL:
-                if GIT_TRACKED_MARKER in line:
-                    state = self.StatusStates.TRACKED
-                if GIT_NOT_TRACKED_MARKER in line \
-                        or GIT_TRACKED_NO_COMMIT_MARKER in line:
-                    state = self.StatusStates.NOT_TRACKED
-
-            elif state == self.StatusStates.NOT_TRACKED:
-                if GIT_TRACKED_MARKER in line:
-                    state = self.StatusStates.TRACKED
-                else:
-                    _add_if_file(False, line)
-
-            elif state is self.StatusStates.TRACKED:
-                if GIT_NOT_TRACKED_MARKER in line:
-                    state = self.StatusStates.NOT_TRACKED
-                else:
-                    _add_if_file(True, line)
-
-        return result
+        if isinstance(answer, str):
+            answer = answer.encode("utf-8", "surrogateescape")
+
+        if self.streaming:  # output is consumed by feed()
+            self.__builder.extend(self.__parser.feed(answer))
+            self.__builder.extend(self.__parser.close())
+            self.branch = self.__parser.branch
+            return self.__builder.table()
+
+        self.branch, entries = parse_porcelain_v2(answer)
+        return self.files(entries)
+
+    @staticmethod
+    def files(entries: Iterable[StatusEntry]) -> FileTable:
+        """
+        :param entries: parsed status entries
+        :return: snapshot of entries, files with staged changes
+        are tracked
+        """
+        return FileTable.from_entries(entries)
+
+
+class IndexStatusCommand(GitStatusCommand):
+    """
+    'git status' computed in-process from .git/index and worktree
+    stat data without spawning git. Falls back to 'git status'
+    for repository states the in-process reader does not handle:
+    staged changes, split index, sparse checkout, submodules etc.
+    """
+    def execute_in_process(self) -> bool:
+        if super().execute_in_process():
+            return True
+        if self.directories is not None:
+            return False
+        try:
+            self.branch, entries = read_status(self.path)
+        except (UnsupportedRepository, OSError):
+            return False
+        self.untracked = UntrackedMode.configured  # they are read anyway
+        self.in_process = True
+        self.set_value(self.files(entries))
+        return True
+
+
+class GitBranchCommand(FolderCommand):
+    """
+    Branch header without 'git status': HEAD, upstream config and refs
+    are read in-process, ahead/behind counts are walked in commit-graph.
+    'git rev-list --left-right --count' is spawned only if commits
+    can't be walked there, like in repository without commit-graph
+    """
+    read_only = True
+    priority = PRIORITY_BACKGROUND
+
+    def __init__(self, path: str, refs: RefReader):
+        """
+        :param path: path to the git folder
+        :param refs: ref reader of the repository
+        """
+        self.refs = refs
+        self.branch = BranchInfo()
+        self.__range = None  # type: Optional[str]
+        super().__init__(
+            path, "git rev-list --left-right --count HEAD...@{upstream}")
+
+    def steps(self) -> List[CommandStep]:
+        return [CommandStep(
+            ["git", "rev-list", "--left-right", "--count", self.__range])]
+
+    def covers(self, other: ConsoleCommand) -> bool:
+        return isinstance(other, GitBranchCommand) \
+            and other.repository == self.repository
+
+    def execute_in_process(self) -> bool:
+        """
+        :return: True if counts are found without git
+        or branch has no upstream to count them against
+        """
+        ref, oid = self.refs.head()
+        head = ref[len("refs/heads/"):] \
+            if ref and ref.startswith("refs/heads/") else ref
+        self.branch = BranchInfo(oid, head)
+        upstream = self.refs.upstream(ref) if ref and oid else None
+        if upstream is None:
+            self.set_value(self.branch)
+            return True
+        name, tracking = upstream
+        self.branch = self.branch._replace(upstream=name)
+        _, upstream_oid = self.refs.resolve(tracking)
+        if upstream_oid is None:  # upstream is gone, nothing to count
+            self.set_value(self.branch)
+            return True
+        counts = self.refs.ahead_behind(oid, upstream_oid)
+        if counts is None:
+            self.__range = "{}...{}".format(oid, upstream_oid)
+            return False
+        self.set_value(
+            self.branch._replace(ahead=counts[0], behind=counts[1]))
+        return True
+
+    def map_result(self, answer: str, error: str)\
+            -> Union[BranchInfo, GitException]:
+        """
+        :param answer: '<ahead>\t<behind>' printed by 'git rev-list'
+        :param error: stderr of 'git rev-list'
+        :return: branch with counts or GitException
+        """
+        if self.returncode:
+            return GitException(error or "git rev-list failed")
+        ahead, behind = answer.split()
+        return self.branch._replace(ahead=int(ahead), behind=int(behind))
 
 
 class GitCommitSequenceCommand(FolderCommand):
     """
     Sequence of commands, needed to commit changes:
-    'git add' for each file
+    'git update-index --add --remove --stdin' for files to commit
+    'git add' for untracked directories git reports as one entry
+    'git update-index --index-info' putting HEAD entries of files
+    to reset back to index, like 'git reset -- <paths>'
     'git commit -m "%message%"'
-    'git push'
+    Paths are fed to git through stdin and looked up by index and
+    tree order instead of matching pathspecs, so time is linear in
+    number of paths. Commit is local, it is pushed by GitPushCommand
+    afterwards
     """
+    timeout = COMMIT_TIMEOUT
+    UPDATE_INDEX = ["git", "update-index", "-z", "--add", "--remove",
+                    "--stdin"]
+    INDEX_INFO = ["git", "update-index", "-z", "--index-info"]
+    NO_ENTRY = "0 " + "0" * 40  # mode and id removing path from index
+
     def __init__(self, path: str, files_to_commit: Iterable[str],
                  files_to_reset: Iterable[str], message: str):
         """
@@ -157,21 +521,286 @@ class GitCommitSequenceCommand(FolderCommand):
         :param files_to_reset: list of relative paths to files to be removed from commit
         :param message: commit message
         """
-        commands_sequence = \
-            [
-                "git add " + file_path for file_path in files_to_commit
-            ] + [
-                "git reset " + file_path for file_path in files_to_reset
-            ] + [
-                'git  commit -m "{}"'.format(message.replace('"', "'")),
-                "git push"
-            ]
-        super().__init__(path, commands_sequence)
+        files_to_commit = list(files_to_commit)
+        self.files_to_reset = list(files_to_reset)
+        files = [path for path in files_to_commit if not path.endswith("/")]
+        directories = [path for path in files_to_commit if path.endswith("/")]
+        self.__steps = []
+        if files:
+            self.__steps.append(
+                CommandStep(self.UPDATE_INDEX, self.paths_input(files)))
+        if directories:  # few entries, pathspecs are cheap
+            self.__steps.append(CommandStep(
+                ["git", "--literal-pathspecs", "add",
+                 "--pathspec-from-file=-", "--pathspec-file-nul"],
+                self.paths_input(directories)))
+        if self.files_to_reset:  # input is HEAD entries read in-process
+            self.__steps.append(CommandStep(self.INDEX_INFO))
+        self.__steps.append(CommandStep(["git", "commit", "-m", message]))
+        super().__init__(path, [step.describe() for step in self.__steps])
+
+    @staticmethod
+    def paths_input(paths: List[str]) -> bytes:
+        """
+        :return: NUL separated paths for git stdin
+        """
+        return "\0".join(paths).encode("utf-8", "surrogateescape")
+
+    def execute_in_process(self) -> bool:
+        """
+        read HEAD entries of files to reset, they are fed to
+        'git update-index --index-info', paths missing in HEAD
+        are removed from index
+        :return: True if HEAD can't be read and error is set
+        """
+        if not self.files_to_reset:
+            return False
+        git_dir = find_git_dir(self.path)
+        if git_dir is None:
+            self.set_error(NotAGitRepository())
+            return True
+        _, oid = read_head(git_dir)
+        try:
+            reader = ObjectReader(git_dir)
+            entries = {} if oid is None else reader.find_entries(
+                reader.commit_tree(oid), self.files_to_reset)
+        except (ObjectNotFound, OSError, ValueError) as e:
+            self.set_error(GitException("can't read HEAD: {}".format(e)))
+            return True
+        lines = []
+        for path in self.files_to_reset:
+            entry = entries.get(path)
+            lines.append("{} {}\t{}".format(entry[0], entry[1], path)
+                         if entry is not None
+                         else "{}\t{}".format(self.NO_ENTRY, path))
+        self.__steps = [
+            CommandStep(step.args, self.paths_input(lines))
+            if step.args == self.INDEX_INFO else step
+            for step in self.__steps
+        ]
+        return False
+
+    def steps(self) -> List[CommandStep]:
+        return self.__steps
 
     def map_result(self, answer: str, error: str) -> Union[None, GitException]:
         """
+        git commit may report hook output to stderr,
+        so only exit code tells about an error
         :param answer: cmd stdout string
         :param error:  cmd stderr string
         :return: None if everything is ok, CmdException otherwise
         """
-        return None if not error else GitException(error)
\ No newline at end of file
+        return None if not self.returncode else GitException(error or answer)
+
+
+class EnableFastStatusCommand(FolderCommand):
+    """
+    Turn on git features making status of big repository faster:
+    untracked cache remembers which directories have no new files,
+    feature.manyFiles makes index smaller and enables the cache
+    by default. 'git status' is run once to fill the cache
+    """
+    def __init__(self, path: str, names: Iterable[str]):
+        """
+        :param path: path to the git folder
+        :param names: config variables to set to true
+        """
+        self.__steps = [
+            CommandStep(["git", "config", name, "true"]) for name in names
+        ] + [
+            CommandStep(["git", "update-index", "--untracked-cache"]),
+            CommandStep(["git", "status", "--porcelain"]),
+        ]
+        super().__init__(path, [step.describe() for step in self.__steps])
+
+    def steps(self) -> List[CommandStep]:
+        return self.__steps
+
+    def map_result(self, answer: str, error: str) -> Union[None, GitException]:
+        return None if not self.returncode else GitException(error or answer)
+
+
+class GitPushCommand(FolderCommand):
+    """
+    'git push' of current branch to its upstream. Progress git reports
+    to stderr is streamed as model.push.PushProgress, so push runs
+    in background while the user goes on. Push changes only the remote
+    and remote-tracking refs, not the working tree or index, so it is
+    not ordered with other commands of repository: status and diffs
+    are not delayed by network
+    """
+    streaming = True
+    timeout = PUSH_TIMEOUT
+    priority = PRIORITY_BACKGROUND
+
+    def __init__(self, path: str, attempt: int = 1):
+        """
+        :param path: path to the git folder
+        :param attempt: number of the attempt to push same commits
+        """
+        self.args = ["git", "push", "--progress", "--porcelain"]
+        self.attempt = attempt
+        super().__init__(path, " ".join(self.args))
+        self.__output = []  # type: List[bytes]
+        self.__progress = ProgressParser()
+
+    @property
+    def repository(self) -> Optional[str]:
+        return None
+
+    def steps(self) -> List[CommandStep]:
+        return [CommandStep(self.args)]
+
+    def feed(self, chunk: bytes) -> None:
+        self.__output.append(chunk)  # porcelain status of pushed refs
+        return None
+
+    def feed_error(self, chunk: bytes) -> Optional[PushProgress]:
+        """
+        :param chunk: raw stderr of 'git push --progress'
+        :return: last progress of chunk, None if chunk has no progress
+        """
+        progress = self.__progress.feed(chunk)
+        return progress[-1] if progress else None
+
+    def set_raw_result(self, answer: bytes, error: bytes):
+        """
+        stdout was consumed by feed(), progress lines
+        are left out of error text
+        :param answer: empty stdout
+        :param error: raw stderr of the command
+        :return: None
+        """
+        with self.trace.span("decode"):
+            answer = b"".join(self.__output).decode(WIN_ENCODING)
+            error = self.__progress.messages().decode(WIN_ENCODING)
+        with self.trace.span("parse"):
+            self.set_result(answer, error)
+
+    def map_result(self, answer: str, error: str) -> Union[None, GitException]:
+        """
+        refs remote refused are marked with '!' in porcelain output,
+        pushing them again makes no sense unlike after network failure
+        :param answer: porcelain status of refs
+        :param error: stderr without progress
+        :return: None if everything is ok, CmdException otherwise
+        """
+        if not self.returncode:
+            return None
+        if any(line.startswith("!") for line in answer.splitlines()):
+            return PushRejected(error or answer)
+        return GitException(error or answer)
+
+
+class GitDiffCommand(FolderCommand):
+    """
+    'git diff' of one file against HEAD: staged and unstaged changes
+    together. New files are read in-process, rendered diffs are
+    cached while file, index and HEAD are the same
+    """
+    read_only = True
+    EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"  # base of unborn
+
+    def __init__(self, path: str, file: str, orig_path: Optional[str] = None,
+                 untracked: bool = False, cache: Optional[DiffCache] = None):
+        """
+        :param path: path to the git folder
+        :param file: relative path of file
+        :param orig_path: path file had before rename or copy
+        :param untracked: file is not known to git
+        :param cache: cache to take unchanged diff from and store to
+        """
+        self.file = file
+        self.orig_path = orig_path
+        self.untracked = untracked
+        self.cache = cache
+        self.prefetch = False  # result is only cached, nobody waits for it
+        self.stamp = None
+        self.base = "HEAD"
+        super().__init__(path, "git diff HEAD -- " + file)
+
+    def arguments(self) -> List[str]:
+        paths = [self.file] if self.orig_path is None \
+            else [self.orig_path, self.file]
+        return ["git", "--no-pager", "--literal-pathspecs", "diff",
+                "--no-color", "--no-ext-diff", "-M", self.base, "--"] + paths
+
+    def steps(self) -> List[CommandStep]:
+        return [CommandStep(self.arguments())]
+
+    def covers(self, other: ConsoleCommand) -> bool:
+        return isinstance(other, GitDiffCommand) \
+            and other.repository == self.repository \
+            and other.file == self.file
+
+    def cached(self) -> Optional[DiffText]:
+        """
+        :return: cached diff if file is not changed since, None otherwise
+        """
+        if self.cache is None:
+            return None
+        self.stamp = file_stamp(self.path, self.file)
+        if self.stamp is None:
+            return None
+        return self.cache.get(self.repository, self.file, self.stamp)
+
+    def execute_in_process(self) -> bool:
+        """
+        take diff from cache or render new file without git
+        :return: True if result is set
+        """
+        diff = self.cached()
+        if diff is not None:
+            self.set_value(diff)
+            return True
+        if self.stamp is not None and self.stamp[-1] is None:
+            self.base = self.EMPTY_TREE  # no commits yet
+        if self.file.endswith("/"):
+            self.set_value(DiffText(self.file, "untracked directory"))
+            return True
+        if not self.untracked:
+            return False
+        try:
+            with open(os.path.join(self.path, self.file), "rb") as f:
+                data = f.read(DIFF_MAX_BYTES + 1)
+        except OSError as e:
+            self.set_error(GitException(str(e)))
+            return True
+        self.set_value(render_new_file(self.file, data))
+        return True
+
+    def set_value(self, value: Any):
+        super().set_value(value)
+        self.store()
+
+    def set_raw_result(self, answer: bytes, error: bytes):
+        """
+        diff is rendered from bytes, so it is truncated before decoding
+        :param answer: raw stdout of the command
+        :param error: raw stderr of the command
+        :return: None
+        """
+        with self.trace.span("parse"):
+            self.set_result(answer, error.decode(WIN_ENCODING))
+        self.store()
+
+    def map_result(self, answer: bytes, error: str)\
+            -> Union[DiffText, GitException]:
+        """
+        :param answer: stdout of 'git diff'
+        :param error: stderr of 'git diff'
+        :return: rendered diff or GitException
+        """
+        if self.returncode:
+            return GitException(error or "git diff failed")
+        return render_diff(self.file, answer)
+
+    def store(self):
+        """
+        put rendered diff to cache
+        :return: None
+        """
+        if self.cache is not None and self.stamp is not None \
+                and isinstance(self.result, DiffText):
+            self.cache.put(self.repository, self.file, self.stamp, self.result)
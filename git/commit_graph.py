@@ -0,0 +1,281 @@
+import heapq
+import mmap
+import os
+import struct
+from binascii import unhexlify
+from typing import Dict, List, Optional, Tuple
+
+from .objects import ObjectNotFound, ObjectReader
+
+GRAPH_MAGIC = b"CGPH"
+NO_PARENT = 0x70000000
+EXTRA_EDGES = 0x80000000  # second parent field points into EDGE chunk
+LAST_EDGE = 0x80000000
+COMMIT_DATA_SIZE = 20 + 4 + 4 + 8  # tree, two parents, generation and time
+WALK_LIMIT = 200000  # commits walked in-process before giving up
+UNGRAPHED_LIMIT = 1000  # commits outside of graph read from objects
+
+
+class UnsupportedGraph(Exception):
+    pass
+
+
+class GraphLayer:
+    """
+    One memory mapped commit-graph file: object ids are found
+    by binary search in fanout range like in pack index
+    """
+    def __init__(self, path: str, base: int):
+        """
+        :param path: path to commit-graph file
+        :param base: number of commits in layers below this one
+        """
+        self.base = base
+        with open(path, "rb") as f:
+            self.__data = data = mmap.mmap(f.fileno(), 0,
+                                           access=mmap.ACCESS_READ)
+        magic, version, hash_version, chunks = struct.unpack_from(
+            ">4sBBB", data)
+        if magic != GRAPH_MAGIC or version != 1 or hash_version != 1:
+            raise UnsupportedGraph("unsupported commit-graph " + path)
+        offsets = {}
+        for i in range(chunks + 1):  # last entry marks end of chunks
+            chunk, offset = struct.unpack_from(">4sQ", data, 8 + i * 12)
+            offsets[chunk] = offset
+        try:
+            self.__fanout = struct.unpack_from(">256I", data,
+                                               offsets[b"OIDF"])
+            self.__names = offsets[b"OIDL"]
+            self.__commits = offsets[b"CDAT"]
+        except KeyError:
+            raise UnsupportedGraph("commit-graph without required chunks")
+        self.__edges = offsets.get(b"EDGE")
+        self.count = self.__fanout[255]
+
+    def find(self, oid: bytes) -> Optional[int]:
+        """
+        :param oid: binary commit id
+        :return: position of commit in the whole chain or None
+        """
+        low = self.__fanout[oid[0] - 1] if oid[0] else 0
+        high = self.__fanout[oid[0]]
+        data, names = self.__data, self.__names
+        while low < high:
+            middle = (low + high) // 2
+            start = names + middle * 20
+            current = data[start:start + 20]
+            if current < oid:
+                low = middle + 1
+            elif current > oid:
+                high = middle
+            else:
+                return self.base + middle
+        return None
+
+    def oid(self, position: int) -> str:
+        start = self.__names + (position - self.base) * 20
+        return self.__data[start:start + 20].hex()
+
+    def commit(self, position: int) -> Tuple[int, List[int]]:
+        """
+        :param position: position of commit in the whole chain
+        :return: generation number and positions of parents
+        """
+        start = self.__commits + (position - self.base) * COMMIT_DATA_SIZE
+        first, second, generation = struct.unpack_from(
+            ">IIQ", self.__data, start + 20)
+        parents = [] if first == NO_PARENT else [first]
+        if second & EXTRA_EDGES:
+            if self.__edges is None:
+                raise UnsupportedGraph("octopus merge without edges")
+            edge = self.__edges + (second & ~EXTRA_EDGES) * 4
+            while True:
+                value, = struct.unpack_from(">I", self.__data, edge)
+                parents.append(value & ~LAST_EDGE)
+                if value & LAST_EDGE:
+                    break
+                edge += 4
+        elif second != NO_PARENT:
+            parents.append(second)
+        return generation >> 34, parents
+
+
+class CommitGraph:
+    """
+    Commit-graph of repository: single file or chain of split layers,
+    positions of commits are counted across layers from the base one
+    """
+    def __init__(self, objects: str):
+        """
+        :param objects: path to objects directory
+        """
+        info = os.path.join(objects, "info")
+        single = os.path.join(info, "commit-graph")
+        chain = os.path.join(info, "commit-graphs", "commit-graph-chain")
+        if os.path.exists(single):
+            paths = [single]
+        else:
+            try:
+                with open(chain, encoding="ascii") as f:
+                    paths = [
+                        os.path.join(info, "commit-graphs",
+                                     "graph-{}.graph".format(line.strip()))
+                        for line in f if line.strip()
+                    ]
+            except OSError:
+                raise UnsupportedGraph("no commit-graph")
+        self.layers = []  # type: List[GraphLayer]
+        base = 0
+        for path in paths:
+            try:
+                layer = GraphLayer(path, base)
+            except (OSError, struct.error, ValueError) as e:
+                raise UnsupportedGraph(str(e))
+            self.layers.append(layer)
+            base += layer.count
+
+    @staticmethod
+    def files(objects: str) -> List[str]:
+        """
+        :param objects: path to objects directory
+        :return: files the graph is read from, for change detection
+        """
+        info = os.path.join(objects, "info")
+        return [os.path.join(info, "commit-graph"),
+                os.path.join(info, "commit-graphs", "commit-graph-chain")]
+
+    def find(self, oid: str) -> Optional[int]:
+        binary = unhexlify(oid)
+        for layer in reversed(self.layers):  # new commits are on top
+            position = layer.find(binary)
+            if position is not None:
+                return position
+        return None
+
+    def layer(self, position: int) -> GraphLayer:
+        for layer in reversed(self.layers):
+            if position >= layer.base:
+                return layer
+        raise UnsupportedGraph("position out of graph")
+
+
+class CommitWalker:
+    """
+    Parents and generation numbers of commits: from commit-graph,
+    commits made after graph was written are read from objects
+    """
+    def __init__(self, graph: CommitGraph, objects: ObjectReader):
+        self.graph = graph
+        self.objects = objects
+        self.__ungraphed = {}  # type: Dict[str, Tuple[int, List[str]]]
+
+    def commit(self, oid: str) -> Tuple[int, List[str]]:
+        """
+        :param oid: hex commit id
+        :return: generation number and parent ids,
+        raises UnsupportedGraph if they can't be found cheaply
+        """
+        position = self.graph.find(oid)
+        if position is not None:
+            layer = self.graph.layer(position)
+            generation, parents = layer.commit(position)
+            if not generation:  # written by git without generations
+                raise UnsupportedGraph("commit-graph without generations")
+            return generation, [
+                self.graph.layer(parent).oid(parent) for parent in parents]
+        known = self.__ungraphed.get(oid)
+        if known is not None:
+            return known
+        # generation of new commit is one more than of its parents
+        pending, parents_of = [oid], {}
+        while pending:
+            current = pending[-1]
+            if current not in parents_of:
+                if len(self.__ungraphed) + len(parents_of) > UNGRAPHED_LIMIT:
+                    raise UnsupportedGraph("too many commits outside graph")
+                parents_of[current] = self.read_parents(current)
+            missing = [
+                parent for parent in parents_of[current]
+                if parent not in self.__ungraphed
+                and parent not in parents_of
+                and self.graph.find(parent) is None
+            ]
+            if missing:
+                pending.extend(missing)
+                continue
+            pending.pop()
+            if current in self.__ungraphed:
+                continue
+            generations = [self.generation(parent)
+                           for parent in parents_of[current]]
+            self.__ungraphed[current] = (
+                max(generations, default=0) + 1, parents_of[current])
+        return self.__ungraphed[oid]
+
+    def generation(self, oid: str) -> int:
+        known = self.__ungraphed.get(oid)
+        return known[0] if known is not None else self.commit(oid)[0]
+
+    def read_parents(self, oid: str) -> List[str]:
+        """
+        :param oid: hex id of commit outside of graph
+        :return: hex ids of its parents
+        """
+        try:
+            kind, content = self.objects.read(oid)
+        except (ObjectNotFound, OSError, ValueError) as e:
+            raise UnsupportedGraph(str(e))
+        if kind != b"commit":
+            raise UnsupportedGraph("{} is not a commit".format(oid))
+        parents = []
+        for line in content.split(b"\n"):
+            if not line:  # headers end at empty line
+                break
+            if line.startswith(b"parent "):
+                parents.append(line[7:47].decode("ascii"))
+        return parents
+
+
+def ahead_behind(walker: CommitWalker, left: str, right: str,
+                 limit: int = WALK_LIMIT) -> Tuple[int, int]:
+    """
+    Count commits reachable from one commit only, like
+    'git rev-list --left-right --count left...right'. Commits are
+    taken by descending generation, so flags of commit are final when
+    it is taken, walk stops when only common commits are left
+    :param walker: source of commits
+    :param left: hex id of local commit
+    :param right: hex id of upstream commit
+    :param limit: maximal number of walked commits
+    :return: numbers of commits only left and only right one reaches,
+    raises UnsupportedGraph if commits can't be walked in-process
+    """
+    flags = {left: 1}
+    flags[right] = flags.get(right, 0) | 2
+    heap = [(-walker.generation(oid), oid) for oid in flags]
+    heapq.heapify(heap)
+    interesting = sum(1 for flag in flags.values() if flag != 3)
+    counts = [0, 0, 0, 0]
+    walked = 0
+    while interesting:
+        walked += 1
+        if walked > limit:
+            raise UnsupportedGraph("history is too long")
+        _, oid = heapq.heappop(heap)
+        flag = flags[oid]
+        counts[flag] += 1
+        if flag != 3:
+            interesting -= 1
+        for parent in walker.commit(oid)[1]:
+            old = flags.get(parent)
+            new = (old or 0) | flag
+            if old is None:
+                flags[parent] = new
+                heapq.heappush(heap, (-walker.generation(parent), parent))
+                if new != 3:
+                    interesting += 1
+            elif new != old:
+                flags[parent] = new
+                if new == 3:
+                    interesting -= 1
+    return counts[1], counts[2]
@@ -0,0 +1,545 @@
+"""
+Qt-free core of the helper: commands are executed with asyncio
+subprocesses and repository logic works on FileTable snapshots.
+git.cmd and git.git are Qt adapters over this module, cli.py uses it
+directly
+"""
+import asyncio
+import os
+import signal
+import subprocess
+from typing import Any, Callable, List, Optional, Tuple
+
+from config import GIT_INDEX_STATUS, PUSH_RETRIES, PUSH_RETRY_DELAY, \
+    STREAM_CHUNK, TERMINATE_GRACE
+from model.branch import BranchInfo
+from model.file_table import FileDelta, FileTable, mask_rows
+from model.selection import mask_value, value_mask
+from model.push import PushProgress
+from model.status import FileStatus
+from .cache import StatusCache
+from .commands import ConsoleCommand, GitBranchCommand, \
+    GitCommitSequenceCommand, GitPushCommand, GitStatusCommand, \
+    IndexStatusCommand
+from .exceptions import CommandCancelled, CommandTimedOut, GitException, \
+    NotAGitRepository, NothingChanged, PushRejected
+from .refs import RefReader, find_git_dir
+from .strategy import UntrackedMode
+from .trace import tracer
+
+Progress = Callable[[int, int], None]  # finished and all steps
+Partial = Callable[[Any], None]  # partial result of streaming command
+# staged changes of rows with original path
+MOVED_CODES = (FileStatus.renamed.value, FileStatus.copied.value)
+
+
+async def execute(command: ConsoleCommand, progress: Optional[Progress] = None,
+                  partial: Optional[Partial] = None):
+    """
+    execute console command step by step,
+    stop at first failed step or when command is cancelled or timed out,
+    running process is terminated with all its children then
+    :param command: command to execute
+    :param progress: callback receiving number of finished and all steps
+    :param partial: callback receiving partial results of streaming command
+    :return: None
+    """
+    loop = asyncio.get_running_loop()
+    trace = command.trace
+    with trace.span("in_process"):
+        done = await loop.run_in_executor(None, command.execute_in_process)
+    if done:
+        return
+    deadline = None if command.timeout is None \
+        else loop.time() + command.timeout
+    stopped = asyncio.Event()  # set on cancel() from any thread
+
+    def stop():
+        try:
+            loop.call_soon_threadsafe(stopped.set)
+        except RuntimeError:  # loop is closed, command is finished
+            pass
+
+    command.set_cancel_handler(stop)
+    try:
+        steps = command.steps()
+        answers, errors = [], []
+        for number, step in enumerate(steps, 1):
+            if command.cancelled:
+                command.set_error(CommandCancelled("command cancelled"))
+                return
+            with trace.span("spawn"):
+                process = await spawn(step.args, command.cwd)
+            with trace.span("git"):
+                if not command.streaming:
+                    communication = process.communicate(step.input)
+                else:
+                    communication = stream(
+                        command, process, step.input, partial)
+                finished, (answer, error) = await supervise(
+                    process, communication, stopped, deadline)
+            if not finished:
+                command.set_error(
+                    CommandTimedOut("command timed out after {} s".format(
+                        command.timeout))
+                    if not command.cancelled
+                    else CommandCancelled("command cancelled"))
+                return
+            trace.output_size += len(answer)
+            trace.error_size += len(error)
+            answers.append(answer)
+            errors.append(error)
+            command.returncode = process.returncode
+            if progress is not None:
+                progress(number, len(steps))
+            if process.returncode:
+                break
+        command.set_raw_result(b"".join(answers), b"".join(errors))
+    finally:
+        command.set_cancel_handler(None)
+
+
+async def supervise(process: asyncio.subprocess.Process, communication,
+                    stopped: asyncio.Event, deadline: Optional[float])\
+        -> Tuple[bool, Tuple[bytes, bytes]]:
+    """
+    wait for communication with process, process group is terminated
+    when stopped event is set, deadline passes or task is cancelled
+    :param process: started process
+    :param communication: coroutine returning stdout and stderr
+    :param stopped: event set when command is cancelled
+    :param deadline: loop time to stop process at, None for no limit
+    :return: if process finished by itself, stdout and stderr
+    """
+    loop = asyncio.get_running_loop()
+    talking = asyncio.ensure_future(communication)
+    stopping = asyncio.ensure_future(stopped.wait())
+    try:
+        await asyncio.wait(
+            (talking, stopping), return_when=asyncio.FIRST_COMPLETED,
+            timeout=None if deadline is None
+            else max(0.0, deadline - loop.time()))
+    except asyncio.CancelledError:
+        talking.cancel()
+        await terminate(process)
+        raise
+    finally:
+        stopping.cancel()
+    if talking.done():
+        return True, talking.result()
+    await terminate(process)
+    await talking  # pipes are closed with the process
+    return False, (b"", b"")
+
+
+async def terminate(process: asyncio.subprocess.Process):
+    """
+    stop process with all processes it started, they get
+    TERMINATE_GRACE seconds to exit before they are killed
+    :param process: process started by spawn()
+    :return: None
+    """
+    if process.returncode is not None:
+        return
+    signal_group(process, False)
+    try:
+        await asyncio.wait_for(process.wait(), TERMINATE_GRACE)
+    except asyncio.TimeoutError:
+        signal_group(process, True)
+        await process.wait()
+
+
+def signal_group(process: asyncio.subprocess.Process, kill: bool):
+    """
+    :param process: leader of process group
+    :param kill: kill processes instead of asking them to terminate
+    :return: None
+    """
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL if kill else signal.SIGTERM)
+        else:  # whole tree is killed at once
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                           stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL)
+    except (ProcessLookupError, PermissionError, OSError):
+        pass  # group has already exited
+
+
+def run(command: ConsoleCommand) -> Any:
+    """
+    execute command in a new event loop, for scripts
+    :param command: command to execute
+    :return: result of the command
+    """
+    asyncio.run(execute(command))
+    return command.result
+
+
+async def spawn(args, cwd: Optional[str]) -> asyncio.subprocess.Process:
+    """
+    :param args: shell text or list of program arguments
+    :param cwd: working directory
+    :return: started process with all streams piped,
+    leading new process group
+    """
+    pipes = dict(stdin=asyncio.subprocess.PIPE,
+                 stdout=asyncio.subprocess.PIPE,
+                 stderr=asyncio.subprocess.PIPE, cwd=cwd)
+    # own process group, so cancellation reaches processes git starts
+    if os.name == "posix":
+        pipes["start_new_session"] = True
+    else:
+        pipes["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    if isinstance(args, str):
+        return await asyncio.create_subprocess_shell(args, **pipes)
+    return await asyncio.create_subprocess_exec(*args, **pipes)
+
+
+async def stream(command: ConsoleCommand, process: asyncio.subprocess.Process,
+                 data: Optional[bytes], partial: Optional[Partial])\
+        -> Tuple[bytes, bytes]:
+    """
+    pass stdout and stderr of the process to command in chunks
+    as they arrive, stdin is served concurrently, so pipes can't block
+    :param command: streaming command
+    :param process: started process with all streams piped
+    :param data: data fed to stdin
+    :param partial: callback receiving partial results
+    :return: empty stdout, as it was consumed by command, and stderr
+    """
+    def report(result: Any):
+        if result is not None and partial is not None:
+            partial(result)
+
+    async def write():
+        try:
+            if data is not None:
+                process.stdin.write(data)
+                await process.stdin.drain()
+            process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # process exited without reading everything
+
+    async def read_errors() -> bytes:
+        chunks = []
+        while True:
+            chunk = await process.stderr.read(STREAM_CHUNK)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+            report(command.feed_error(chunk))
+
+    writer = asyncio.ensure_future(write())
+    errors = asyncio.ensure_future(read_errors())
+    while True:
+        chunk = await process.stdout.read(STREAM_CHUNK)
+        if not chunk:
+            break
+        command.trace.output_size += len(chunk)
+        with command.trace.span("parse"):
+            result = command.feed(chunk)
+        report(result)
+    await process.wait()
+    await writer
+    return b"", await errors
+
+
+def retry_delay(command: GitPushCommand) -> Optional[float]:
+    """
+    :param command: failed push
+    :return: seconds to wait before the next attempt,
+    None if push should not be repeated
+    """
+    if isinstance(command.result, (PushRejected, CommandCancelled)) \
+            or command.attempt > PUSH_RETRIES:
+        return None
+    return PUSH_RETRY_DELAY * 2 ** (command.attempt - 1)
+
+
+def plan_commit(known: FileTable, files: FileTable)\
+        -> Tuple[List[str], List[str]]:
+    """
+    :param known: snapshot of git state
+    :param files: snapshot with commit choice of the user
+    :return: paths to add and paths to reset,
+    raises NothingChanged if there is nothing to commit
+    """
+    paths = files.paths
+    if paths is known.paths:  # choices over the current snapshot
+        # rows are read from masks, choices are not looked at one by one
+        chosen, committed = mask_value(files.tracked_mask), \
+            mask_value(known.tracked_mask)
+        files_to_commit = [paths[row] for row in mask_rows(
+            value_mask(chosen & ~committed, files))]
+        reset_rows = mask_rows(value_mask(committed & ~chosen, files))
+    else:
+        known_rows = [known.row(path) for path in paths]
+        changed = [
+            row for row, known_row in enumerate(known_rows)
+            if files.is_tracked(row) != (
+                known_row is not None and known.is_tracked(known_row))
+        ]
+        files_to_commit = [
+            paths[row] for row in changed if files.is_tracked(row)]
+        reset_rows = [row for row in changed if not files.is_tracked(row)]
+    files_to_reset = [paths[row] for row in reset_rows]
+    # staged rename also removed original path from index, it is put back
+    files_to_reset += [
+        files.orig_paths[row] for row in reset_rows
+        if row in files.orig_paths and files.staged[row] in MOVED_CODES
+    ]
+    if not (files_to_commit or files_to_reset or any(known.tracked_mask)):
+        raise NothingChanged()
+    return files_to_commit, files_to_reset
+
+
+def queried_directories(files: FileTable, directories: List[str])\
+        -> List[str]:
+    """
+    git reports wholly untracked directory as one entry,
+    so it is queried as a whole to get the same entry again
+    :param files: current snapshot
+    :param directories: changed directories, like 'a/b/'
+    :return: directories to query status for
+    """
+    untracked = tuple(
+        path for row, path in enumerate(files.paths)
+        if path.endswith("/") and files.is_untracked(row)
+    )
+    queried = set()
+    for directory in directories:
+        queried.add(next(
+            (path for path in untracked if directory.startswith(path)),
+            directory
+        ))
+    return sorted(queried)
+
+
+def merge(known: FileTable, directories: List[str], files: FileTable)\
+        -> FileTable:
+    """
+    :param known: current snapshot
+    :param directories: directories status was queried for
+    :param files: status of files in these directories
+    :return: known files with ones in directories replaced
+    """
+    prefixes = tuple(directories)
+    return FileTable.from_entries(sorted(
+        [file for file in known if not file.path.startswith(prefixes)]
+        + list(files),
+        key=lambda file: (file.untracked, file.path)
+    ))
+
+
+def keep_untracked(path: str, known: FileTable, files: FileTable)\
+        -> FileTable:
+    """
+    Untracked files of status skipping them are taken from previous
+    snapshot: removed ones and ones staged since are left out.
+    Files committed since they were untracked are listed until
+    the next status listing untracked files
+    :param path: path to the root of working tree
+    :param known: current snapshot
+    :param files: status of repository without untracked files
+    :return: files with untracked files of known snapshot appended
+    """
+    tracked = set(files.paths)
+    return FileTable.from_entries(list(files) + [
+        known[row] for row in range(len(known))
+        if known.is_untracked(row) and known.paths[row] not in tracked
+        and os.path.lexists(os.path.join(path, known.paths[row]))
+    ])
+
+
+class GitEngine:
+    """
+    Repository session without Qt: keeps status snapshot of one
+    working tree, refreshes it and commits choices of the user
+    """
+    def __init__(self, path: str, cache: Optional[StatusCache] = None,
+                 index_status: bool = GIT_INDEX_STATUS):
+        """
+        :param path: path to the root of working tree
+        :param cache: status cache shared between sessions
+        :param index_status: read status in-process when possible
+        """
+        self.path = path
+        self.cache = cache
+        self.index_status = index_status
+        self.files = FileTable()
+        self.branch = None  # type: Optional[BranchInfo]
+        self.__refs = None  # type: Optional[RefReader]
+
+    @property
+    def refs(self) -> Optional[RefReader]:
+        """
+        :return: ref reader of repository, None if path is not
+        a root of working tree
+        """
+        if self.__refs is None:
+            git_dir = find_git_dir(self.path)
+            if git_dir is not None:
+                self.__refs = RefReader(git_dir)
+        return self.__refs
+
+    def branch_command(self) -> GitBranchCommand:
+        """
+        :return: command reading branch header,
+        raises NotAGitRepository if path is not a root of working tree
+        """
+        if self.refs is None:
+            raise NotAGitRepository()
+        return GitBranchCommand(self.path, self.refs)
+
+    async def update_branch(self) -> BranchInfo:
+        """
+        read HEAD, upstream and ahead/behind counts without 'git status'
+        :return: branch header, raises GitException on error
+        """
+        command = self.branch_command()
+        try:
+            await execute(command)
+            return self.apply_branch(command)
+        finally:
+            tracer.publish(command.trace)
+
+    async def status(self, partial: Optional[Callable[[FileDelta], None]]
+                     = None) -> FileDelta:
+        """
+        query status of whole repository
+        :param partial: callback receiving changes while status is
+        streamed, status is not streamed if None
+        :return: changes of snapshot, raises GitException on error
+        """
+        command_class = IndexStatusCommand if self.index_status \
+            else GitStatusCommand
+        command = command_class(self.path, cache=self.cache,
+                                stream=partial is not None)
+
+        def update(files: FileTable):
+            with command.trace.span("populate"):
+                partial(self.replace(files))
+
+        try:
+            await execute(command, partial=update)
+            with command.trace.span("populate"):
+                return self.apply(command)
+        finally:
+            tracer.publish(command.trace)
+
+    def refresh_command(self, directories: List[str])\
+            -> Optional[GitStatusCommand]:
+        """
+        forget cached status and make command re-querying
+        status only for changed directories
+        :param directories: directories relative to path, like 'a/b/',
+        '' for root directory
+        :return: status command or None if files of root are changed,
+        whole tree is listed then
+        """
+        if self.cache is not None:
+            self.cache.invalidate(GitStatusCommand.normalize(self.path))
+        if "" in directories:
+            return None
+        return GitStatusCommand(
+            self.path, queried_directories(self.files, directories))
+
+    async def refresh(self, directories: List[str]) -> FileDelta:
+        """
+        re-query status only for changed directories
+        :param directories: directories relative to path, like 'a/b/',
+        '' for root directory
+        :return: changes of snapshot, raises GitException on error
+        """
+        command = self.refresh_command(directories)
+        if command is None:
+            return await self.status()
+        try:
+            await execute(command)
+            with command.trace.span("populate"):
+                return self.apply(command)
+        finally:
+            tracer.publish(command.trace)
+
+    async def commit(self, files: FileTable, message: str, push: bool = True,
+                     progress: Optional[Progress] = None,
+                     push_progress: Optional[Callable[[PushProgress], None]]
+                     = None):
+        """
+        stage choices of the user, commit and push
+        :param files: snapshot with commit choice of the user
+        :param message: commit message
+        :param push: push commit to upstream
+        :param progress: callback receiving number of finished and all steps
+        :param push_progress: callback receiving progress of push
+        :return: None, raises GitException on error
+        """
+        files_to_commit, files_to_reset = plan_commit(self.files, files)
+        command = GitCommitSequenceCommand(
+            self.path, files_to_commit, files_to_reset, message)
+        await execute(command, progress)
+        tracer.publish(command.trace)
+        if isinstance(command.result, GitException):
+            raise command.result
+        if push:
+            await self.push(push_progress)
+
+    async def push(self, progress: Optional[Callable[[PushProgress], None]]
+                   = None):
+        """
+        push current branch, failed push is repeated
+        after growing delays unless remote rejected it
+        :param progress: callback receiving progress of push
+        :return: None, raises GitException on error
+        """
+        attempt = 1
+        while True:
+            command = GitPushCommand(self.path, attempt)
+            await execute(command, partial=progress)
+            tracer.publish(command.trace)
+            if not isinstance(command.result, GitException):
+                return
+            delay = retry_delay(command)
+            if delay is None:
+                raise command.result
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def apply_branch(self, command: GitBranchCommand) -> BranchInfo:
+        """
+        :param command: executed branch command
+        :return: branch header, raises GitException on error
+        """
+        if isinstance(command.result, GitException):
+            raise command.result
+        self.branch = command.result
+        return self.branch
+
+    def apply(self, command: GitStatusCommand) -> FileDelta:
+        """
+        :param command: executed status command
+        :return: changes of snapshot, raises GitException on error
+        """
+        if isinstance(command.result, GitException):
+            raise command.result
+        # status read in-process knows no upstream, the known one
+        # is kept until branch command reads it
+        if command.branch is not None \
+                and (not command.in_process or self.branch is None):
+            self.branch = command.branch
+        if command.directories is not None:
+            return self.replace(
+                merge(self.files, command.directories, command.result))
+        if command.untracked == UntrackedMode.none:
+            return self.replace(
+                keep_untracked(self.path, self.files, command.result))
+        return self.replace(command.result)
+
+    def replace(self, files: FileTable) -> FileDelta:
+        """
+        :param files: new snapshot
+        :return: changes from previous snapshot
+        """
+        previous, self.files = self.files, files
+        return files.diff(previous)
@@ -8,3 +8,15 @@ class NotAGitRepository(GitException):
 
 class NothingChanged(GitException):
     pass
+
+
+class CommandCancelled(GitException):
+    pass
+
+
+class CommandTimedOut(CommandCancelled):
+    pass
+
+
+class PushRejected(GitException):
+    pass
@@ -1,78 +1,105 @@
-from typing import Iterable
+import os
+from typing import List, Optional
 
-from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
 
-from model.file import PQFileModel
+from config import GIT_INDEX_STATUS, PUSH_AFTER_COMMIT, STATUS_ADAPTIVE, \
+    STATUS_CACHE, STATUS_SNAPSHOT, STATUS_STREAM, WATCH_REPOSITORY
+from .cache import DiffCache, StatusCache
+from model.diff import DiffText
+from model.file_table import FileDelta, FileRow, FileTable
+from model.push import PushProgress, PushState
 from .cmd import PQCmd
-from .commands import ConsoleCommand, GitStatusCommand, GitCommitSequenceCommand
-from .exceptions import GitException, NothingChanged
+from .commands import ConsoleCommand, FolderCommand, GitStatusCommand,\
+    IndexStatusCommand, GitBranchCommand, GitCommitSequenceCommand, \
+    GitDiffCommand, GitPushCommand, EnableFastStatusCommand, \
+    PRIORITY_BACKGROUND, PRIORITY_USER
+from .engine import GitEngine, plan_commit, retry_delay
+from .exceptions import GitException
+from .snapshot import Snapshot, load_snapshot, save_snapshot
+from .strategy import StatusStrategy, UntrackedMode, missing_fast_config
+from .trace import CommandTrace, tracer
+from .watcher import PQRepoWatcher
 
 
 class PQGitSpeaker(QObject):
     """
-    Facade, providing API for Cmd speaking thread
+    Facade, providing API for Cmd speaking thread.
+    Qt adapter over git.engine.GitEngine: commands are executed
+    by PQCmd threads, results are applied to the engine snapshot
+    and reported with signals
     """
 
     # signals
     aborted = pyqtSignal()
     error_occurred = pyqtSignal(GitException)
-    got_files = pyqtSignal(list)
-    pushed = pyqtSignal()
+    files_changed = pyqtSignal(FileDelta)  # status snapshot was replaced
+    pushed = pyqtSignal()  # commit is done, it is pushed in background
+    commit_progress = pyqtSignal(int, int)  # finished and all commit steps
+    push_state_changed = pyqtSignal(object, str)  # PushState and message
+    push_progress = pyqtSignal(PushProgress)
+    # path, seconds of status and config variables which would speed it up
+    status_slow = pyqtSignal(str, float, list)
+    stale_changed = pyqtSignal(bool)  # files are saved snapshot, refreshed
+    branch_changed = pyqtSignal(object)  # BranchInfo or None
+    traced = pyqtSignal(CommandTrace)  # command result is applied
+    diff_loaded = pyqtSignal(DiffText)
 
     def __init__(self):
         super().__init__()
         self.cmd = PQCmd()
         self.cmd.start()
-        self.__path = None
-        self.__files = []
+        self.__engine = None  # type: Optional[GitEngine]
         self.cmd.executed.connect(self.dispatch)
+        self.cmd.progress.connect(self.dispatch_progress)
+        self.cmd.partial.connect(self.dispatch_partial)
+        self.cache = StatusCache() if STATUS_CACHE else None
+        self.diffs = DiffCache()
+        self.strategy = StatusStrategy()
+        self.__suggested = set()  # repositories faster config was offered for
+        self.stale = False
+        self.watcher = PQRepoWatcher()
+        self.watcher.repository_changed.connect(self.rescan)
+        self.watcher.directories_changed.connect(self.refresh_directories)
+        self.push_state = PushState.idle
+        self.__push = None  # type: Optional[GitPushCommand]
+        self.__push_again = False  # commit was made while pushing
+        self.push_timer = QTimer(self)
+        self.push_timer.setSingleShot(True)
+        self.push_timer.timeout.connect(self.retry_push)
+        self.__attempt = 1  # attempt of push planned by timer
 
     def reset(self):
         """
         Reset all changes
         :return: None
         """
-        self.__path = None
-        self.__files = []
+        self.__engine = None
+        self.watcher.stop()
+        self.forget_push()
+        self.set_stale(False)
+        self.branch_changed.emit(None)
 
-    def push(self, files: Iterable[PQFileModel], message: str):
+    def push(self, files: FileTable, message: str):
         """
+        commit choices of the user, pushed signal is emitted when
+        commit is done, it is pushed in background after that
         :param message: commit message
-        :param files: list of files with their state tu actualize 
-        :return: None 
+        :param files: snapshot with commit choice of the user
+        :return: None
         """
-        tracked_in_git = set()
-        not_tracked_in_git = set()
-        user_wants_to_add = set()
-        user_dont_want_to_add = set()
-
-        for file in self.files:
-            if file.tracked:
-                tracked_in_git.add(file.path)
-            else:
-                not_tracked_in_git.add(file.path)
-
-        for file in files:
-            if file.tracked:
-                user_wants_to_add.add(file.path)
-            else:
-                user_dont_want_to_add.add(file.path)
-
-        files_to_commit = user_wants_to_add - tracked_in_git
-        files_to_reset = user_dont_want_to_add - not_tracked_in_git
-
-        commit_changes = tracked_in_git | files_to_commit | files_to_reset
-
-        if not commit_changes:
-            self.error_occurred.emit(NothingChanged())
-        else:
-            self.cmd.execute(
-                GitCommitSequenceCommand(
-                    self.__path,
-                    files_to_commit,
-                    files_to_reset,
-                    message)
-            )
+        try:
+            files_to_commit, files_to_reset = plan_commit(self.files, files)
+        except GitException as e:
+            self.error_occurred.emit(e)
+            return
+        self.cmd.execute(
+            GitCommitSequenceCommand(
+                self.path,
+                files_to_commit,
+                files_to_reset,
+                message)
+        )
 
     @pyqtSlot(str)
     def set_path(self, path: str):
@@ -81,8 +108,59 @@ class PQGitSpeaker(QObject):
         :param path: git folder path
         :return: None
         """
-        self.__path = path
+        self.open(path)
+        self.get_files()
+
+    def open(self, path: str):
+        """
+        start session of repository without querying its status
+        :param path: git folder path
+        :return: None
+        """
+        self.__engine = GitEngine(path, self.cache, GIT_INDEX_STATUS)
+        self.forget_push()
+        self.set_stale(False)
+        self.branch_changed.emit(None)
+        if WATCH_REPOSITORY:
+            self.watcher.watch(path)
+
+    def restore_snapshot(self, file: str = STATUS_SNAPSHOT) -> bool:
+        """
+        Show files of repository saved on previous exit at once,
+        they are marked stale until fresh status replaces them,
+        so only rows changed since are updated then
+        :param file: path of snapshot file
+        :return: True if snapshot is restored
+        """
+        snapshot = load_snapshot(file) if file else None
+        if snapshot is None or not os.path.isdir(snapshot.path):
+            return False
+        self.open(snapshot.path)
+        self.__engine.branch = snapshot.branch
+        self.branch_changed.emit(snapshot.branch)
+        self.set_stale(True)
+        self.files_changed.emit(self.__engine.replace(snapshot.files))
         self.get_files()
+        return True
+
+    def save_snapshot(self, file: str = STATUS_SNAPSHOT):
+        """
+        save fresh status of current repository for the next launch
+        :param file: path of snapshot file
+        :return: None
+        """
+        if not file or self.__engine is None or self.stale:
+            return
+        try:
+            save_snapshot(file, Snapshot(
+                self.path, self.__engine.branch, self.files))
+        except OSError:  # snapshot only speeds up next launch
+            pass
+
+    def set_stale(self, stale: bool):
+        if stale != self.stale:
+            self.stale = stale
+            self.stale_changed.emit(stale)
 
     @pyqtSlot()
     def abort(self):
@@ -94,29 +172,364 @@ class PQGitSpeaker(QObject):
         self.cmd.abort()
         self.aborted.emit()
 
+    @pyqtSlot()
+    def cancel(self):
+        """
+        stop running and planned commands, repository stays open,
+        stopped commands report git.exceptions.CommandCancelled
+        :return: None
+        """
+        self.push_timer.stop()
+        if self.__push in self.cmd.abort():  # push did not start
+            self.__push = None
+            self.set_push_state(PushState.failed, "push cancelled")
+        elif self.push_state == PushState.waiting:
+            self.set_push_state(PushState.failed, "push cancelled")
+
+    @pyqtSlot()
+    def push_commits(self):
+        """
+        push current branch in background, push requested
+        while another one runs follows it
+        :return: None
+        """
+        self.push_timer.stop()
+        if self.__push is not None:
+            self.__push_again = True
+            return
+        self.start_push(1)
+
+    @pyqtSlot()
+    def retry_push(self):
+        """
+        repeat failed push planned by timer
+        :return: None
+        """
+        if self.__push is None and self.path:
+            self.start_push(self.__attempt)
+
+    def start_push(self, attempt: int):
+        """
+        :param attempt: number of attempt to push same commits
+        :return: None
+        """
+        if not self.path:
+            return
+        self.__push = GitPushCommand(self.path, attempt)
+        self.__push_again = False
+        self.set_push_state(PushState.pushing,
+                            "" if attempt == 1 else "attempt {}".format(attempt))
+        self.cmd.execute(self.__push)
+
+    def forget_push(self):
+        """
+        stop following push of previous repository,
+        running push is finished but its result is ignored
+        :return: None
+        """
+        self.push_timer.stop()
+        self.__push = None
+        self.__push_again = False
+        self.set_push_state(PushState.idle, "")
+
+    def set_push_state(self, state: PushState, message: str):
+        self.push_state = state
+        self.push_state_changed.emit(state, message)
+
     @pyqtSlot()
     def get_files(self):
-        print(self.__path)
-        self.cmd.execute(GitStatusCommand(self.__path))
+        self.query_status(PRIORITY_USER, self.untracked_mode(False))
+
+    @pyqtSlot()
+    def refresh(self):
+        """
+        query status the user asked for bypassing the cache: its
+        fingerprint misses writes to existing files, which only
+        the watcher reports
+        :return: None
+        """
+        self.invalidate_cache()
+        self.get_files()
+
+    def query_status(self, priority: int,
+                     untracked: UntrackedMode = UntrackedMode.configured):
+        """
+        query status of whole repository, pending queries
+        of the repository are merged into this one
+        :param priority: git.commands.PRIORITY_USER or PRIORITY_BACKGROUND
+        :param untracked: how untracked files are listed
+        :return: None
+        """
+        command_class = IndexStatusCommand if GIT_INDEX_STATUS \
+            else GitStatusCommand
+        # files are streamed into empty list only, refreshes of shown
+        # list are applied at once to not blink
+        command = command_class(
+            self.path, cache=self.cache,
+            stream=STATUS_STREAM and not self.files,
+            untracked=untracked
+        )
+        command.priority = priority
+        self.cmd.execute(command)
+
+    def query_branch(self):
+        """
+        read branch header apart from status, so status is not
+        delayed by counting commits ahead of and behind upstream
+        :return: None
+        """
+        if self.__engine is None or self.__engine.refs is None:
+            return
+        self.cmd.execute(self.__engine.branch_command())
+
+    def untracked_mode(self, rescan: bool) -> UntrackedMode:
+        """
+        :param rescan: status is background rescan after index change
+        :return: untracked mode chosen by durations of previous scans
+        """
+        if not STATUS_ADAPTIVE or not self.path:
+            return UntrackedMode.configured
+        repository = FolderCommand.normalize(self.path)
+        if rescan:
+            return self.strategy.rescan_mode(repository)
+        return self.strategy.scan_mode(repository)
+
+    def record_status(self, command: GitStatusCommand):
+        """
+        remember duration of full scan, offer faster config
+        once when repository turns out to be slow
+        :param command: successful status command
+        :return: None
+        """
+        if command.directories is not None or command.cached \
+                or command.untracked == UntrackedMode.none \
+                or not command.trace.duration("git"):
+            return
+        repository = command.repository
+        self.strategy.record(repository, command.untracked,
+                             command.trace.duration("git"))
+        if not STATUS_ADAPTIVE or not self.strategy.is_slow(repository) \
+                or repository in self.__suggested:
+            return
+        self.__suggested.add(repository)
+        names = missing_fast_config(command.path)
+        if names:
+            self.status_slow.emit(command.path,
+                                  self.strategy.duration(repository), names)
+
+    def enable_fast_status(self, names: List[str]):
+        """
+        turn on config variables the user agreed to
+        :param names: variables of status_slow signal
+        :return: None
+        """
+        if self.path:
+            self.cmd.execute(EnableFastStatusCommand(self.path, names))
+
+    def load_diff(self, file: FileRow):
+        """
+        show diff of file, cached diff is emitted at once
+        :param file: row of current snapshot
+        :return: None
+        """
+        if not self.path:
+            return
+        command = self.diff_command(file)
+        cached = command.cached()
+        if cached is not None:
+            self.diff_loaded.emit(cached)
+        else:
+            self.cmd.execute(command)
+
+    def prefetch_diffs(self, files: List[FileRow]):
+        """
+        load diffs of files into cache in background
+        :param files: rows of current snapshot
+        :return: None
+        """
+        if not self.path:
+            return
+        for file in files:
+            command = self.diff_command(file)
+            if command.cached() is None:
+                command.prefetch = True
+                command.priority = PRIORITY_BACKGROUND
+                self.cmd.execute(command)
+
+    def diff_command(self, file: FileRow) -> GitDiffCommand:
+        return GitDiffCommand(self.path, file.path, file.orig_path,
+                              file.untracked, self.diffs)
+
+    @pyqtSlot()
+    def rescan(self):
+        """
+        query status of whole repository bypassing the cache
+        :return: None
+        """
+        self.invalidate_cache()
+        self.query_status(PRIORITY_BACKGROUND, self.untracked_mode(True))
+
+    @pyqtSlot(list)
+    def refresh_directories(self, directories: List[str]):
+        """
+        re-query status only for changed directories
+        :param directories: directories relative to path, like 'a/b/',
+        '' for root directory
+        :return: None
+        """
+        if self.__engine is None:
+            return
+        command = self.__engine.refresh_command(directories)
+        if command is None:  # files of root, whole tree is listed
+            self.query_status(PRIORITY_BACKGROUND, self.untracked_mode(False))
+            return
+        command.priority = PRIORITY_BACKGROUND
+        self.cmd.execute(command)
 
     @pyqtSlot(ConsoleCommand)
     def dispatch(self, executed_command: ConsoleCommand):
+        """
+        apply result of executed command, its trace is published after
+        :param executed_command: command executed by PQCmd
+        :return: None
+        """
+        try:
+            self.dispatch_result(executed_command)
+        finally:
+            tracer.publish(executed_command.trace)
+            self.traced.emit(executed_command.trace)
+
+    def dispatch_result(self, executed_command: ConsoleCommand):
+        if isinstance(executed_command, GitDiffCommand):
+            self.dispatch_diff(executed_command)
+            return
+
+        if isinstance(executed_command, GitPushCommand):
+            self.dispatch_push(executed_command)
+            return
+
+        # results of previously opened repository are dropped: status
+        # would be merged into files of the current one, commit would
+        # refresh and push the current one
+        if isinstance(executed_command, (
+                GitStatusCommand, GitBranchCommand, EnableFastStatusCommand,
+                GitCommitSequenceCommand)) \
+                and executed_command.path != self.path:
+            return
+
         if isinstance(executed_command.result, GitException):
             self.error_occurred.emit(executed_command.result)
             return
 
         if isinstance(executed_command, GitStatusCommand):
-            self.__files = executed_command.result
-            self.got_files.emit(executed_command.result)
+            self.record_status(executed_command)
+            if self.__engine is not None:
+                # list is updated by directly connected slots
+                with executed_command.trace.span("populate"):
+                    self.files_changed.emit(
+                        self.__engine.apply(executed_command))
+                if executed_command.directories is None:
+                    self.set_stale(False)
+                    # cached and in-process status may miss upstream
+                    if executed_command.cached \
+                            or executed_command.in_process:
+                        self.query_branch()
+                    else:
+                        self.branch_changed.emit(self.__engine.branch)
+
+        elif isinstance(executed_command, GitBranchCommand):
+            if self.__engine is not None:
+                self.branch_changed.emit(
+                    self.__engine.apply_branch(executed_command))
+
+        elif isinstance(executed_command, EnableFastStatusCommand):
+            self.invalidate_cache()  # see how much faster status is
+            # it is measured again in configured mode
+            self.strategy.forget(executed_command.repository)
+            self.query_status(PRIORITY_BACKGROUND, self.untracked_mode(False))
 
         elif isinstance(executed_command, GitCommitSequenceCommand):
             self.pushed.emit()
-            self.get_files()  # refresh changes
+            # committed files may be untracked before, so they are listed
+            self.query_status(PRIORITY_BACKGROUND, self.untracked_mode(False))
+            if PUSH_AFTER_COMMIT:
+                self.push_commits()
+
+    def dispatch_push(self, command: GitPushCommand):
+        """
+        follow finished push: failed one is repeated after delay
+        unless remote rejected it or it was cancelled
+        :param command: executed push command
+        :return: None
+        """
+        if command is not self.__push:
+            return  # push of previous repository
+        self.__push = None
+        if not isinstance(command.result, GitException):
+            if self.__push_again:
+                self.start_push(1)
+                return
+            self.set_push_state(PushState.pushed, "")
+            self.query_status(  # upstream is changed
+                PRIORITY_BACKGROUND, self.untracked_mode(False))
+            return
+        delay = retry_delay(command)
+        if delay is None:
+            self.set_push_state(PushState.failed, str(command.result))
+            self.error_occurred.emit(command.result)
+            return
+        self.__attempt = command.attempt + 1
+        self.set_push_state(PushState.waiting, "retry in {:g} s: {}".format(
+            delay, command.result))
+        self.push_timer.start(int(delay * 1000))
+
+    def dispatch_diff(self, command: GitDiffCommand):
+        """
+        show loaded diff, failure is shown in place of diff
+        :param command: executed diff command
+        :return: None
+        """
+        if command.prefetch:
+            return
+        if isinstance(command.result, GitException):
+            self.diff_loaded.emit(DiffText(command.file, str(command.result)))
+        else:
+            self.diff_loaded.emit(command.result)
+
+    @pyqtSlot(ConsoleCommand, object)
+    def dispatch_partial(self, command: ConsoleCommand, result: object):
+        """
+        show files of status which is still running
+        :param command: streaming command
+        :param result: its partial result
+        :return: None
+        """
+        if isinstance(command, GitStatusCommand) \
+                and self.__engine is not None and command.path == self.path:
+            with command.trace.span("populate"):
+                self.files_changed.emit(self.__engine.replace(result))
+        elif isinstance(command, GitPushCommand) and command is self.__push:
+            self.push_progress.emit(result)
+
+    @pyqtSlot(ConsoleCommand, int, int)
+    def dispatch_progress(self, command: ConsoleCommand, done: int, total: int):
+        if isinstance(command, GitCommitSequenceCommand):
+            self.commit_progress.emit(done, total)
+
+    def invalidate_cache(self):
+        """
+        forget cached status of current repository, watcher sees writes
+        to existing files the fingerprint of the cache does not cover
+        :return: None
+        """
+        if self.cache is not None and self.path:
+            self.cache.invalidate(FolderCommand.normalize(self.path))
 
     @property
-    def files(self):
-        return self.__files
+    def files(self) -> FileTable:
+        return self.__engine.files if self.__engine is not None \
+            else FileTable()
 
     @property
-    def path(self):
-        return self.__path
+    def path(self) -> Optional[str]:
+        return self.__engine.path if self.__engine is not None else None
@@ -0,0 +1,115 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+TRUE_VALUES = ("true", "yes", "on", "1")
+FALSE_VALUES = ("false", "no", "off", "0", "")
+
+section_line = re.compile(r'\s*\[\s*([\w.-]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+variable_line = re.compile(r'\s*([A-Za-z][\w-]*)\s*(?:=\s*(.*))?$')
+
+
+def config_paths(git_dir: str) -> List[str]:
+    """
+    :param git_dir: path to .git directory
+    :return: system, global and repository config files,
+    later ones override values of earlier ones
+    """
+    home = os.path.expanduser("~")
+    xdg = os.environ.get("XDG_CONFIG_HOME") or os.path.join(home, ".config")
+    return [
+        os.path.join(os.sep, "etc", "gitconfig"),
+        os.path.join(xdg, "git", "config"),
+        os.path.join(home, ".gitconfig"),
+        os.path.join(git_dir, "config"),
+    ]
+
+
+def parse_value(raw: str) -> str:
+    """
+    strip comments and quotes, unescape value
+    :param raw: text after '=' in config line
+    :return: value
+    """
+    value, quoted, i = [], False, 0
+    while i < len(raw):
+        char = raw[i]
+        if char == '"':
+            quoted = not quoted
+        elif char == "\\" and i + 1 < len(raw):
+            i += 1
+            value.append({"n": "\n", "t": "\t", "b": "\b"}.get(raw[i], raw[i]))
+        elif char in "#;" and not quoted:
+            break
+        else:
+            value.append(char)
+        i += 1
+    return "".join(value).strip()
+
+
+def read_config(paths: List[str]) -> Dict[str, str]:
+    """
+    Read git config files, section and variable names are lowercased,
+    subsection names are kept as is: 'branch.Master.remote'.
+    Includes are not followed
+    :param paths: config files in order of increasing priority
+    :return: mapping of full variable names to values
+    """
+    config = {}
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8", errors="surrogateescape") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        section = None
+        for line in lines:
+            stripped = line.strip()
+            if not stripped or stripped[0] in "#;":
+                continue
+            match = section_line.match(line)
+            if match is not None:
+                name, subsection = match.groups()
+                name = name.lower()
+                if subsection is None and "." in name:  # [section.sub]
+                    name, _, subsection = name.partition(".")
+                section = name if subsection is None \
+                    else name + "." + re.sub(r"\\(.)", r"\1", subsection)
+                line = line[match.end():]
+                if not line.strip():
+                    continue
+            match = variable_line.match(line)
+            if section is None or match is None:
+                continue
+            key, raw = match.groups()
+            value = "true" if raw is None else parse_value(raw)
+            config[section + "." + key.lower()] = value
+    return config
+
+
+def boolean(config: Dict[str, str], key: str, default: bool) -> bool:
+    """
+    :param config: mapping returned by read_config
+    :param key: full variable name
+    :param default: value if variable is not set
+    :return: boolean value of variable
+    """
+    value = config.get(key)
+    if value is None:
+        return default
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    return default
+
+
+def path_value(config: Dict[str, str], key: str) -> Optional[str]:
+    """
+    :param config: mapping returned by read_config
+    :param key: full variable name
+    :return: value with expanded '~' or None if variable is not set
+    """
+    value = config.get(key)
+    return os.path.expanduser(value) if value else None
@@ -0,0 +1,136 @@
+import os
+import re
+from typing import List, NamedTuple, Optional, Pattern
+
+
+class IgnorePattern(NamedTuple):
+    """
+    One compiled line of .gitignore-like file
+    """
+    regex: Pattern
+    base: str  # directory of ignore file relative to worktree root, '' or 'a/b/'
+    negated: bool
+    directory_only: bool
+    basename_only: bool  # pattern without slash matches name on any level
+
+
+def translate(pattern: str) -> str:
+    """
+    translate gitignore wildcard pattern to regular expression
+    :param pattern: pattern without negation, trailing and leading slash
+    :return: regular expression source
+    """
+    result, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**", i) and (i == 0 or pattern[i - 1] == "/"):
+            if i + 2 == len(pattern):  # trailing '/**'
+                result.append(".*")
+                i += 2
+                continue
+            if pattern[i + 2] == "/":  # leading or inner '**/'
+                result.append("(?:.*/)?")
+                i += 3
+                continue
+        if char == "*":
+            result.append("[^/]*")
+        elif char == "?":
+            result.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                result.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                result.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            result.append(re.escape(pattern[i]))
+        else:
+            result.append(re.escape(char))
+        i += 1
+    return "".join(result) + r"\Z"
+
+
+def compile_line(line: str, base: str, flags: int) -> Optional[IgnorePattern]:
+    """
+    :param line: line of ignore file
+    :param base: directory of ignore file relative to worktree root
+    :param flags: regular expression flags
+    :return: compiled pattern or None for blank lines and comments
+    """
+    line = line.rstrip("\n")
+    while line.endswith(" ") and not line.endswith("\\ "):
+        line = line[:-1]
+    if not line or line.startswith("#"):
+        return None
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith("\\"):
+        line = line[1:]
+    directory_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    basename_only = "/" not in line
+    line = line.lstrip("/")
+    return IgnorePattern(
+        re.compile(translate(line), flags), base,
+        negated, directory_only, basename_only
+    )
+
+
+def read_patterns(path: str, base: str, flags: int = 0) -> List[IgnorePattern]:
+    """
+    :param path: path to ignore file
+    :param base: directory of ignore file relative to worktree root
+    :param flags: regular expression flags
+    :return: compiled patterns in file order, empty if file is missing
+    """
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as f:
+            lines = f.readlines()
+    except OSError:
+        return []
+    patterns = (compile_line(line, base, flags) for line in lines)
+    return [pattern for pattern in patterns if pattern is not None]
+
+
+def is_ignored(patterns: List[IgnorePattern], path: str,
+               is_directory: bool) -> bool:
+    """
+    the last matching pattern decides, so more specific files
+    listed later override more generic ones
+    :param patterns: patterns in order of increasing priority
+    :param path: path relative to worktree root
+    :param is_directory: is path a directory
+    :return: is path ignored
+    """
+    name = path.rpartition("/")[2]
+    for pattern in reversed(patterns):
+        if pattern.directory_only and not is_directory \
+                or not path.startswith(pattern.base):
+            continue
+        if pattern.basename_only:
+            matched = pattern.regex.match(name)
+        else:
+            matched = pattern.regex.match(path, len(pattern.base))
+        if matched:
+            return not pattern.negated
+    return False
+
+
+def global_excludes_file(configured: Optional[str]) -> str:
+    """
+    :param configured: value of core.excludesFile
+    :return: path of user-wide ignore file
+    """
+    if configured:
+        return configured
+    xdg = os.environ.get("XDG_CONFIG_HOME") or \
+        os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(xdg, "git", "ignore")
@@ -0,0 +1,172 @@
+import mmap
+import os
+import struct
+from typing import List, NamedTuple, Optional
+
+INDEX_SIGNATURE = b"DIRC"
+SUPPORTED_VERSIONS = (2, 3, 4)
+HASH_SIZE = 20
+
+# entry flags
+ASSUME_VALID = 0x8000
+EXTENDED = 0x4000
+STAGE_MASK = 0x3000
+NAME_MASK = 0x0fff
+# extended entry flags
+SKIP_WORKTREE = 0x4000
+INTENT_TO_ADD = 0x2000
+
+entry_header = struct.Struct(">10I20sH")
+extension_header = struct.Struct(">4sI")
+
+
+class UnsupportedIndex(Exception):
+    """
+    index uses features that are not handled in-process
+    """
+    pass
+
+
+class IndexEntry(NamedTuple):
+    """
+    Stat data and object id of one index entry
+    """
+    path: str
+    ctime: int  # nanoseconds
+    mtime: int  # nanoseconds
+    dev: int
+    ino: int
+    mode: int
+    uid: int
+    gid: int
+    size: int  # truncated to 32 bits
+    oid: bytes
+    flags: int
+    extended_flags: int
+
+    @property
+    def stage(self) -> int:
+        return (self.flags & STAGE_MASK) >> 12
+
+
+class Index:
+    """
+    Decoded content of .git/index
+    """
+    def __init__(self, version: int, entries: List[IndexEntry],
+                 extensions: List[bytes], tree: Optional[str]):
+        """
+        :param version: index format version
+        :param entries: entries sorted by path
+        :param extensions: signatures of present extensions
+        :param tree: root tree id from valid cache-tree extension
+        """
+        self.version = version
+        self.entries = entries
+        self.extensions = extensions
+        self.tree = tree
+
+
+def decode_path(raw: bytes) -> str:
+    return raw.decode("utf-8", "surrogateescape")
+
+
+def read_varint(data, position: int):
+    """
+    :return: offset encoded number used by index v4 path compression
+    and position after it
+    """
+    byte = data[position]
+    position += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = data[position]
+        position += 1
+        value = ((value + 1) << 7) | (byte & 0x7f)
+    return value, position
+
+
+def read_cache_tree(data: bytes) -> Optional[str]:
+    """
+    :param data: TREE extension content
+    :return: hex id of root tree or None if it is invalidated
+    """
+    path_end = data.index(b"\0")
+    counts_end = data.index(b"\n", path_end)
+    entry_count = int(data[path_end + 1:counts_end].split(b" ")[0])
+    if entry_count < 0:
+        return None
+    return data[counts_end + 1:counts_end + 1 + HASH_SIZE].hex()
+
+
+def read_index(path: str) -> Index:
+    """
+    Decode index file of versions 2, 3 and 4
+    :param path: path to index file
+    :return: decoded index
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return Index(2, [], [], None)
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return decode_index(data)
+    finally:
+        data.close()
+
+
+def decode_index(data) -> Index:
+    """
+    :param data: index file content
+    :return: decoded index
+    """
+    signature, version, count = struct.unpack_from(">4sII", data, 0)
+    if signature != INDEX_SIGNATURE or version not in SUPPORTED_VERSIONS:
+        raise UnsupportedIndex("index version {}".format(version))
+
+    entries = []
+    append = entries.append
+    unpack = entry_header.unpack_from
+    position = 12
+    previous = b""
+    for _ in range(count):
+        start = position
+        ctime_s, ctime_ns, mtime_s, mtime_ns, dev, ino, mode, uid, gid, \
+            size, oid, flags = unpack(data, position)
+        position += entry_header.size
+        extended_flags = 0
+        if flags & EXTENDED:
+            extended_flags = struct.unpack_from(">H", data, position)[0]
+            position += 2
+        if version == 4:
+            strip, position = read_varint(data, position)
+            end = data.find(b"\0", position)
+            name = previous[:len(previous) - strip] + data[position:end]
+            position = end + 1
+            previous = name
+        else:
+            length = flags & NAME_MASK
+            if length < NAME_MASK:
+                end = position + length
+            else:
+                end = data.find(b"\0", position)
+            name = data[position:end]
+            # entries are padded with 1-8 NUL bytes to multiple of 8
+            position = start + ((end - start) // 8 + 1) * 8
+        append(IndexEntry(
+            decode_path(name),
+            ctime_s * 1000000000 + ctime_ns, mtime_s * 1000000000 + mtime_ns,
+            dev, ino, mode, uid, gid, size, oid, flags, extended_flags
+        ))
+
+    extensions, tree = [], None
+    end = len(data) - HASH_SIZE
+    while position + extension_header.size <= end:
+        signature, length = extension_header.unpack_from(data, position)
+        position += extension_header.size
+        extensions.append(signature)
+        if signature == b"TREE":
+            tree = read_cache_tree(data[position:position + length])
+        position += length
+    return Index(version, entries, extensions, tree)
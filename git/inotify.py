@@ -0,0 +1,104 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+from typing import List, NamedTuple, Optional
+
+# event masks from <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+DIRECTORY_EVENTS = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO \
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK
+
+event_header = struct.Struct("iIII")
+
+
+class InotifyEvent(NamedTuple):
+    wd: int
+    mask: int
+    name: str
+
+
+class Inotify:
+    """
+    Minimal ctypes binding for Linux inotify, non-blocking descriptor
+    is meant to be polled with QSocketNotifier
+    """
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.__add_watch = libc.inotify_add_watch
+        self.__add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                                     ctypes.c_uint32]
+        self.__rm_watch = libc.inotify_rm_watch
+        self.__rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    @staticmethod
+    def available() -> bool:
+        """
+        :return: can inotify be used on this system
+        """
+        if not hasattr(os, "uname") or os.uname().sysname != "Linux":
+            return False
+        library = ctypes.util.find_library("c")
+        return library is not None and \
+            hasattr(ctypes.CDLL(library), "inotify_init1")
+
+    def add_watch(self, path: str, mask: int = DIRECTORY_EVENTS) -> int:
+        """
+        :param path: path to watch
+        :param mask: events to watch
+        :return: watch descriptor or -1 on error (e.g. watch limit)
+        """
+        return self.__add_watch(self.fd, os.fsencode(path), mask)
+
+    def rm_watch(self, wd: int):
+        self.__rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[InotifyEvent]:
+        """
+        :return: all queued events
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            position = 0
+            while position < len(data):
+                wd, mask, _, length = event_header.unpack_from(data, position)
+                position += event_header.size
+                name = data[position:position + length].rstrip(b"\0")
+                position += length
+                events.append(InotifyEvent(wd, mask, os.fsdecode(name)))
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create() -> Optional[Inotify]:
+    """
+    :return: inotify instance or None if it is not available
+    """
+    try:
+        return Inotify() if Inotify.available() else None
+    except OSError:
+        return None
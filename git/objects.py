@@ -0,0 +1,270 @@
+import glob
+import mmap
+import os
+import struct
+import zlib
+from binascii import unhexlify
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .refs import common_dir
+
+PACK_INDEX_MAGIC = b"\377tOc"
+OBJECT_TYPES = {1: b"commit", 2: b"tree", 3: b"blob", 4: b"tag"}
+OFS_DELTA = 6
+REF_DELTA = 7
+LARGE_OFFSET = 0x80000000
+TREE_MODE = "40000"  # mode of subtree entries in tree objects
+
+
+class ObjectNotFound(Exception):
+    pass
+
+
+class PackIndex:
+    """
+    Memory mapped version 2 pack index with binary search by object id
+    """
+    def __init__(self, index_path: str):
+        """
+        :param index_path: path to .idx file, .pack file is next to it
+        """
+        self.pack_path = index_path[:-len(".idx")] + ".pack"
+        with open(index_path, "rb") as f:
+            self.__data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.__data[:4] != PACK_INDEX_MAGIC or \
+                struct.unpack_from(">I", self.__data, 4)[0] != 2:
+            raise ObjectNotFound("unsupported pack index " + index_path)
+        self.__fanout = struct.unpack_from(">256I", self.__data, 8)
+        self.__count = self.__fanout[255]
+        self.__names = 8 + 256 * 4
+        self.__offsets = self.__names + self.__count * (20 + 4)
+        self.__large_offsets = self.__offsets + self.__count * 4
+
+    def offset(self, oid: bytes) -> Optional[int]:
+        """
+        :param oid: binary object id
+        :return: offset of object in pack or None if it is not there
+        """
+        low = self.__fanout[oid[0] - 1] if oid[0] else 0
+        high = self.__fanout[oid[0]]
+        data, names = self.__data, self.__names
+        while low < high:
+            middle = (low + high) // 2
+            start = names + middle * 20
+            current = data[start:start + 20]
+            if current < oid:
+                low = middle + 1
+            elif current > oid:
+                high = middle
+            else:
+                offset = struct.unpack_from(
+                    ">I", data, self.__offsets + middle * 4)[0]
+                if offset & LARGE_OFFSET:
+                    offset = struct.unpack_from(
+                        ">Q", data, self.__large_offsets +
+                        (offset & ~LARGE_OFFSET) * 8)[0]
+                return offset
+        return None
+
+
+class ObjectReader:
+    """
+    Reader of loose and packed git objects, enough to walk commits
+    and trees without spawning git
+    """
+    def __init__(self, git_dir: str):
+        """
+        :param git_dir: path to repository directory
+        """
+        self.__directories = self.object_directories(
+            os.path.join(common_dir(git_dir), "objects"))
+        self.__packs = None  # type: Optional[List[PackIndex]]
+
+    @staticmethod
+    def object_directories(objects: str) -> List[str]:
+        """
+        :param objects: main objects directory
+        :return: objects directory with its alternates
+        """
+        directories = [objects]
+        try:
+            with open(os.path.join(objects, "info", "alternates"),
+                      encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        directories.append(os.path.join(objects, line))
+        except OSError:
+            pass
+        return directories
+
+    @property
+    def packs(self) -> List[PackIndex]:
+        if self.__packs is None:
+            self.__packs = [
+                PackIndex(path)
+                for directory in self.__directories
+                for path in sorted(glob.glob(
+                    os.path.join(directory, "pack", "*.idx")))
+            ]
+        return self.__packs
+
+    def read(self, oid: str) -> Tuple[bytes, bytes]:
+        """
+        :param oid: hex object id
+        :return: object type and content
+        """
+        for directory in self.__directories:
+            try:
+                with open(os.path.join(directory, oid[:2], oid[2:]), "rb") as f:
+                    raw = zlib.decompress(f.read())
+            except OSError:
+                continue
+            header, _, content = raw.partition(b"\0")
+            return header.split(b" ")[0], content
+        binary = unhexlify(oid)
+        for pack in self.packs:
+            offset = pack.offset(binary)
+            if offset is not None:
+                return self.__read_packed(pack.pack_path, offset)
+        raise ObjectNotFound(oid)
+
+    def __read_packed(self, pack_path: str, offset: int) -> Tuple[bytes, bytes]:
+        """
+        read pack entry resolving delta chain
+        :param pack_path: path to .pack file
+        :param offset: offset of entry
+        :return: object type and content
+        """
+        with open(pack_path, "rb") as f:
+            f.seek(offset)
+            header = f.read(32)
+            kind = (header[0] >> 4) & 7
+            position = 1
+            while header[position - 1] & 0x80:
+                position += 1
+            base = None
+            if kind == OFS_DELTA:
+                byte = header[position]
+                position += 1
+                distance = byte & 0x7f
+                while byte & 0x80:
+                    byte = header[position]
+                    position += 1
+                    distance = ((distance + 1) << 7) | (byte & 0x7f)
+                base = self.__read_packed(pack_path, offset - distance)
+            elif kind == REF_DELTA:
+                base = self.read(header[position:position + 20].hex())
+                position += 20
+            f.seek(offset + position)
+            decompressor = zlib.decompressobj()
+            chunks = []
+            while not decompressor.eof:
+                chunk = f.read(65536)
+                if not chunk:
+                    break
+                chunks.append(decompressor.decompress(chunk))
+            content = b"".join(chunks)
+        if base is None:
+            return OBJECT_TYPES[kind], content
+        return base[0], apply_delta(base[1], content)
+
+    def commit_tree(self, oid: str) -> str:
+        """
+        :param oid: hex commit id
+        :return: hex id of commit's root tree
+        """
+        kind, content = self.read(oid)
+        if kind != b"commit" or not content.startswith(b"tree "):
+            raise ObjectNotFound("{} is not a commit".format(oid))
+        return content[5:45].decode("ascii")
+
+    def tree(self, oid: str) -> Dict[str, Tuple[str, str]]:
+        """
+        :param oid: hex tree id
+        :return: octal mode and hex object id of entries by name
+        """
+        kind, content = self.read(oid)
+        if kind != b"tree":
+            raise ObjectNotFound("{} is not a tree".format(oid))
+        entries, position = {}, 0
+        while position < len(content):
+            space = content.index(b" ", position)
+            end = content.index(b"\0", space)
+            name = content[space + 1:end].decode("utf-8", "surrogateescape")
+            entries[name] = (content[position:space].decode("ascii"),
+                             content[end + 1:end + 21].hex())
+            position = end + 21
+        return entries
+
+    def find_entries(self, tree: str, paths: Iterable[str])\
+            -> Dict[str, Tuple[str, str]]:
+        """
+        :param tree: hex id of root tree
+        :param paths: relative paths of files
+        :return: octal mode and hex object id of paths found in tree,
+        only trees of their directories are read, each one once
+        """
+        trees = {"": self.tree(tree)}  # type: Dict[str, Optional[Dict]]
+
+        def directory_entries(directory: str) -> Optional[Dict]:
+            if directory not in trees:
+                parent, _, name = directory.rpartition("/")
+                entries = directory_entries(parent)
+                entry = entries.get(name) if entries is not None else None
+                trees[directory] = self.tree(entry[1]) \
+                    if entry is not None and entry[0] == TREE_MODE else None
+            return trees[directory]
+
+        found = {}
+        for path in paths:
+            directory, _, name = path.rpartition("/")
+            entries = directory_entries(directory)
+            entry = entries.get(name) if entries is not None else None
+            if entry is not None and entry[0] != TREE_MODE:
+                found[path] = entry
+        return found
+
+
+def read_varint(data: bytes, position: int) -> Tuple[int, int]:
+    """
+    :return: little-endian base-128 number used in deltas
+    and position after it
+    """
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, position
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """
+    :param base: content of delta base object
+    :param delta: git delta instructions
+    :return: content of resulting object
+    """
+    _, position = read_varint(delta, 0)  # base size
+    _, position = read_varint(delta, position)  # result size
+    result = []
+    while position < len(delta):
+        opcode = delta[position]
+        position += 1
+        if opcode & 0x80:  # copy from base
+            offset = size = 0
+            for bit in range(4):
+                if opcode & (1 << bit):
+                    offset |= delta[position] << (bit * 8)
+                    position += 1
+            for bit in range(3):
+                if opcode & (1 << (4 + bit)):
+                    size |= delta[position] << (bit * 8)
+                    position += 1
+            result.append(base[offset:offset + (size or 0x10000)])
+        else:  # insert literal
+            result.append(delta[position:position + opcode])
+            position += opcode
+    return b"".join(result)
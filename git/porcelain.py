@@ -0,0 +1,156 @@
+from typing import List, NamedTuple, Optional, Tuple
+
+from model.branch import BranchInfo
+from model.status import FileStatus
+
+
+class StatusEntry(NamedTuple):
+    """
+    One path record of 'git status --porcelain=v2' output
+    """
+    path: str
+    staged: Optional[FileStatus] = None
+    unstaged: Optional[FileStatus] = None
+    untracked: bool = False
+    orig_path: Optional[str] = None
+
+
+# porcelain XY status letters ('.' means unchanged)
+CODES = {
+    ord("M"): FileStatus.modified,
+    ord("T"): FileStatus.typechanged,
+    ord("A"): FileStatus.new,
+    ord("D"): FileStatus.deleted,
+    ord("R"): FileStatus.renamed,
+    ord("C"): FileStatus.copied,
+    ord("U"): FileStatus.unmerged,
+}
+
+# number of space separated fields before path for each record type
+ORDINARY_FIELDS = 8
+RENAMED_FIELDS = 9
+UNMERGED_FIELDS = 10
+
+
+def decode_path(raw: bytes) -> str:
+    """
+    git prints paths as raw bytes when -z is used, they are utf-8
+    on every sane setup, undecodable bytes are kept as surrogates
+    :param raw: path bytes
+    :return: path string
+    """
+    return raw.decode("utf-8", "surrogateescape")
+
+
+def parse_branch_header(header: bytes, branch: BranchInfo) -> BranchInfo:
+    """
+    :param header: '# branch.<key> <value>' record without leading '# '
+    :param branch: branch info collected so far
+    :return: updated branch info
+    """
+    key, _, value = header.partition(b" ")
+    value = value.decode("utf-8", "surrogateescape")
+    if key == b"branch.oid":
+        return branch._replace(oid=None if value == "(initial)" else value)
+    if key == b"branch.head":
+        return branch._replace(head=None if value == "(detached)" else value)
+    if key == b"branch.upstream":
+        return branch._replace(upstream=value)
+    if key == b"branch.ab":
+        ahead, behind = value.split(" ")
+        return branch._replace(ahead=int(ahead), behind=-int(behind))
+    return branch
+
+
+def parse_records(records: List[bytes], branch: BranchInfo,
+                  entries: List[StatusEntry]) -> Tuple[BranchInfo, int]:
+    """
+    Parse NUL separated records of 'git status --porcelain=v2 -z --branch'
+    in one linear pass. Renamed entry at the end is left unparsed,
+    if its origin record is not there yet
+    :param records: complete records
+    :param branch: branch info collected so far
+    :param entries: list parsed entries are appended to
+    :return: updated branch info and number of parsed records
+    """
+    append = entries.append
+    i, count = 0, len(records)
+    while i < count:
+        record = records[i]
+        if not record:
+            i += 1
+            continue
+        kind = record[0]
+        if kind == 0x31:  # '1' ordinary changed entry
+            fields = record.split(b" ", ORDINARY_FIELDS)
+            xy = fields[1]
+            append(StatusEntry(
+                decode_path(fields[ORDINARY_FIELDS]),
+                CODES.get(xy[0]), CODES.get(xy[1])
+            ))
+        elif kind == 0x32:  # '2' renamed or copied entry, followed by origin
+            if i + 1 >= count:
+                return branch, i
+            fields = record.split(b" ", RENAMED_FIELDS)
+            xy = fields[1]
+            i += 1
+            append(StatusEntry(
+                decode_path(fields[RENAMED_FIELDS]),
+                CODES.get(xy[0]), CODES.get(xy[1]),
+                orig_path=decode_path(records[i])
+            ))
+        elif kind == 0x75:  # 'u' unmerged entry
+            fields = record.split(b" ", UNMERGED_FIELDS)
+            append(StatusEntry(
+                decode_path(fields[UNMERGED_FIELDS]),
+                FileStatus.unmerged, FileStatus.unmerged
+            ))
+        elif kind == 0x3f:  # '?' untracked entry
+            append(StatusEntry(
+                decode_path(record[2:]), unstaged=FileStatus.new,
+                untracked=True
+            ))
+        elif kind == 0x23:  # '#' header
+            branch = parse_branch_header(record[2:], branch)
+        # '!' ignored entries are not requested and skipped
+        i += 1
+    return branch, i
+
+
+def parse_porcelain_v2(data: bytes) -> Tuple[BranchInfo, List[StatusEntry]]:
+    """
+    Parse output of 'git status --porcelain=v2 -z --branch'
+    :param data: raw stdout bytes
+    :return: branch header and list of status entries
+    """
+    entries = []
+    branch, _ = parse_records(data.split(b"\0"), BranchInfo(), entries)
+    return branch, entries
+
+
+class PorcelainParser:
+    """
+    Incremental parser of 'git status --porcelain=v2 -z --branch'
+    output fed in chunks of any size as it is read from the process
+    """
+    def __init__(self):
+        self.branch = BranchInfo()
+        self.__tail = b""  # incomplete records of previous chunks
+
+    def feed(self, chunk: bytes) -> List[StatusEntry]:
+        """
+        :param chunk: next part of output
+        :return: entries completed by the chunk
+        """
+        records = (self.__tail + chunk).split(b"\0")
+        entries = []
+        self.branch, parsed = parse_records(records[:-1], self.branch, entries)
+        self.__tail = b"\0".join(records[parsed:])
+        return entries
+
+    def close(self) -> List[StatusEntry]:
+        """
+        :return: entries of the rest of output
+        """
+        tail, self.__tail = self.__tail, b""
+        return self.feed(tail + b"\0\0") if tail else []
@@ -0,0 +1,46 @@
+import re
+from typing import List
+
+from model.push import PushProgress
+
+# 'Writing objects:  40% (2/5), 1.20 KiB | 1.20 MiB/s', remote stages
+# are prefixed with 'remote: '
+PROGRESS_LINE = re.compile(
+    rb"(?:remote: )?([A-Za-z][A-Za-z ]*?):\s+(\d+)% \((\d+)/(\d+)\)")
+
+
+class ProgressParser:
+    """
+    Incremental parser of progress git reports with --progress:
+    lines are redrawn with carriage returns and may be split
+    between chunks of stderr
+    """
+    def __init__(self):
+        self.__tail = b""  # incomplete last line of previous chunks
+        self.__errors = []  # type: List[bytes]
+
+    def feed(self, chunk: bytes) -> List[PushProgress]:
+        """
+        :param chunk: raw stderr of git
+        :return: progress of lines completed by chunk
+        """
+        lines = re.split(rb"[\r\n]", self.__tail + chunk)
+        self.__tail = lines.pop()
+        progress = []
+        for line in lines:
+            match = PROGRESS_LINE.match(line)
+            if match is None:
+                if line.strip():
+                    self.__errors.append(line)
+                continue
+            stage, percent, done, total = match.groups()
+            progress.append(PushProgress(
+                stage.decode("ascii"), int(percent), int(done), int(total)))
+        return progress
+
+    def messages(self) -> bytes:
+        """
+        :return: lines of stderr which are not progress, like errors
+        and hints, with incomplete last line
+        """
+        return b"\n".join(self.__errors + [self.__tail]).strip()
@@ -0,0 +1,302 @@
+import os
+from bisect import bisect_left
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from .gitconfig import config_paths, read_config
+
+SYMREF_PREFIX = "ref: "
+MAX_SYMREF_DEPTH = 5
+COUNTS_KEPT = 64  # ahead/behind counts of commit pairs remembered
+
+
+def find_git_dir(path: str) -> Optional[str]:
+    """
+    :param path: path to the root of working tree
+    :return: path to repository directory or None if path is not
+    a root of working tree
+    """
+    dot_git = os.path.join(path, ".git")
+    if os.path.isdir(dot_git):
+        return dot_git
+    try:  # worktrees and submodules have 'gitdir: <path>' file
+        with open(dot_git, encoding="utf-8") as f:
+            line = f.readline().strip()
+    except OSError:
+        return None
+    if not line.startswith("gitdir: "):
+        return None
+    return os.path.normpath(os.path.join(path, line[len("gitdir: "):]))
+
+
+def common_dir(git_dir: str) -> str:
+    """
+    :param git_dir: path to repository directory
+    :return: directory with objects and shared refs, differs from
+    git_dir for linked worktrees
+    """
+    try:
+        with open(os.path.join(git_dir, "commondir"), encoding="utf-8") as f:
+            return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    except OSError:
+        return git_dir
+
+
+def read_ref(git_dir: str, name: str) -> Optional[str]:
+    """
+    read loose ref or find it in packed-refs
+    :param git_dir: path to repository directory
+    :param name: full ref name like 'refs/heads/master'
+    :return: object id or 'ref: <name>' for symbolic refs,
+    None if ref does not exist
+    """
+    for directory in (git_dir, common_dir(git_dir)):
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            pass
+    return packed_refs(git_dir).lookup(name)
+
+
+def stat_stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    :return: mtime, size and inode of file, None if it is missing
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class PackedRefs:
+    """
+    Sorted names and object ids of packed-refs file, read again
+    only when stat data of file changes. Lookups are binary searches
+    """
+    def __init__(self, path: str):
+        """
+        :param path: path to packed-refs file
+        """
+        self.path = path
+        self.__stamp = None
+        self.__names = []  # type: List[str]
+        self.__oids = []  # type: List[str]
+        self.__lock = Lock()
+
+    def refresh(self):
+        """
+        reload file if it is changed since the last read
+        :return: None
+        """
+        stamp = stat_stamp(self.path)
+        if stamp == self.__stamp:
+            return
+        names, oids, ordered = [], [], False
+        try:
+            with open(self.path, encoding="utf-8",
+                      errors="surrogateescape") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            lines = []
+        for line in lines:
+            if line.startswith("#"):  # '# pack-refs with: peeled sorted'
+                ordered = " sorted" in line
+                continue
+            if line.startswith("^"):  # peeled tag
+                continue
+            oid, _, name = line.partition(" ")
+            names.append(name)
+            oids.append(oid)
+        if not ordered:
+            pairs = sorted(zip(names, oids))
+            names, oids = [name for name, _ in pairs], [oid for _, oid in pairs]
+        self.__names, self.__oids, self.__stamp = names, oids, stamp
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        :param name: full ref name
+        :return: object id or None if ref is not packed
+        """
+        with self.__lock:
+            self.refresh()
+            names, oids = self.__names, self.__oids
+        position = bisect_left(names, name)
+        if position < len(names) and names[position] == name:
+            return oids[position]
+        return None
+
+
+_packed = {}  # type: Dict[str, PackedRefs]
+_packed_lock = Lock()
+
+
+def packed_refs(git_dir: str) -> PackedRefs:
+    """
+    :param git_dir: path to repository directory
+    :return: shared reader of packed-refs of repository
+    """
+    path = os.path.join(common_dir(git_dir), "packed-refs")
+    with _packed_lock:
+        packed = _packed.get(path)
+        if packed is None:
+            packed = _packed[path] = PackedRefs(path)
+        return packed
+
+
+def read_head(git_dir: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    :param git_dir: path to repository directory
+    :return: ref HEAD points to (None if detached)
+    and commit id (None on unborn branch)
+    """
+    value = read_ref(git_dir, "HEAD")
+    ref = None
+    for _ in range(MAX_SYMREF_DEPTH):
+        if value is None or not value.startswith(SYMREF_PREFIX):
+            break
+        ref = value[len(SYMREF_PREFIX):]
+        value = read_ref(git_dir, ref)
+    else:
+        value = None
+    return ref, value
+
+
+class RefReader:
+    """
+    Reader of HEAD, refs, upstream config and ahead/behind counts of
+    one repository without spawning git. Everything read is kept until
+    stat data of its file changes, counts are kept per pair of commits
+    """
+    def __init__(self, git_dir: str):
+        """
+        :param git_dir: path to repository directory
+        """
+        self.git_dir = git_dir
+        self.common_dir = common_dir(git_dir)
+        self.__packed = packed_refs(git_dir)
+        self.__loose = {}  # type: Dict[str, Tuple[Tuple, Optional[str]]]
+        self.__config = None  # type: Optional[Tuple[Tuple, Dict[str, str]]]
+        self.__graph = None  # type: Optional[Tuple[Tuple, Any]]
+        self.__counts = {}  # type: Dict[Tuple[str, str], Tuple[int, int]]
+        self.__lock = Lock()
+
+    def read(self, name: str) -> Optional[str]:
+        """
+        :param name: full ref name like 'refs/heads/master' or 'HEAD'
+        :return: object id or 'ref: <name>' for symbolic refs,
+        None if ref does not exist
+        """
+        for directory in (self.git_dir, self.common_dir):
+            path = os.path.join(directory, name)
+            stamp = stat_stamp(path)
+            if stamp is None:
+                continue
+            with self.__lock:
+                cached = self.__loose.get(path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            try:
+                with open(path, encoding="utf-8") as f:
+                    value = f.read().strip()
+            except OSError:  # directory or removed since stat
+                continue
+            with self.__lock:
+                self.__loose[path] = stamp, value
+            return value
+        return self.__packed.lookup(name)
+
+    def resolve(self, name: str) -> Tuple[str, Optional[str]]:
+        """
+        :param name: full ref name, may be symbolic
+        :return: name of the last ref in symref chain and its object id,
+        None if it does not exist
+        """
+        value = self.read(name)
+        for _ in range(MAX_SYMREF_DEPTH):
+            if value is None or not value.startswith(SYMREF_PREFIX):
+                return name, value
+            name = value[len(SYMREF_PREFIX):]
+            value = self.read(name)
+        return name, None
+
+    def head(self) -> Tuple[Optional[str], Optional[str]]:
+        """
+        :return: ref HEAD points to (None if detached)
+        and commit id (None on unborn branch)
+        """
+        name, oid = self.resolve("HEAD")
+        return (None if name == "HEAD" else name), oid
+
+    def config(self) -> Dict[str, str]:
+        """
+        :return: git config of repository, read again when files change
+        """
+        paths = config_paths(self.git_dir)
+        stamp = tuple(stat_stamp(path) for path in paths)
+        with self.__lock:
+            if self.__config is None or self.__config[0] != stamp:
+                self.__config = stamp, read_config(paths)
+            return self.__config[1]
+
+    def upstream(self, ref: str) -> Optional[Tuple[str, str]]:
+        """
+        :param ref: full name of local branch
+        :return: short name of upstream like 'origin/master' and its
+        remote-tracking ref, None if branch has no upstream or it is
+        mapped by refspec too complex to follow here
+        """
+        if not ref.startswith("refs/heads/"):
+            return None
+        branch = ref[len("refs/heads/"):]
+        config = self.config()
+        remote = config.get("branch.{}.remote".format(branch))
+        merge = config.get("branch.{}.merge".format(branch))
+        if not remote or not merge:
+            return None
+        if remote == ".":  # upstream is local branch
+            return (merge[len("refs/heads/"):]
+                    if merge.startswith("refs/heads/") else merge), merge
+        fetch = config.get("remote.{}.fetch".format(remote),
+                           "+refs/heads/*:refs/remotes/{}/*".format(remote))
+        source, _, destination = fetch.lstrip("+").partition(":")
+        if not source.endswith("/*") or not destination.endswith("/*") \
+                or not merge.startswith(source[:-1]):
+            return None
+        tracking = destination[:-1] + merge[len(source) - 1:]
+        return (tracking[len("refs/remotes/"):]
+                if tracking.startswith("refs/remotes/") else tracking), tracking
+
+    def ahead_behind(self, left: str, right: str) -> Optional[Tuple[int, int]]:
+        """
+        :param left: id of local commit
+        :param right: id of upstream commit
+        :return: numbers of commits only left and only right one
+        reaches, None if they can't be counted without git
+        """
+        # both modules read objects, which import this one
+        from .commit_graph import CommitGraph, CommitWalker, \
+            UnsupportedGraph, ahead_behind
+        from .objects import ObjectReader
+        if left == right:
+            return 0, 0
+        with self.__lock:
+            counts = self.__counts.get((left, right))
+        if counts is not None:
+            return counts
+        objects = os.path.join(self.common_dir, "objects")
+        stamp = tuple(stat_stamp(path) for path in CommitGraph.files(objects))
+        with self.__lock:  # walker remembers commits, it is not shared
+            try:
+                if self.__graph is None or self.__graph[0] != stamp:
+                    self.__graph = stamp, CommitWalker(
+                        CommitGraph(objects), ObjectReader(self.git_dir))
+                    self.__counts.clear()
+                counts = ahead_behind(self.__graph[1], left, right)
+            except UnsupportedGraph:
+                return None
+            if len(self.__counts) >= COUNTS_KEPT:
+                self.__counts.clear()
+            self.__counts[left, right] = counts
+        return counts
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Optional
+
+from PyQt5.QtCore import QThread, pyqtSignal, pyqtSlot
+
+from config import WORKSPACE_DEPTH, WORKSPACE_WORKERS
+from .workspace import RepositorySummary, discover, scan
+
+
+class PQWorkspaceScanner(QThread):
+    """
+    Qt adapter over git.workspace: discovers repositories under root
+    and queries their status concurrently in own event loop,
+    summaries are emitted as soon as each of them is ready
+    """
+    discovered = pyqtSignal(list)  # paths of found repositories
+    scanned = pyqtSignal(RepositorySummary)
+    completed = pyqtSignal(float)  # seconds spent by the whole scan
+
+    def __init__(self, depth: int = WORKSPACE_DEPTH,
+                 workers: int = WORKSPACE_WORKERS):
+        """
+        :param depth: levels of directories searched under root
+        :param workers: number of repositories queried simultaneously
+        """
+        super().__init__()
+        self.depth = depth
+        self.workers = workers
+        self.root = None  # type: Optional[str]
+        self.__loop = None  # type: Optional[asyncio.AbstractEventLoop]
+        self.__task = None  # type: Optional[asyncio.Future]
+        self.__stopped = False  # set by stop, checked during discovery
+
+    @pyqtSlot(str)
+    def scan(self, root: str):
+        """
+        start scan of workspace, running one is stopped first
+        :param root: workspace directory
+        :return: None
+        """
+        self.stop()
+        self.wait()
+        self.root = root
+        self.__stopped = False
+        self.start()
+
+    @pyqtSlot()
+    def stop(self):
+        """
+        stop running scan, statuses being queried are abandoned
+        :return: None
+        """
+        self.__stopped = True
+        loop, task = self.__loop, self.__task
+        if loop is not None and task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+
+    def run(self):
+        loop = self.__loop = asyncio.new_event_loop()
+        try:
+            started = loop.time()
+            paths = discover(self.root, self.depth,
+                             lambda: self.__stopped)
+            if self.__stopped:
+                return
+            self.discovered.emit(paths)
+            self.__task = loop.create_task(
+                scan(paths, self.workers, self.scanned.emit))
+            if self.__stopped:  # stop came before the task was set
+                self.__task.cancel()
+            loop.run_until_complete(self.__task)
+            self.completed.emit(loop.time() - started)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.__task = self.__loop = None
+            loop.close()
@@ -0,0 +1,188 @@
+from threading import Condition
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from .commands import ConsoleCommand
+
+
+class CommandScheduler:
+    """
+    Thread-safe queue of console commands for several workers.
+    Commands of one repository keep their submission order:
+    a command changing repository waits for everything submitted before it
+    and blocks everything submitted after it, read-only commands
+    run in parallel with each other. Commands of different repositories
+    and commands without repository are not ordered at all.
+    Pending read-only commands made needless by a newer one are merged:
+    equal commands are executed once for all their callers, stale ones
+    are dropped. Commands of user actions are taken before background
+    ones and may overtake background reads of their repository
+    """
+    def __init__(self):
+        self.__condition = Condition()
+        self.__pending = []  # type: List[ConsoleCommand]
+        self.__reading = {}  # type: Dict[str, int]
+        self.__writing = set()
+        self.__running = set()
+        self.__stopped = False
+
+    @property
+    def depth(self) -> int:
+        """
+        :return: number of commands waiting for execution
+        """
+        with self.__condition:
+            return len(self.__pending)
+
+    @property
+    def running(self) -> List[ConsoleCommand]:
+        """
+        :return: commands taken by workers and not done yet
+        """
+        with self.__condition:
+            return list(self.__running)
+
+    def submit(self, command: ConsoleCommand):
+        """
+        add command to queue and wake up one of free workers
+        :param command: command to execute
+        :return: None
+        """
+        with self.__condition:
+            command.trace.queue_depth = len(self.__pending)
+            command.queued_at = perf_counter()
+            if command.read_only and self.__merge(command):
+                return
+            self.__pending.append(command)
+            self.__condition.notify_all()
+
+    def __merge(self, command: ConsoleCommand) -> bool:
+        """
+        merge command with pending read-only commands of its repository
+        submitted after the last pending change of it
+        :param command: new read-only command
+        :return: True if command is merged into pending one
+        """
+        repository = command.repository
+        if repository is None:
+            return False
+        readers = []
+        for pending in reversed(self.__pending):
+            if pending.repository != repository:
+                continue
+            if not pending.read_only:
+                break
+            readers.append(pending)
+
+        for pending in readers:
+            if pending.covers(command):
+                if command.covers(pending):  # equal, callers share result
+                    pending.followers.append(command)
+                    pending.priority = min(pending.priority, command.priority)
+                return True
+
+        for pending in readers:
+            if command.covers(pending):
+                self.__pending.remove(pending)
+                if pending.covers(command):
+                    command.followers += [pending] + pending.followers
+                    command.priority = min(command.priority, pending.priority)
+                pending.followers = []
+        return False
+
+    def take(self) -> Optional[ConsoleCommand]:
+        """
+        block until some command may be executed
+        :return: command to execute or None if scheduler is stopped
+        """
+        with self.__condition:
+            while True:
+                if self.__stopped:
+                    return None
+                command = self.__pop_runnable()
+                if command is not None:
+                    self.__running.add(command)
+                    now = perf_counter()
+                    command.trace.add("queue", command.queued_at, now)
+                    return command
+                self.__condition.wait()
+
+    def done(self, command: ConsoleCommand):
+        """
+        mark command taken with take() as finished
+        :param command: executed command
+        :return: None
+        """
+        repository = command.repository
+        with self.__condition:
+            self.__running.discard(command)
+            if repository is None:
+                return
+            if command.read_only:
+                self.__reading[repository] -= 1
+                if not self.__reading[repository]:
+                    del self.__reading[repository]
+            else:
+                self.__writing.discard(repository)
+            self.__condition.notify_all()
+
+    def clear(self) -> List[ConsoleCommand]:
+        """
+        remove all pending commands, running ones are not affected
+        :return: removed commands
+        """
+        with self.__condition:
+            pending, self.__pending = self.__pending, []
+            return pending
+
+    def stop(self):
+        """
+        remove pending commands and make all workers leave take()
+        :return: None
+        """
+        with self.__condition:
+            self.__pending = []
+            self.__stopped = True
+            self.__condition.notify_all()
+
+    def __pop_runnable(self) -> Optional[ConsoleCommand]:
+        """
+        find first command in priority and submission order that does
+        not break ordering of its repository, mark it running
+        :return: command or None if every pending command has to wait
+        """
+        pending = self.__pending
+        for index in sorted(range(len(pending)),
+                            key=lambda i: (pending[i].priority, i)):
+            command = pending[index]
+            repository = command.repository
+            if repository is None:
+                return pending.pop(index)
+            if repository in self.__writing \
+                    or self.__waits(command, index):
+                continue
+            if command.read_only:
+                self.__reading[repository] = \
+                    self.__reading.get(repository, 0) + 1
+            elif repository in self.__reading:
+                continue
+            else:
+                self.__writing.add(repository)
+            return pending.pop(index)
+        return None
+
+    def __waits(self, command: ConsoleCommand, index: int) -> bool:
+        """
+        :param command: pending command
+        :param index: its position in pending commands
+        :return: True if command has to wait for one submitted earlier:
+        any change of repository or read of it which is not less urgent
+        """
+        for earlier in self.__pending[:index]:
+            if earlier.repository != command.repository:
+                continue
+            if not earlier.read_only:
+                return True
+            if not command.read_only and earlier.priority <= command.priority:
+                return True
+        return False
@@ -0,0 +1,144 @@
+"""
+Status snapshot of the last repository kept on disk between launches,
+so files are shown at once while fresh status is queried. Columns of
+FileTable are written as they are, compressed with zlib:
+    header: magic, format version, number of rows
+    blocks: length-prefixed repository path, branch, paths, status
+    columns, masks, rows and paths of renamed files
+"""
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import List, NamedTuple, Optional
+
+from model.branch import BranchInfo
+from model.file_table import FileTable
+
+MAGIC = b"GHSNAP"
+VERSION = 1
+HEADER = struct.Struct("<6sBI")  # magic, version, rows
+LENGTH = struct.Struct("<I")
+BRANCH = struct.Struct("<?ii")  # branch is known, ahead, behind
+
+
+class Snapshot(NamedTuple):
+    path: str  # root of working tree
+    branch: Optional[BranchInfo]
+    files: FileTable
+
+
+def encode(text: str) -> bytes:
+    return text.encode("utf-8", "surrogateescape")
+
+
+def decode(raw: bytes) -> str:
+    return raw.decode("utf-8", "surrogateescape")
+
+
+def join(texts: List[str]) -> bytes:
+    return encode("\0".join(texts))
+
+
+def split(raw: bytes, count: int) -> List[str]:
+    """
+    :param raw: texts joined by join()
+    :param count: number of joined texts
+    :return: texts
+    """
+    if not count:
+        return []
+    texts = decode(raw).split("\0")
+    if len(texts) != count:
+        raise ValueError("wrong number of texts")
+    return texts
+
+
+def dump_snapshot(snapshot: Snapshot) -> bytes:
+    """
+    :param snapshot: repository state
+    :return: compressed binary form
+    """
+    files, branch = snapshot.files, snapshot.branch
+    names = [snapshot.path]
+    if branch is not None:
+        names += [branch.oid or "", branch.head or "", branch.upstream or ""]
+    orig_rows = sorted(files.orig_paths)
+    blocks = [
+        BRANCH.pack(branch is not None, branch.ahead if branch else 0,
+                    branch.behind if branch else 0),
+        join(names),
+        join(list(files.paths)),
+        files.staged.tobytes(),
+        files.unstaged.tobytes(),
+        files.untracked_mask,
+        files.tracked_mask,
+        array("I", orig_rows).tobytes(),
+        join([files.orig_paths[row] for row in orig_rows]),
+    ]
+    body = b"".join(LENGTH.pack(len(block)) + block for block in blocks)
+    return HEADER.pack(MAGIC, VERSION, len(files)) + zlib.compress(body, 1)
+
+
+def parse_snapshot(data: bytes) -> Snapshot:
+    """
+    :param data: output of dump_snapshot()
+    :return: repository state, raises ValueError if data is broken
+    or written by other format version
+    """
+    try:
+        magic, version, rows = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a snapshot of this version")
+        body = zlib.decompress(data[HEADER.size:])
+        blocks, position = [], 0
+        while position < len(body):
+            length, = LENGTH.unpack_from(body, position)
+            position += LENGTH.size
+            blocks.append(body[position:position + length])
+            position += length
+        known, ahead, behind = BRANCH.unpack(blocks[0])
+        names = split(blocks[1], 4 if known else 1)
+        paths = [sys.intern(path) for path in split(blocks[2], rows)]
+        staged, unstaged = array("B", blocks[3]), array("B", blocks[4])
+        orig_rows = array("I", blocks[7])
+        orig_paths = split(blocks[8], len(orig_rows))
+        mask_size = (rows + 7) >> 3
+        if len(staged) != rows or len(unstaged) != rows \
+                or len(blocks[5]) != mask_size or len(blocks[6]) != mask_size:
+            raise ValueError("columns do not match rows")
+    except (struct.error, zlib.error, IndexError, UnicodeError) as e:
+        raise ValueError("broken snapshot") from e
+    branch = BranchInfo(names[1] or None, names[2] or None, names[3] or None,
+                        ahead, behind) if known else None
+    files = FileTable(paths, staged, unstaged, blocks[5], blocks[6],
+                      dict(zip(orig_rows, orig_paths)))
+    return Snapshot(names[0], branch, files)
+
+
+def save_snapshot(file: str, snapshot: Snapshot):
+    """
+    write snapshot atomically, so a crash keeps the previous one
+    :param file: path of snapshot file, '~' is expanded
+    :param snapshot: repository state
+    :return: None, raises OSError
+    """
+    file = os.path.expanduser(file)
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    temporary = file + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(dump_snapshot(snapshot))
+    os.replace(temporary, file)
+
+
+def load_snapshot(file: str) -> Optional[Snapshot]:
+    """
+    :param file: path of snapshot file, '~' is expanded
+    :return: saved snapshot or None if it is missing or broken
+    """
+    try:
+        with open(os.path.expanduser(file), "rb") as f:
+            return parse_snapshot(f.read())
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,113 @@
+"""
+Adaptive status strategy: durations of full status scans are kept per
+repository, slow repositories list untracked files by directories
+and background rescans of them skip untracked files, git features
+making status faster are suggested for them
+"""
+from enum import Enum
+from typing import Dict, List, Tuple
+
+from config import STATUS_FULL_EVERY, STATUS_SLOW
+from .gitconfig import boolean, config_paths, read_config
+from .refs import find_git_dir
+
+UntrackedMode = Enum(
+    'UntrackedMode',
+    'configured normal none'  # status.showUntrackedFiles, -unormal, -uno
+)
+
+UNTRACKED_ARGUMENTS = {
+    UntrackedMode.configured: [],
+    UntrackedMode.normal: ["--untracked-files=normal"],
+    UntrackedMode.none: ["--untracked-files=no"],
+}
+
+FAST_STATUS_CONFIG = ("core.untrackedCache", "feature.manyFiles")
+
+
+class StatusStrategy:
+    """
+    Chooses untracked mode of status queries of repository by
+    exponentially weighted mean duration of its full scans. Means are
+    kept per untracked mode, only scans in configured mode decide if
+    repository is slow: faster scans of slow repository must not
+    bring it back under the threshold
+    """
+    WEIGHT = 0.5  # weight of the latest duration in the mean
+
+    def __init__(self, slow: float = STATUS_SLOW,
+                 full_every: int = STATUS_FULL_EVERY):
+        """
+        :param slow: seconds of status making repository slow
+        :param full_every: every n-th rescan of slow repository
+        lists untracked files, so files git stopped tracking are found
+        """
+        self.slow = slow
+        self.full_every = full_every
+        self.__durations = {}  # type: Dict[Tuple[str, UntrackedMode], float]
+        self.__rescans = {}  # type: Dict[str, int]
+
+    def record(self, repository: str, mode: UntrackedMode, seconds: float):
+        """
+        :param repository: normalized path of repository
+        :param mode: untracked mode of the scan
+        :param seconds: duration of git status listing untracked files
+        :return: None
+        """
+        mean = self.__durations.get((repository, mode))
+        self.__durations[repository, mode] = seconds if mean is None \
+            else self.WEIGHT * seconds + (1 - self.WEIGHT) * mean
+
+    def duration(self, repository: str,
+                 mode: UntrackedMode = UntrackedMode.configured) -> float:
+        """
+        :return: mean duration of full scans in mode,
+        0 if nothing is recorded
+        """
+        return self.__durations.get((repository, mode), 0.0)
+
+    def forget(self, repository: str):
+        """
+        drop durations of repository, like after its config is changed
+        :param repository: normalized path of repository
+        :return: None
+        """
+        for mode in UntrackedMode:
+            self.__durations.pop((repository, mode), None)
+        self.__rescans.pop(repository, None)
+
+    def is_slow(self, repository: str) -> bool:
+        return self.duration(repository) >= self.slow
+
+    def scan_mode(self, repository: str) -> UntrackedMode:
+        """
+        :return: mode of status the user asked for: untracked files
+        of slow repository are listed by directories
+        """
+        return UntrackedMode.normal if self.is_slow(repository) \
+            else UntrackedMode.configured
+
+    def rescan_mode(self, repository: str) -> UntrackedMode:
+        """
+        :return: mode of background rescan after index or HEAD change:
+        slow repository keeps untracked files it knows
+        """
+        if not self.is_slow(repository):
+            return UntrackedMode.configured
+        rescans = self.__rescans.get(repository, 0) + 1
+        self.__rescans[repository] = rescans % self.full_every
+        return UntrackedMode.normal if rescans == self.full_every \
+            else UntrackedMode.none
+
+
+def missing_fast_config(path: str) -> List[str]:
+    """
+    :param path: path to the root of working tree
+    :return: variables of FAST_STATUS_CONFIG not enabled for repository
+    """
+    git_dir = find_git_dir(path)
+    if git_dir is None:
+        return []
+    config = read_config(config_paths(git_dir))
+    return [name for name in FAST_STATUS_CONFIG
+            if not boolean(config, name.lower(), False)]
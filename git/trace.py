@@ -0,0 +1,213 @@
+"""
+Qt-free timing instrumentation of console commands: every command
+carries a CommandTrace with spans of its phases, finished traces
+are published to pluggable sinks, like Chrome trace-event file
+"""
+import json
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Deque, Dict, Iterable, Iterator, List, NamedTuple, \
+    Optional
+
+# queue: waiting in PQCmd scheduler, in_process: cache and index reading,
+# spawn: process creation, git: process running, streamed output included,
+# decode: bytes to text, parse: map_result and feed,
+# populate: applying result to models
+PHASES = ("queue", "in_process", "spawn", "git", "decode", "parse",
+          "populate")
+
+
+class TraceSpan(NamedTuple):
+    """
+    One measured phase of command execution
+    """
+    phase: str
+    start: float  # time.perf_counter() values
+    end: float
+    thread: int  # identifier of thread the phase ran in
+
+
+class CommandTrace:
+    """
+    Timing record of one command, phases may repeat:
+    every step spawns a process, streamed output is parsed in parts
+    """
+    def __init__(self, text: str, kind: str = "ConsoleCommand"):
+        """
+        :param text: text of the command
+        :param kind: class name of the command
+        """
+        self.text = text
+        self.kind = kind
+        self.spans = []  # type: List[TraceSpan]
+        self.queue_depth = 0  # commands waiting ahead at submission
+        self.output_size = 0  # bytes of stdout
+        self.error_size = 0  # bytes of stderr
+
+    def add(self, phase: str, start: float, end: Optional[float] = None):
+        """
+        :param phase: one of PHASES
+        :param start: time.perf_counter() at start of the phase
+        :param end: time.perf_counter() at its end, now if None
+        :return: None
+        """
+        self.spans.append(TraceSpan(
+            phase, start, perf_counter() if end is None else end,
+            threading.get_ident()))
+
+    @contextmanager
+    def span(self, phase: str) -> Iterator[None]:
+        """
+        measure phase of code block
+        :param phase: one of PHASES
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, start)
+
+    def duration(self, phase: str) -> float:
+        """
+        :return: seconds spent in all spans of phase
+        """
+        return sum(span.end - span.start
+                   for span in self.spans if span.phase == phase)
+
+    @property
+    def total(self) -> float:
+        """
+        :return: seconds from start of the first span to end of the last
+        """
+        if not self.spans:
+            return 0.0
+        return max(span.end for span in self.spans) \
+            - min(span.start for span in self.spans)
+
+    def __repr__(self):
+        return "<CommandTrace: {:.1f} ms '{}'>".format(
+            self.total * 1000, self.text)
+
+
+def chrome_events(trace: CommandTrace) -> List[Dict[str, Any]]:
+    """
+    :param trace: finished trace
+    :return: complete ('X') events of Chrome trace-event format,
+    one per span, timestamps in microseconds
+    """
+    return [
+        {
+            "name": span.phase, "cat": trace.kind, "ph": "X",
+            "ts": span.start * 1e6, "dur": (span.end - span.start) * 1e6,
+            "pid": os.getpid(), "tid": span.thread,
+            "args": {"command": trace.text, "queue_depth": trace.queue_depth,
+                     "output_bytes": trace.output_size,
+                     "error_bytes": trace.error_size}
+        }
+        for span in trace.spans
+    ]
+
+
+def export_chrome_trace(traces: Iterable[CommandTrace], path: str):
+    """
+    write traces as JSON object format of Chrome trace-event file,
+    loadable with chrome://tracing or Perfetto
+    :param traces: finished traces
+    :param path: path of file to write
+    :return: None
+    """
+    events = [event for trace in traces for event in chrome_events(trace)]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+class TraceSink:
+    """
+    Receiver of finished traces
+    """
+    def record(self, trace: CommandTrace):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class TraceHistory(TraceSink):
+    """
+    Keeps recent traces in memory
+    """
+    def __init__(self, size: int):
+        """
+        :param size: number of traces kept
+        """
+        self.traces = deque(maxlen=size)  # type: Deque[CommandTrace]
+
+    def record(self, trace: CommandTrace):
+        self.traces.append(trace)
+
+
+class ChromeTraceFile(TraceSink):
+    """
+    Appends events to file in JSON array format of Chrome trace-event
+    files, which does not need closing bracket, so the file is
+    loadable even if application was killed
+    """
+    def __init__(self, path: str):
+        """
+        :param path: path of file, it is overwritten
+        """
+        self.path = path
+        self.__file = None
+        self.__lock = threading.Lock()
+
+    def record(self, trace: CommandTrace):
+        with self.__lock:
+            if self.__file is None:
+                self.__file = open(self.path, "w")
+                self.__file.write("[\n")
+            for event in chrome_events(trace):
+                self.__file.write(json.dumps(event) + ",\n")
+            self.__file.flush()
+
+    def close(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+
+class Tracer:
+    """
+    Publishes finished traces to registered sinks
+    """
+    def __init__(self):
+        self.__sinks = []  # type: List[TraceSink]
+
+    def add_sink(self, sink: TraceSink):
+        self.__sinks.append(sink)
+
+    def remove_sink(self, sink: TraceSink):
+        self.__sinks.remove(sink)
+
+    def publish(self, trace: CommandTrace):
+        """
+        :param trace: trace of command which result is applied
+        :return: None
+        """
+        for sink in list(self.__sinks):
+            sink.record(trace)
+
+    def close(self):
+        """
+        close and remove all sinks
+        :return: None
+        """
+        sinks, self.__sinks = self.__sinks, []
+        for sink in sinks:
+            sink.close()
+
+
+tracer = Tracer()  # sinks of all commands of the process
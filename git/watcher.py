@@ -0,0 +1,264 @@
+import os
+from time import monotonic
+from typing import List, Optional, Set
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QSocketNotifier, \
+    QTimer, pyqtSignal, pyqtSlot
+
+from config import WATCH_DEBOUNCE_MS, WATCH_MAX_DIRECTORIES, \
+    WATCH_MAX_WAIT_MS
+from . import inotify
+from .gitconfig import config_paths, path_value, read_config
+from .ignore import IgnorePattern, global_excludes_file, is_ignored, \
+    read_patterns
+from .refs import find_git_dir
+
+WATCHED_GIT_FILES = ("index", "HEAD")
+
+
+class PQRepoWatcher(QObject):
+    """
+    Watches not ignored directories of working tree and .git/index, HEAD.
+    Uses inotify directly on Linux, so writes to existing files are seen,
+    QFileSystemWatcher elsewhere. Bursts of events are debounced into
+    one notification with changed directories, steady changes are
+    delivered at least every WATCH_MAX_WAIT_MS
+    """
+
+    # signals
+    directories_changed = pyqtSignal(list)  # relative paths like 'a/b/', ''
+    repository_changed = pyqtSignal()  # index or HEAD changed, rescan all
+
+    def __init__(self):
+        super().__init__()
+        self.__watcher = None  # type: Optional[QFileSystemWatcher]
+        self.__inotify = None  # type: Optional[inotify.Inotify]
+        self.__notifier = None  # type: Optional[QSocketNotifier]
+        self.__watches = {}  # inotify watch descriptors to paths
+        self.__path = None
+        self.__git_dir = None
+        self.__patterns = []  # type: List[IgnorePattern]
+        self.__git_state = None
+        self.__changed = set()  # type: Set[str]
+        self.__repository_changed = False
+        self.__pending_since = None  # monotonic() of first undelivered change
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.timeout.connect(self.flush)
+
+    def watch(self, path: str):
+        """
+        start watching repository, previous one is forgotten
+        :param path: path to the root of working tree
+        :return: None
+        """
+        self.stop()
+        git_dir = find_git_dir(path)
+        if git_dir is None:  # subfolder of repository or not a repository
+            return
+        self.__path = path
+        self.__git_dir = git_dir
+        self.__git_state = self.git_state()
+        config = read_config(config_paths(git_dir))
+        self.__patterns = read_patterns(global_excludes_file(
+            path_value(config, "core.excludesfile")), "") + \
+            read_patterns(os.path.join(git_dir, "info", "exclude"), "")
+        self.__inotify = inotify.create()
+        if self.__inotify is not None:
+            self.__notifier = QSocketNotifier(
+                self.__inotify.fd, QSocketNotifier.Read, self)
+            self.__notifier.activated.connect(self.read_events)
+        else:
+            self.__watcher = QFileSystemWatcher(self)
+            self.__watcher.directoryChanged.connect(self.directory_changed)
+        self.add_paths([git_dir])
+        self.add_directories("")
+
+    @pyqtSlot()
+    def stop(self):
+        """
+        stop watching and drop not delivered changes
+        :return: None
+        """
+        self.__timer.stop()
+        self.__changed = set()
+        self.__repository_changed = False
+        self.__pending_since = None
+        if self.__watcher is not None:
+            self.__watcher.deleteLater()
+            self.__watcher = None
+        if self.__notifier is not None:
+            self.__notifier.setEnabled(False)
+            self.__notifier.deleteLater()
+            self.__notifier = None
+        if self.__inotify is not None:
+            self.__inotify.close()
+            self.__inotify = None
+        self.__watches = {}
+        self.__path = self.__git_dir = None
+
+    def add_paths(self, paths: List[str]):
+        """
+        :param paths: absolute paths of directories to watch
+        :return: None
+        """
+        if self.__inotify is None:
+            self.__watcher.addPaths(paths)
+            return
+        for path in paths:
+            wd = self.__inotify.add_watch(path)
+            if wd >= 0:
+                self.__watches[wd] = path
+
+    @property
+    def directories(self) -> Set[str]:
+        """
+        :return: absolute paths of watched directories
+        """
+        if self.__inotify is None:
+            return set(self.__watcher.directories())
+        return set(self.__watches.values())
+
+    def add_directories(self, directory: str):
+        """
+        watch directory and its not ignored subdirectories
+        :param directory: directory relative to root, '' or 'a/b/'
+        :return: None
+        """
+        patterns = self.patterns(directory)
+        if directory and is_ignored(patterns, directory[:-1], True):
+            return
+        paths = []
+        pending = [(directory, patterns)]
+        limit = WATCH_MAX_DIRECTORIES - len(self.directories)
+        while pending and len(paths) < limit:
+            directory, patterns = pending.pop()
+            absolute = os.path.normpath(os.path.join(self.__path, directory))
+            paths.append(absolute)
+            patterns = patterns + read_patterns(
+                os.path.join(absolute, ".gitignore"), directory)
+            try:
+                with os.scandir(absolute) as scanner:
+                    for item in scanner:
+                        path = directory + item.name
+                        if item.name != ".git" \
+                                and item.is_dir(follow_symlinks=False) \
+                                and not is_ignored(patterns, path, True):
+                            pending.append((path + "/", patterns))
+            except OSError:
+                pass
+        self.add_paths(paths)
+
+    def patterns(self, directory: str) -> List[IgnorePattern]:
+        """
+        :param directory: directory relative to root, '' or 'a/b/'
+        :return: ignore patterns applied to directory content
+        excluding its own .gitignore
+        """
+        patterns = list(self.__patterns)
+        parent, end = "", directory.find("/")
+        while end != -1:
+            patterns += read_patterns(
+                os.path.join(self.__path, parent, ".gitignore"), parent)
+            parent = directory[:end + 1]
+            end = directory.find("/", end + 1)
+        return patterns
+
+    def git_state(self):
+        """
+        :return: stat data of index and HEAD
+        """
+        state = []
+        for name in WATCHED_GIT_FILES:
+            try:
+                info = os.stat(os.path.join(self.__git_dir, name))
+                state.append((info.st_mtime_ns, info.st_size, info.st_ino))
+            except OSError:
+                state.append(None)
+        return state
+
+    @pyqtSlot(str)
+    def directory_changed(self, absolute: str):
+        """
+        Handler for QFileSystemWatcher.directoryChanged signal.
+        Remembers changed directory and restarts debounce timer
+        :param absolute: path of changed directory
+        :return: None
+        """
+        if self.__path is None:
+            return
+        if os.path.normcase(absolute) == os.path.normcase(self.__git_dir):
+            state = self.git_state()
+            if state == self.__git_state:
+                return  # lock files, logs and other .git content
+            self.__git_state = state
+            self.__repository_changed = True
+        else:
+            directory = os.path.relpath(absolute, self.__path)
+            directory = "" if directory == os.curdir \
+                else directory.replace(os.sep, "/") + "/"
+            self.__changed.add(directory)
+            if os.path.isdir(absolute):  # new subdirectories
+                watched = self.directories
+                with os.scandir(absolute) as scanner:
+                    for item in scanner:
+                        if item.name != ".git" and item.path not in watched \
+                                and item.is_dir(follow_symlinks=False):
+                            self.add_directories(
+                                directory + item.name + "/")
+        self.debounce()
+
+    @pyqtSlot()
+    def read_events(self):
+        """
+        Handler for inotify descriptor becoming readable.
+        Passes every changed directory once to directory_changed
+        :return: None
+        """
+        if self.__inotify is None:
+            return
+        changed = set()
+        for event in self.__inotify.read_events():
+            if event.mask & inotify.IN_Q_OVERFLOW:  # anything may change
+                self.__changed.add("")
+                self.debounce()
+            elif event.mask & inotify.IN_IGNORED:
+                self.__watches.pop(event.wd, None)
+            elif event.wd in self.__watches:
+                changed.add(self.__watches[event.wd])
+        for directory in changed:
+            self.directory_changed(directory)
+
+    def debounce(self):
+        """
+        restart debounce timer, it is shortened so changes are
+        delivered not later than WATCH_MAX_WAIT_MS after the first one
+        :return: None
+        """
+        now = monotonic()
+        if self.__pending_since is None:
+            self.__pending_since = now
+        left = WATCH_MAX_WAIT_MS - (now - self.__pending_since) * 1000
+        self.__timer.start(int(max(0, min(WATCH_DEBOUNCE_MS, left))))
+
+    @pyqtSlot()
+    def flush(self):
+        """
+        deliver collected changes: whole repository if index or HEAD
+        changed, topmost changed directories otherwise, root directory
+        is reported as ''. Rescan after index or HEAD change may skip
+        untracked files, changed directories are listed with them
+        :return: None
+        """
+        self.__pending_since = None
+        changed, self.__changed = self.__changed, set()
+        repository_changed, self.__repository_changed = \
+            self.__repository_changed, False
+        if repository_changed:
+            self.repository_changed.emit()
+        if changed:
+            self.directories_changed.emit(sorted(
+                directory for directory in changed
+                if not any(directory != other and directory.startswith(other)
+                           for other in changed)
+            ))
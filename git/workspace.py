@@ -0,0 +1,120 @@
+"""
+Qt-free workspace scanning: discovery of repositories under a root
+directory and status summary of each of them
+"""
+import asyncio
+import os
+from typing import Callable, List, NamedTuple, Optional
+
+from config import WORKSPACE_DEPTH, WORKSPACE_WORKERS
+from model.file_table import FileTable
+from .engine import GitEngine
+from .exceptions import GitException
+
+
+class RepositorySummary(NamedTuple):
+    """
+    Status of one repository of workspace
+    """
+    path: str
+    head: Optional[str] = None  # branch, None if detached
+    ahead: int = 0
+    behind: int = 0
+    upstream: Optional[str] = None
+    files: int = 0  # changed files of all kinds
+    staged: int = 0  # files with changes added to index
+    untracked: int = 0
+    error: Optional[str] = None
+
+    @property
+    def dirty(self) -> bool:
+        return self.files > 0
+
+
+def discover(root: str, depth: int = WORKSPACE_DEPTH,
+             cancelled: Optional[Callable[[], bool]] = None) -> List[str]:
+    """
+    Find working trees under root. Directories containing .git
+    (directory or file of linked worktree or submodule) are
+    repositories and their content is not searched further
+    :param root: workspace directory
+    :param depth: levels of directories searched under root
+    :param cancelled: checked before each directory, search stops
+    when it returns True
+    :return: sorted paths of working trees
+    """
+    repositories = []
+    pending = [(os.path.abspath(root), 0)]
+    while pending and not (cancelled is not None and cancelled()):
+        directory, level = pending.pop()
+        if os.path.lexists(os.path.join(directory, ".git")):
+            repositories.append(directory)
+            continue
+        if level >= depth:
+            continue
+        try:
+            with os.scandir(directory) as scanner:
+                for item in scanner:
+                    if item.is_dir(follow_symlinks=False):
+                        pending.append((item.path, level + 1))
+        except OSError:  # unreadable directory
+            pass
+    return sorted(repositories)
+
+
+def summarize(path: str, engine: GitEngine) -> RepositorySummary:
+    """
+    :param path: path to working tree
+    :param engine: engine with queried status
+    :return: summary of status
+    """
+    files, branch = engine.files, engine.branch
+    return RepositorySummary(
+        path=path,
+        head=branch.head if branch else None,
+        ahead=branch.ahead if branch else 0,
+        behind=branch.behind if branch else 0,
+        upstream=branch.upstream if branch else None,
+        files=len(files),
+        staged=staged_count(files),
+        untracked=sum(bin(byte).count("1") for byte in files.untracked_mask)
+    )
+
+
+def staged_count(files: FileTable) -> int:
+    return len(files.staged) - files.staged.tobytes().count(0)
+
+
+async def summary(path: str) -> RepositorySummary:
+    """
+    :param path: path to working tree
+    :return: summary of its status, errors are reported in summary
+    """
+    engine = GitEngine(path)
+    try:
+        await engine.status()
+    except (GitException, OSError) as e:  # like repository removed meanwhile
+        return RepositorySummary(path, error=str(e) or type(e).__name__)
+    return summarize(path, engine)
+
+
+async def scan(paths: List[str], workers: int = WORKSPACE_WORKERS,
+               scanned: Optional[Callable[[RepositorySummary], None]] = None)\
+        -> List[RepositorySummary]:
+    """
+    query status of repositories, at most workers at once
+    :param paths: paths to working trees
+    :param workers: number of repositories queried simultaneously
+    :param scanned: callback receiving summaries in order they are ready
+    :return: summaries in order of paths
+    """
+    semaphore = asyncio.Semaphore(max(1, workers))
+
+    async def query(path: str) -> RepositorySummary:
+        async with semaphore:
+            result = await summary(path)
+        if scanned is not None:
+            scanned(result)
+        return result
+
+    return list(await asyncio.gather(*(query(path) for path in paths)))
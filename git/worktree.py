@@ -0,0 +1,306 @@
+import hashlib
+import os
+import stat
+from typing import Dict, List, Optional, Set, Tuple
+
+from model.branch import BranchInfo
+from model.status import FileStatus
+from .gitconfig import boolean, config_paths, path_value, read_config
+from .ignore import IgnorePattern, global_excludes_file, is_ignored, \
+    read_patterns
+from .index import ASSUME_VALID, INTENT_TO_ADD, SKIP_WORKTREE, \
+    IndexEntry, UnsupportedIndex, read_index
+from .objects import ObjectNotFound, ObjectReader
+from .porcelain import StatusEntry
+from .refs import find_git_dir, read_head
+
+GITLINK = 0o160000
+SYMLINK = 0o120000
+EXECUTABLE = 0o111
+UNSUPPORTED_EXTENSIONS = {
+    b"link": "split index",
+    b"sdir": "sparse index",
+}
+
+
+class UnsupportedRepository(Exception):
+    """
+    repository state can't be reproduced in-process,
+    'git status' has to be used
+    """
+    pass
+
+
+def blob_id(data: bytes) -> bytes:
+    """
+    :param data: file content
+    :return: binary id git gives to the content
+    """
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).digest()
+
+
+class WorktreeStatus:
+    """
+    In-process equivalent of 'git status --porcelain=v2 --branch'
+    for repositories without staged changes: index entries are compared
+    with worktree stat data and only files with ambiguous stat data
+    are hashed
+    """
+    def __init__(self, path: str):
+        """
+        :param path: path to the root of working tree
+        """
+        self.path = path
+        self.git_dir = find_git_dir(path)
+        if self.git_dir is None:
+            raise UnsupportedRepository("not a worktree root")
+        self.config = read_config(config_paths(self.git_dir))
+        self.check_config()
+        self.file_mode = boolean(self.config, "core.filemode", True)
+        self.trust_ctime = boolean(self.config, "core.trustctime", True)
+        self.index_path = os.path.join(self.git_dir, "index")
+        self.converting = False
+
+    def check_config(self):
+        """
+        :return: None, raises UnsupportedRepository if config enables
+        features changing status output
+        """
+        config = self.config
+        if config.get("extensions.objectformat", "sha1").lower() != "sha1":
+            raise UnsupportedRepository("object format")
+        if boolean(config, "core.sparsecheckout", False):
+            raise UnsupportedRepository("sparse checkout")
+        if boolean(config, "core.ignorecase", False):
+            raise UnsupportedRepository("case insensitive filesystem")
+        if config.get("status.showuntrackedfiles", "normal").lower() \
+                not in ("normal", "true"):
+            raise UnsupportedRepository("untracked files mode")
+        if "core.worktree" in config:
+            raise UnsupportedRepository("separate worktree")
+
+    def converts_content(self, tracked: Dict[str, IndexEntry]) -> bool:
+        """
+        :param tracked: index entries by path
+        :return: may content of files differ from blobs because of
+        line ending conversion or filters
+        """
+        return self.config.get("core.autocrlf", "false").lower() != "false" \
+            or "core.eol" in self.config \
+            or any(key.startswith("filter.") for key in self.config) \
+            or os.path.exists(os.path.join(self.git_dir, "info", "attributes")) \
+            or any(path.rpartition("/")[2] == ".gitattributes"
+                   for path in tracked)
+
+    def read(self) -> Tuple[BranchInfo, List[StatusEntry]]:
+        """
+        :return: branch header and status entries ordered like
+        in 'git status --porcelain=v2' output
+        """
+        try:
+            index_stat = os.stat(self.index_path)
+            index = read_index(self.index_path)
+        except FileNotFoundError:
+            index_stat, index = None, None
+        except UnsupportedIndex as e:
+            raise UnsupportedRepository(str(e))
+
+        entries = index.entries if index is not None else []
+        for signature in index.extensions if index is not None else []:
+            if signature in UNSUPPORTED_EXTENSIONS:
+                raise UnsupportedRepository(UNSUPPORTED_EXTENSIONS[signature])
+
+        branch = self.read_branch(entries, index.tree if index else None)
+        tracked = {}  # type: Dict[str, IndexEntry]
+        for entry in entries:
+            if entry.stage or entry.mode == GITLINK:
+                raise UnsupportedRepository("unmerged entries or submodules")
+            if entry.extended_flags & (SKIP_WORKTREE | INTENT_TO_ADD):
+                raise UnsupportedRepository("sparse or intent-to-add entries")
+            tracked[entry.path] = entry
+        self.converting = self.converts_content(tracked)
+
+        seen = {}  # type: Dict[str, os.stat_result]
+        untracked = []  # type: List[str]
+        self.walk("", self.root_patterns(), False, tracked,
+                  self.tracked_directories(tracked), seen, untracked)
+
+        racy_since = index_stat.st_mtime_ns if index_stat else 0
+        result = []
+        for entry in entries:
+            status = self.compare(entry, seen.get(entry.path), racy_since)
+            if status is not None:
+                result.append(StatusEntry(entry.path, unstaged=status))
+        untracked.sort(key=lambda path: path.encode("utf-8", "surrogateescape"))
+        result.extend(
+            StatusEntry(path, unstaged=FileStatus.new, untracked=True)
+            for path in untracked
+        )
+        return branch, result
+
+    def read_branch(self, entries: List[IndexEntry],
+                    tree: Optional[str]) -> BranchInfo:
+        """
+        make sure nothing is staged: root of index cache-tree
+        must be the tree of HEAD commit
+        :param entries: index entries
+        :param tree: root tree id of cache-tree extension
+        :return: branch header without upstream information
+        """
+        ref, oid = read_head(self.git_dir)
+        head = ref[len("refs/heads/"):] \
+            if ref and ref.startswith("refs/heads/") else ref
+        if oid is None:
+            if entries:
+                raise UnsupportedRepository("files staged for initial commit")
+            return BranchInfo(oid=None, head=head)
+        try:
+            head_tree = ObjectReader(self.git_dir).commit_tree(oid)
+        except (ObjectNotFound, KeyError, ValueError) as e:
+            raise UnsupportedRepository("unreadable HEAD: {}".format(e))
+        if tree != head_tree:
+            raise UnsupportedRepository("staged changes or stale cache-tree")
+        return BranchInfo(oid=oid, head=head)
+
+    def root_patterns(self) -> List[IgnorePattern]:
+        """
+        :return: user-wide and repository-wide ignore patterns
+        """
+        return read_patterns(global_excludes_file(
+            path_value(self.config, "core.excludesfile")), "") + \
+            read_patterns(os.path.join(self.git_dir, "info", "exclude"), "")
+
+    @staticmethod
+    def tracked_directories(tracked: Dict[str, IndexEntry]) -> Set[str]:
+        """
+        :return: every directory containing tracked files, like 'a/b/'
+        """
+        directories = set()
+        for path in tracked:
+            end = path.rfind("/")
+            while end != -1:
+                directory = path[:end + 1]
+                if directory in directories:
+                    break
+                directories.add(directory)
+                end = path.rfind("/", 0, end)
+        return directories
+
+    def walk(self, directory: str, patterns: List[IgnorePattern],
+             ignored: bool, tracked: Dict[str, IndexEntry],
+             tracked_directories: Set[str], seen: Dict[str, os.stat_result],
+             untracked: List[str]):
+        """
+        collect stat data of tracked files and untracked paths,
+        untracked directories are reported as a whole like 'dir/'
+        :param directory: directory relative to root, '' or 'a/b/'
+        :param patterns: ignore patterns of parent directories
+        :param ignored: is directory itself ignored
+        :param tracked: index entries by path
+        :param tracked_directories: directories containing tracked files
+        :param seen: collected stat data of tracked files
+        :param untracked: collected untracked paths
+        :return: None
+        """
+        absolute = os.path.join(self.path, directory)
+        patterns = patterns + read_patterns(
+            os.path.join(absolute, ".gitignore"), directory)
+        with os.scandir(absolute) as scanner:
+            for item in scanner:
+                if item.name == ".git":
+                    continue
+                path = directory + item.name
+                if item.is_dir(follow_symlinks=False):
+                    path += "/"
+                    hidden = ignored or is_ignored(patterns, path[:-1], True)
+                    if path in tracked_directories:
+                        self.walk(path, patterns, hidden, tracked,
+                                  tracked_directories, seen, untracked)
+                    elif not hidden and self.has_untracked(path, patterns):
+                        untracked.append(path)
+                elif path in tracked:
+                    seen[path] = item.stat(follow_symlinks=False)
+                elif not ignored and not is_ignored(patterns, path, False):
+                    untracked.append(path)
+
+    def has_untracked(self, directory: str,
+                      patterns: List[IgnorePattern]) -> bool:
+        """
+        :param directory: untracked directory relative to root, 'a/b/'
+        :param patterns: ignore patterns of parent directories
+        :return: does directory contain any not ignored file,
+        nested repositories are always reported
+        """
+        absolute = os.path.join(self.path, directory)
+        if os.path.exists(os.path.join(absolute, ".git")):
+            return True
+        patterns = patterns + read_patterns(
+            os.path.join(absolute, ".gitignore"), directory)
+        try:
+            with os.scandir(absolute) as scanner:
+                for item in scanner:
+                    path = directory + item.name
+                    if item.is_dir(follow_symlinks=False):
+                        if not is_ignored(patterns, path, True) and \
+                                self.has_untracked(path + "/", patterns):
+                            return True
+                    elif not is_ignored(patterns, path, False):
+                        return True
+        except OSError:
+            pass
+        return False
+
+    def compare(self, entry: IndexEntry, current: os.stat_result,
+                racy_since: int):
+        """
+        :param entry: index entry
+        :param current: stat data of worktree file, None if it is missing
+        :param racy_since: index mtime, entries modified at that time or
+        later can't be trusted by stat data only
+        :return: FileStatus of unstaged change or None if file is clean
+        """
+        if current is None:
+            return FileStatus.deleted
+        if entry.flags & ASSUME_VALID:
+            return None
+        is_link = stat.S_ISLNK(current.st_mode)
+        if is_link != (entry.mode == SYMLINK):
+            return FileStatus.typechanged
+        if self.file_mode and not is_link and \
+                bool(current.st_mode & EXECUTABLE) != \
+                bool(entry.mode & EXECUTABLE):
+            return FileStatus.modified
+        if (current.st_size & 0xffffffff) != entry.size \
+                and not self.converting:
+            return FileStatus.modified
+        if current.st_mtime_ns == entry.mtime \
+                and (not self.trust_ctime or current.st_ctime_ns == entry.ctime) \
+                and (not entry.ino or current.st_ino & 0xffffffff == entry.ino) \
+                and (current.st_size & 0xffffffff) == entry.size \
+                and entry.mtime < racy_since:
+            return None
+        return None if self.hash(entry.path, is_link) == entry.oid \
+            else FileStatus.modified
+
+    def hash(self, path: str, is_link: bool) -> bytes:
+        """
+        :param path: path relative to root
+        :param is_link: is path a symbolic link
+        :return: id git would give to current content
+        """
+        if self.converting:
+            raise UnsupportedRepository("content conversion")
+        absolute = os.path.join(self.path, path)
+        if is_link:
+            return blob_id(os.fsencode(os.readlink(absolute)))
+        with open(absolute, "rb") as f:
+            return blob_id(f.read())
+
+
+def read_status(path: str) -> Tuple[BranchInfo, List[StatusEntry]]:
+    """
+    :param path: path to the root of working tree
+    :return: branch header and status entries,
+    raises UnsupportedRepository if 'git status' has to be used
+    """
+    return WorktreeStatus(path).read()
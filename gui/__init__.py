@@ -0,0 +1,70 @@
+"""
+package-relative access to views and stylesheets.
+Precompiled modules made by 'python -m gui.build' are used when present
+and not older than their sources, .ui and .qss files are read otherwise
+"""
+import importlib
+import os
+from typing import Optional
+
+from PyQt5.QtWidgets import QWidget
+
+from config import GUI_PRECOMPILED
+
+GUI_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILED_PACKAGE = "gui.compiled"
+
+
+def compiled_module(name: str, source: str):
+    """
+    :param name: module name, like 'git_file_list'
+    :param source: path of file the module is built from
+    :return: compiled module or None if it is not built
+    or source is changed since, like after checkout of new widgets
+    """
+    if not GUI_PRECOMPILED:
+        return None
+    try:
+        if os.path.getmtime(source) > os.path.getmtime(
+                os.path.join(GUI_DIR, "compiled", name + ".py")):
+            return None
+    except OSError:
+        return None
+    try:
+        return importlib.import_module(COMPILED_PACKAGE + "." + name)
+    except ImportError:
+        return None
+
+
+def load_view(name: str, base: Optional[QWidget] = None) -> QWidget:
+    """
+    Equivalent of PyQt5.uic.loadUi for gui/<name>.ui:
+    child widgets are set as attributes of resulting widget
+    :param name: view name, like 'git_file_list'
+    :param base: widget to set view up in, new widget is created if None
+    :return: widget with view
+    """
+    ui_path = os.path.join(GUI_DIR, name + ".ui")
+    module = compiled_module(name, ui_path)
+    if module is None:
+        from PyQt5.uic import loadUi
+        return loadUi(ui_path, base)
+    widget = base if base is not None else module.WIDGET()
+    ui = module.UI()
+    ui.setupUi(widget)
+    for attribute, value in vars(ui).items():
+        setattr(widget, attribute, value)
+    return widget
+
+
+def load_style(name: str) -> str:
+    """
+    :param name: stylesheet name, like 'git_file_list'
+    :return: content of gui/<name>.qss
+    """
+    qss_path = os.path.join(GUI_DIR, name + ".qss")
+    module = compiled_module("styles", qss_path)
+    if module is not None and name in module.STYLES:
+        return module.STYLES[name]
+    with open(qss_path, 'r') as f:
+        return f.read()
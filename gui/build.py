@@ -0,0 +1,73 @@
+"""
+build step compiling gui/*.ui and gui/*.qss into importable modules
+of gui/compiled package
+
+run from repository root:
+    python -m gui.build
+"""
+import glob
+import io
+import os
+import xml.etree.ElementTree as ElementTree
+
+from PyQt5.uic import compileUi
+
+from gui import GUI_DIR
+
+COMPILED_DIR = os.path.join(GUI_DIR, "compiled")
+HEADER = "# generated by 'python -m gui.build', do not edit\n"
+
+
+def build_view(ui_path: str) -> str:
+    """
+    :param ui_path: path to .ui file
+    :return: path to compiled module
+    """
+    name = os.path.splitext(os.path.basename(ui_path))[0]
+    root = ElementTree.parse(ui_path).getroot()
+    widget_class = root.find("widget").get("class")
+
+    source = io.StringIO()
+    with open(ui_path, "r", encoding="utf-8") as ui_file:
+        compileUi(ui_file, source, from_imports=False)
+    ui_class = next(
+        line.split()[1].split("(")[0]
+        for line in source.getvalue().splitlines()
+        if line.startswith("class Ui_")
+    )
+    module_path = os.path.join(COMPILED_DIR, name + ".py")
+    with open(module_path, "w", encoding="utf-8") as module:
+        module.write(HEADER)
+        module.write(source.getvalue())
+        module.write("\n\nUI = {}\nWIDGET = QtWidgets.{}\n".format(
+            ui_class, widget_class))
+    return module_path
+
+
+def build_styles() -> str:
+    """
+    :return: path to module with content of all stylesheets
+    """
+    styles = {}
+    for qss_path in sorted(glob.glob(os.path.join(GUI_DIR, "*.qss"))):
+        name = os.path.splitext(os.path.basename(qss_path))[0]
+        with open(qss_path, "r", encoding="utf-8") as qss_file:
+            styles[name] = qss_file.read()
+    module_path = os.path.join(COMPILED_DIR, "styles.py")
+    with open(module_path, "w", encoding="utf-8") as module:
+        module.write(HEADER)
+        module.write("STYLES = {!r}\n".format(styles))
+    return module_path
+
+
+def main():
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    with open(os.path.join(COMPILED_DIR, "__init__.py"), "w") as init:
+        init.write(HEADER)
+    for ui_path in sorted(glob.glob(os.path.join(GUI_DIR, "*.ui"))):
+        print(build_view(ui_path))
+    print(build_styles())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,51 +1,126 @@
 import sys
-import os
-from typing import List
 
-from PyQt5.QtCore import pyqtSlot
-from PyQt5.QtWidgets import QMainWindow, QApplication, QFileDialog, QFrame
-from PyQt5.uic import loadUi
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QEvent, QObject, QTimer, Qt
+from PyQt5.QtGui import QCloseEvent
+from PyQt5.QtWidgets import QMainWindow, QApplication, QFileDialog, QFrame, \
+    QMessageBox, QSplitter
 
 from git import PQGitSpeaker, NotAGitRepository, GitException
-from controllers import PQFileListController
-from model.file import PQFileModel
+from config import DIFF_PREFETCH, DIFF_PREFETCH_DELAY, TRACE_FILE, \
+    TRACE_PANEL
+from controllers import PQDiffController, PQFileListController, \
+    PQTraceController, PQWorkspaceController
+from git.trace import ChromeTraceFile, tracer
+from gui import load_view, load_style
+from model.branch import BranchInfo
+from model.file_table import FileDelta
+from model.push import PushProgress, PushState
 
 
 class PQGitHelper(QMainWindow):
+    ready = pyqtSignal()  # subcontrollers are set up
+
     def __init__(self):
         super().__init__()
         self.result = ""
 
-        # subcontrollers
-        self.list = PQFileListController()
-        self.git = PQGitSpeaker()
+        # subcontrollers, set up after the first paint of the window
+        self.list = None
+        self.diff = None
+        self.files_panel = None
+        self.workspace = None
+        self.trace = None
+        self.git = None
 
         # view
-        self.view = QFrame()
-        self.view = loadUi("gui/main.ui", self.view)
-
-        # setting styles
-        style_path = os.path.join('gui', 'main.qss')
-        style_path = os.path.abspath(style_path)
-        self.view.setStyleSheet(open(style_path, 'r').read())
-
-        # adding subcontrollers view
-        self.view.layout().addWidget(self.list.view, 1, 0, 1, 2)
-
+        self.view = load_view("main", QFrame())
+        self.view.setStyleSheet(load_style("main"))
         self.setCentralWidget(self.view)
-        self.show()
-
-        # adding handlers to subcontrollers
-        self.git.got_files.connect(self.got_files)
-        self.git.error_occurred.connect(self.dispatch_error)
 
         # adding handlers to view
         self.view.folder_button.clicked.connect(self.select_folder)
+        self.view.workspace_button.clicked.connect(self.select_workspace)
         self.view.commit_button.clicked.connect(self.commit)
+        self.view.push_button.clicked.connect(self.push)
         self.view.refresh_button.clicked.connect(self.refresh)
+        self.view.stop_button.clicked.connect(self.stop)
         self.view.commit_message.textChanged.connect(self.redraw)
 
+        self.view.installEventFilter(self)
         self.redraw()
+        self.show()
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        """
+        schedules setup of subcontrollers when view is painted first time
+        """
+        if watched is self.view and event.type() == QEvent.Paint:
+            self.view.removeEventFilter(self)
+            QTimer.singleShot(0, self.setup)
+        return super().eventFilter(watched, event)
+
+    @pyqtSlot()
+    def setup(self):
+        """
+        Creates file list and git subsystem, so they don't delay
+        the first paint of the window
+        :return: None
+        """
+        # subcontrollers
+        self.list = PQFileListController()
+        self.diff = PQDiffController()
+        self.workspace = PQWorkspaceController()
+        self.git = PQGitSpeaker()
+
+        # adding subcontrollers view, workspace is shown instead of files
+        self.files_panel = QSplitter(Qt.Vertical)
+        self.files_panel.addWidget(self.list.view)
+        self.files_panel.addWidget(self.diff.view)
+        self.view.layout().addWidget(self.files_panel, 1, 0, 1, 2)
+        self.view.layout().addWidget(self.workspace.view, 1, 0, 1, 2)
+        self.workspace.view.hide()
+
+        # diffs around selected file are loaded when selection settles
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(DIFF_PREFETCH_DELAY)
+        self.prefetch_timer.timeout.connect(self.prefetch_diffs)
+
+        # adding handlers to subcontrollers
+        self.git.files_changed.connect(self.files_changed)
+        self.git.error_occurred.connect(self.dispatch_error)
+        self.git.commit_progress.connect(self.commit_progress)
+        self.git.pushed.connect(self.committed)
+        self.git.push_state_changed.connect(self.push_state_changed)
+        self.git.push_progress.connect(self.push_progress)
+        self.git.status_slow.connect(self.status_slow)
+        self.git.stale_changed.connect(self.list.set_stale)
+        self.git.branch_changed.connect(self.branch_changed)
+        self.workspace.repository_selected.connect(self.open_repository)
+        self.list.selected.connect(self.file_selected)
+        self.git.diff_loaded.connect(self.diff.show_diff)
+
+        # command timings
+        if TRACE_FILE:
+            tracer.add_sink(ChromeTraceFile(TRACE_FILE))
+        if TRACE_PANEL:
+            self.trace = PQTraceController()
+            self.view.layout().addWidget(self.trace.view, 3, 0, 1, 3)
+            self.git.traced.connect(self.trace.record)
+
+        # files of the last repository are shown before fresh status
+        self.git.restore_snapshot()
+
+        self.redraw()
+        self.ready.emit()
+
+    def closeEvent(self, event: QCloseEvent):
+        """
+        saves status of current repository for the next launch
+        """
+        if self.git is not None:
+            self.git.save_snapshot()
+        super().closeEvent(event)
 
     @property
     def message(self)->str:
@@ -61,20 +136,76 @@ class PQGitHelper(QMainWindow):
         dlg = QFileDialog()
         dlg.setFileMode(QFileDialog.Directory)
         if dlg.exec_():
-            self.git.set_path(
+            self.open_repository(
                 dlg.selectedFiles()[0].__repr__().strip("'")
             )
         self.redraw()
 
-    @pyqtSlot(list)
-    def got_files(self, files: List[PQFileModel]):
+    @pyqtSlot()
+    def select_workspace(self):
+        """
+        Handler for workspace button.
+        Renders dialog for selection of folder with repositories
+        and shows their status instead of file list
+        :return: None
+        """
+        dlg = QFileDialog()
+        dlg.setFileMode(QFileDialog.Directory)
+        if dlg.exec_():
+            self.files_panel.hide()
+            self.workspace.view.show()
+            self.workspace.scan(dlg.selectedFiles()[0])
+        self.redraw()
+
+    @pyqtSlot(str)
+    def open_repository(self, path: str):
+        """
+        Shows files of repository in place of workspace
+        :param path: git folder path
+        :return: None
+        """
+        self.workspace.view.hide()
+        self.files_panel.show()
+        self.diff.select(None)
+        self.git.set_path(path)
+        self.redraw()
+
+    @pyqtSlot(FileDelta)
+    def files_changed(self, delta: FileDelta):
         """
-        Handler for PQGitSpeaker.got_files signal.
-        Renders files to PQFilesListController's view
-        :param files: list of PQFileModel got from git
+        Handler for PQGitSpeaker.files_changed signal.
+        Applies changed files to PQFilesListController's view
+        :param delta: changes of files got from git
         :return: None
         """
-        self.list.model = files
+        self.list.apply(delta)
+        current = self.list.current
+        if current is not None:  # shown diff may be changed
+            self.git.load_diff(current)
+
+    @pyqtSlot(object)
+    def file_selected(self, file):
+        """
+        Handler for PQFileListController.selected signal.
+        Shows diff of file and plans prefetch of diffs around it
+        :param file: FileRow of selected file or None
+        :return: None
+        """
+        self.diff.select(file.path if file is not None else None)
+        if file is not None:
+            self.git.load_diff(file)
+            self.prefetch_timer.start()
+
+    @pyqtSlot()
+    def prefetch_diffs(self):
+        """
+        Loads diffs of files around selected one if git is idle
+        :return: None
+        """
+        if self.git.cmd.depth:
+            self.prefetch_timer.start()
+            return
+        self.git.prefetch_diffs(self.list.neighbours(DIFF_PREFETCH))
 
     @pyqtSlot()
     def refresh(self):
@@ -86,10 +217,19 @@ class PQGitHelper(QMainWindow):
         self.view.output.setText("")
         self.redraw()
         if self.git.path:
-            self.git.get_files()
+            self.git.refresh()
         else:
             self.dispatch_error(NotAGitRepository())
 
+    @pyqtSlot()
+    def stop(self):
+        """
+        Handler for stop button.
+        Terminates running git processes, like push waiting for network
+        :return: None
+        """
+        self.git.cancel()
+
     @pyqtSlot()
     def commit(self):
         """
@@ -102,6 +242,99 @@ class PQGitHelper(QMainWindow):
         else:
             self.view.output.setText("nothing to commit")
 
+    @pyqtSlot()
+    def push(self):
+        """
+        Handler for push button.
+        Pushes commits in background, like after failed push
+        :return: None
+        """
+        self.git.push_commits()
+
+    @pyqtSlot()
+    def committed(self):
+        """
+        Handler for PQGitSpeaker.pushed signal.
+        Commit is done, push state is shown apart
+        :return: None
+        """
+        self.view.commit_message.clear()
+        self.view.output.setText("")
+
+    @pyqtSlot(object, str)
+    def push_state_changed(self, state: PushState, message: str):
+        """
+        Handler for PQGitSpeaker.push_state_changed signal.
+        :param state: state of background push
+        :param message: details of the state, like error
+        :return: None
+        """
+        text = "" if state == PushState.idle else "push: " + state.name
+        self.view.push_status.setText(
+            text + (" ({})".format(message) if message else ""))
+        self.redraw()
+
+    @pyqtSlot(PushProgress)
+    def push_progress(self, progress: PushProgress):
+        """
+        Handler for PQGitSpeaker.push_progress signal.
+        :param progress: progress line reported by git
+        :return: None
+        """
+        self.view.push_status.setText("push: {} {}% ({}/{})".format(
+            progress.stage.lower(), progress.percent, progress.done,
+            progress.total))
+
+    @pyqtSlot(object)
+    def branch_changed(self, branch: BranchInfo):
+        """
+        Handler for PQGitSpeaker.branch_changed signal.
+        Shows branch, its upstream and commits ahead of and behind it
+        :param branch: branch header or None if it is unknown
+        :return: None
+        """
+        if branch is None:
+            self.view.branch_label.setText("")
+            return
+        text = branch.head or "detached HEAD"
+        if branch.upstream:
+            text += " \u2192 " + branch.upstream
+            if branch.ahead:
+                text += " \u2191{}".format(branch.ahead)
+            if branch.behind:
+                text += " \u2193{}".format(branch.behind)
+        self.view.branch_label.setText(text)
+
+    @pyqtSlot(str, float, list)
+    def status_slow(self, path: str, seconds: float, names: list):
+        """
+        Handler for PQGitSpeaker.status_slow signal.
+        Asks the user to turn on git features making status faster,
+        they change config of repository
+        :param path: git folder path
+        :param seconds: mean duration of status
+        :param names: config variables to turn on
+        :return: None
+        """
+        answer = QMessageBox.question(
+            self, "Slow repository",
+            "git status of {} takes {:.1f} s.\n"
+            "Turn on {} in its config to make it faster?".format(
+                path, seconds, " and ".join(names)))
+        if answer == QMessageBox.Yes and path == self.git.path:
+            self.git.enable_fast_status(names)
+
+    @pyqtSlot(int, int)
+    def commit_progress(self, done: int, total: int):
+        """
+        Handler for PQGitSpeaker.commit_progress signal.
+        Displays number of finished commit steps
+        :param done: number of finished steps
+        :param total: number of all steps
+        :return: None
+        """
+        self.view.output.setText("committing: {}/{}".format(done, total))
+
     @pyqtSlot(GitException)
     def dispatch_error(self, error: GitException):
         """
@@ -115,6 +348,7 @@ class PQGitHelper(QMainWindow):
         except NotAGitRepository:
             self.git.abort()
             self.list.clear()
+            self.diff.select(None)
             self.view.output.setText("Provide correct git repository folder")
         except GitException as e:
             self.view.output.setText(str(e))
@@ -125,11 +359,21 @@ class PQGitHelper(QMainWindow):
         Enables or disables control buttons depending on controllers state
         :return: None
         """
+        path = self.git.path if self.git is not None else None
+        self.view.folder_button.setEnabled(self.git is not None)
+        self.view.workspace_button.setEnabled(self.git is not None)
         self.view.commit_button.setEnabled(
-            bool(self.git.path and self.message)
+            bool(path and self.message)
+        )
+        self.view.push_button.setEnabled(
+            bool(path) and self.git.push_state not in (
+                PushState.pushing, PushState.waiting)
         )
         self.view.refresh_button.setEnabled(
-            bool(self.git.path)
+            bool(path)
+        )
+        self.view.stop_button.setEnabled(
+            bool(path)
         )
 
 
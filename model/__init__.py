@@ -1,3 +1,35 @@
-from model.file import PQFileModel
+from model.branch import BranchInfo
+from model.file_table import FileDelta, FileRow, FileTable
+from model.path_index import PathIndex
+from model.push import PushProgress, PushState
+from model.status import FileStatus
 
-__all__ = ("PQFileModel", )
+__all__ = (
+    "BranchInfo", "PQFileModel", "PQFileListModel", "PQFileTreeModel",
+    "PQTraceModel", "PQWorkspaceModel", "FileDelta", "FileRow", "FileStatus",
+    "FileTable", "PathIndex", "PushProgress", "PushState"
+)
+
+
+def __getattr__(name: str):
+    """
+    Qt models are imported on first access,
+    so the package can be used without Qt
+    """
+    if name == "PQFileModel":
+        from model.file import PQFileModel
+        return PQFileModel
+    if name == "PQFileListModel":
+        from model.file_list import PQFileListModel
+        return PQFileListModel
+    if name == "PQFileTreeModel":
+        from model.file_tree import PQFileTreeModel
+        return PQFileTreeModel
+    if name == "PQTraceModel":
+        from model.trace import PQTraceModel
+        return PQTraceModel
+    if name == "PQWorkspaceModel":
+        from model.workspace import PQWorkspaceModel
+        return PQWorkspaceModel
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
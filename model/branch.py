@@ -0,0 +1,12 @@
+from typing import NamedTuple, Optional
+
+
+class BranchInfo(NamedTuple):
+    """
+    Branch header of 'git status --branch' output
+    """
+    oid: Optional[str] = None  # None for initial commit
+    head: Optional[str] = None  # None for detached HEAD
+    upstream: Optional[str] = None
+    ahead: int = 0
+    behind: int = 0
@@ -0,0 +1,70 @@
+from typing import NamedTuple
+
+from config import DIFF_MAX_BYTES, DIFF_MAX_LINES
+
+BINARY_MARKERS = (b"Binary files ", b"GIT binary patch")
+BINARY_PROBE = 8000  # bytes of file checked for NUL, like git does
+
+
+class DiffText(NamedTuple):
+    """
+    Rendered diff of one file
+    """
+    path: str  # relative path of file
+    text: str
+    binary: bool = False
+    truncated: bool = False  # text is cut at DIFF_MAX_BYTES or DIFF_MAX_LINES
+
+    @property
+    def size(self) -> int:
+        """
+        :return: approximate memory taken by text, for cache limits
+        """
+        return len(self.text)
+
+
+def truncate(path: str, data: bytes) -> DiffText:
+    """
+    :param path: relative path of file
+    :param data: raw diff output
+    :return: diff decoded, cut at whole line within size limits
+    """
+    truncated = False
+    if len(data) > DIFF_MAX_BYTES:
+        data = data[:data.rfind(b"\n", 0, DIFF_MAX_BYTES) + 1]
+        truncated = True
+    lines = data.split(b"\n", DIFF_MAX_LINES)
+    if len(lines) > DIFF_MAX_LINES:
+        data = b"\n".join(lines[:DIFF_MAX_LINES]) + b"\n"
+        truncated = True
+    return DiffText(path, data.decode("utf-8", "replace"), False, truncated)
+
+
+def render_diff(path: str, data: bytes) -> DiffText:
+    """
+    :param path: relative path of file
+    :param data: output of 'git diff' for the file
+    :return: diff, binary files are reported without content
+    """
+    if any(marker in data for marker in BINARY_MARKERS):
+        return DiffText(path, "binary file differs", True)
+    if not data:
+        return DiffText(path, "no changes in working tree against HEAD")
+    return truncate(path, data)
+
+
+def render_new_file(path: str, data: bytes) -> DiffText:
+    """
+    :param path: relative path of file
+    :param data: beginning of file content, more than DIFF_MAX_BYTES
+    if file is longer
+    :return: diff adding the whole file
+    """
+    if b"\0" in data[:BINARY_PROBE]:
+        return DiffText(path, "new binary file", True)
+    lines = data.split(b"\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    header = "new file {}\n@@ -0,0 +1,{} @@\n".format(path, len(lines))
+    diff = truncate(path, b"".join(b"+" + line + b"\n" for line in lines))
+    return diff._replace(text=header + diff.text)
@@ -1,10 +1,8 @@
-from typing import Union
-from enum import Enum
+from typing import Union, Optional
 
 from PyQt5.QtCore import QObject, pyqtSignal
 
-
-FileStatus = Enum('FileCondition', 'new modified renamed deleted')
+from model.status import FileStatus
 
 
 class PQFileModel(QObject):
@@ -13,11 +11,25 @@ class PQFileModel(QObject):
         "new file": FileStatus.new,
         "modified": FileStatus.modified,
         "renamed": FileStatus.renamed,
-        "deleted": FileStatus.deleted
+        "deleted": FileStatus.deleted,
+        "copied": FileStatus.copied,
+        "typechange": FileStatus.typechanged,
+        "unmerged": FileStatus.unmerged
     }
 
     def __init__(self, tracked: bool, status: Union[str, FileStatus],
-                 path: str):
+                 path: str, staged: Optional[FileStatus]=None,
+                 unstaged: Optional[FileStatus]=None,
+                 untracked: bool=False, orig_path: Optional[str]=None):
+        """
+        :param tracked: is file already added to commit
+        :param status: resulting status of the file
+        :param path: relative path to the file
+        :param staged: status of changes added to index, None if not any
+        :param unstaged: status of changes in working tree, None if not any
+        :param untracked: is file not known to git at all
+        :param orig_path: path the file had before rename or copy
+        """
         super().__init__()
         self.__tracked = tracked
         if not status:
@@ -28,9 +40,15 @@ class PQFileModel(QObject):
             status = status.replace(":", "")
             self.__status = self.status_mapping[status]
         self.__path = path
+        self.__staged = staged
+        self.__unstaged = unstaged
+        self.__untracked = untracked
+        self.__orig_path = orig_path
 
     def copy(self):
-        return PQFileModel(self.tracked, self.status, self.path)
+        return PQFileModel(self.tracked, self.status, self.path,
+                           self.staged, self.unstaged,
+                           self.untracked, self.orig_path)
 
     @property
     def tracked(self)->bool:
@@ -59,6 +77,26 @@ class PQFileModel(QObject):
         self.__path = val
         self.changed.emit()
 
+    @property
+    def staged(self) -> Optional[FileStatus]:
+        return self.__staged
+
+    @property
+    def unstaged(self) -> Optional[FileStatus]:
+        return self.__unstaged
+
+    @property
+    def untracked(self) -> bool:
+        return self.__untracked
+
+    @property
+    def renamed(self) -> bool:
+        return self.__staged is FileStatus.renamed
+
+    @property
+    def orig_path(self) -> Optional[str]:
+        return self.__orig_path
+
     def update(self, tracked: Union[bool, None]=None,
                status: Union[FileStatus, None]=None,
                path: Union[str, None]=None):
@@ -0,0 +1,230 @@
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QVariant
+
+from model.file_table import FileDelta, FileTable, test_bit
+from model.selection import all_rows, mask_value, value_mask
+
+
+class PQFileListModel(QAbstractTableModel):
+    """
+    Table model of git files for item views over FileTable snapshot,
+    so views only paint visible rows and no object is kept per file.
+    Commit choices of the user are a bitmask over snapshot rows
+    """
+    COMMITTED, STATUS, PATH = range(3)
+    headers = ("commit", "status", "path")
+
+    def __init__(self):
+        super().__init__()
+        self.__table = FileTable()
+        self.__tracked = bytearray()
+        self.__count = 0  # rows shown, differs from table while applying delta
+
+    def populate(self, files: FileTable):
+        """
+        replace all rows with provided files
+        :param files: status snapshot
+        :return: None
+        """
+        self.beginResetModel()
+        self.__table = files
+        self.__tracked = bytearray(files.tracked_mask)
+        self.__count = len(files)
+        self.endResetModel()
+
+    def apply(self, delta: FileDelta):
+        """
+        Update rows in place: views get row removal, insertion and data
+        change notifications only for rows of the delta. Commit choices
+        the user made differently from git state are kept for files
+        remaining in the list
+        :param delta: changes of status snapshot shown
+        :return: None
+        """
+        if delta.previous is not self.__table:
+            self.populate(delta.table)
+            return
+        previous, table = delta.previous, delta.table
+        removed = list(self.ranges(delta.removed))
+        added = list(self.ranges(delta.added))
+
+        # choices differing from git state move along with their rows
+        choices = int.from_bytes(self.__tracked, "little")
+        overrides = choices ^ int.from_bytes(previous.tracked_mask, "little")
+        choices &= overrides
+        for first, last in reversed(removed):
+            overrides = self.remove_bits(overrides, first, last)
+            choices = self.remove_bits(choices, first, last)
+        for first, last in added:
+            overrides = self.insert_bits(overrides, first, last)
+            choices = self.insert_bits(choices, first, last)
+        default = int.from_bytes(table.tracked_mask, "little")
+        tracked = bytearray((default & ~overrides | choices).to_bytes(
+            len(table.tracked_mask), "little"))
+
+        for first, last in reversed(removed):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self.__count -= last - first + 1
+            self.endRemoveRows()
+        self.__table, self.__tracked = table, tracked
+        for first, last in added:
+            self.beginInsertRows(QModelIndex(), first, last)
+            self.__count += last - first + 1
+            self.endInsertRows()
+        for first, last in self.ranges(delta.changed):
+            self.dataChanged.emit(
+                self.index(first, self.COMMITTED),
+                self.index(last, self.PATH)
+            )
+
+    @staticmethod
+    def remove_bits(mask: int, first: int, last: int) -> int:
+        """
+        :return: mask without bits first..last, higher bits shifted down
+        """
+        return mask & ((1 << first) - 1) | mask >> (last + 1) << first
+
+    @staticmethod
+    def insert_bits(mask: int, first: int, last: int) -> int:
+        """
+        :return: mask with zero bits first..last, higher bits shifted up
+        """
+        return mask & ((1 << first) - 1) | mask >> first << (last + 1)
+
+    @staticmethod
+    def ranges(rows: List[int]) -> Iterator[Tuple[int, int]]:
+        """
+        :param rows: ascending row numbers
+        :return: first and last rows of contiguous runs
+        """
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i] != rows[i - 1] + 1:
+                yield rows[start], rows[i - 1]
+                start = i
+
+    def clear(self):
+        self.populate(FileTable())
+
+    @property
+    def table(self) -> FileTable:
+        """
+        :return: shown snapshot without choices of the user
+        """
+        return self.__table
+
+    def is_tracked(self, row: int) -> bool:
+        """
+        :return: user chose to commit file of row
+        """
+        return test_bit(self.__tracked, row)
+
+    def set_tracked(self, rows: Iterable[int], tracked: bool):
+        """
+        change commit choice of many files with one notification
+        :param rows: rows of files
+        :param tracked: commit files or not
+        :return: None
+        """
+        first, last = len(self.__table), -1
+        for row in rows:
+            if tracked:
+                self.__tracked[row >> 3] |= 1 << (row & 7)
+            else:
+                self.__tracked[row >> 3] &= ~(1 << (row & 7)) & 0xff
+            first, last = min(first, row), max(last, row)
+        if first <= last:
+            self.dataChanged.emit(self.index(first, self.COMMITTED),
+                                  self.index(last, self.COMMITTED),
+                                  [Qt.CheckStateRole])
+
+    def choose(self, rows: int, tracked: bool):
+        """
+        change commit choice of rows of mask with one notification
+        :param rows: integer mask of rows, see model.selection
+        :param tracked: commit files or not
+        :return: None
+        """
+        choices = mask_value(self.__tracked)
+        self.set_choices(choices | rows if tracked else choices & ~rows)
+
+    def invert(self, rows: Optional[int] = None):
+        """
+        flip commit choice of rows of mask with one notification
+        :param rows: integer mask of rows, every row if None
+        :return: None
+        """
+        if rows is None:
+            rows = all_rows(self.__table)
+        self.set_choices(mask_value(self.__tracked) ^ rows)
+
+    def set_choices(self, choices: int):
+        """
+        replace commit choices, views get one notification spanning
+        rows from the first to the last changed one
+        :param choices: integer mask of rows to commit
+        :return: None
+        """
+        choices &= all_rows(self.__table)
+        changed = choices ^ mask_value(self.__tracked)
+        if not changed:
+            return
+        self.__tracked = value_mask(choices, self.__table)
+        first = (changed & -changed).bit_length() - 1
+        self.dataChanged.emit(self.index(first, self.COMMITTED),
+                              self.index(changed.bit_length() - 1,
+                                         self.COMMITTED),
+                              [Qt.CheckStateRole])
+
+    def files(self) -> FileTable:
+        """
+        :return: snapshot with current commit choice of the user
+        """
+        return self.__table.with_tracked(self.__tracked)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.__count
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.DisplayRole) -> Any:
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return QVariant()
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == self.COMMITTED:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        row, column = index.row(), index.column()
+        if row >= len(self.__table):
+            return QVariant()
+        if column == self.COMMITTED:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if test_bit(self.__tracked, row) \
+                    else Qt.Unchecked
+        elif role == Qt.DisplayRole:
+            if column == self.STATUS:
+                return self.__table.status(row).name
+            return self.__table.paths[row]
+        elif role == Qt.ToolTipRole and column == self.PATH:
+            return self.__table.paths[row]
+        return QVariant()
+
+    def setData(self, index: QModelIndex, value: Any,
+                role: int = Qt.EditRole) -> bool:
+        if index.column() != self.COMMITTED or role != Qt.CheckStateRole:
+            return False
+        row = index.row()
+        if value == Qt.Checked:
+            self.__tracked[row >> 3] |= 1 << (row & 7)
+        else:
+            self.__tracked[row >> 3] &= ~(1 << (row & 7)) & 0xff
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
@@ -0,0 +1,380 @@
+import sys
+from array import array
+from itertools import compress
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, \
+    Sequence, Tuple
+
+from model.status import FileStatus
+
+NO_STATUS = 0  # status code of side without changes
+EQUAL_RUN_STEP = 4096  # maximal number of paths compared by one slice
+
+
+def status_code(status: Optional[FileStatus]) -> int:
+    """
+    :param status: status or None
+    :return: code stored in status columns
+    """
+    return NO_STATUS if status is None else status.value
+
+
+def code_status(code: int) -> Optional[FileStatus]:
+    """
+    :param code: code from status columns
+    :return: status or None
+    """
+    return None if code == NO_STATUS else FileStatus(code)
+
+
+def bitmask(bits: Iterable[bool], size: int) -> bytes:
+    """
+    :param bits: one flag per row
+    :param size: number of rows
+    :return: flags packed into bytes, row i is bit i % 8 of byte i // 8
+    """
+    mask = bytearray((size + 7) >> 3)
+    for row, bit in enumerate(bits):
+        if bit:
+            mask[row >> 3] |= 1 << (row & 7)
+    return bytes(mask)
+
+
+def test_bit(mask: bytes, row: int) -> bool:
+    return bool(mask[row >> 3] & (1 << (row & 7)))
+
+
+BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1)
+                  for value in range(256))  # set bits of every byte value
+
+
+def mask_rows(mask: bytes) -> List[int]:
+    """
+    linear in mask size, so dense masks are cheap as well
+    :param mask: bitmask
+    :return: rows of set bits, ascending
+    """
+    rows = []
+    for position, value in enumerate(mask):
+        if value:
+            base = position << 3
+            rows.extend(base + bit for bit in BYTE_BITS[value])
+    return rows
+
+
+def equal_run(a: Sequence, b: Sequence, start_a: int, start_b: int,
+              limit: int) -> int:
+    """
+    Length of the longest equal run. Runs are compared by growing
+    slices, so comparison is done by C code, and interned paths of
+    consecutive snapshots are the same objects
+    :param a: sequence
+    :param b: sequence
+    :param start_a: start of the run in a
+    :param start_b: start of the run in b
+    :param limit: maximal length of the run
+    :return: length of equal run
+    """
+    run, step = 0, 8
+    while run < limit:
+        step = min(step, limit - run)
+        if a[start_a + run:start_a + run + step] \
+                != b[start_b + run:start_b + run + step]:
+            break
+        run += step
+        step = min(step * 2, EQUAL_RUN_STEP)
+    else:
+        return run
+    low, high = run, run + step - 1  # first difference is in this step
+    while low < high:
+        middle = (low + high + 1) >> 1
+        if a[start_a + low:start_a + middle] \
+                == b[start_b + low:start_b + middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class FileRow:
+    """
+    Lightweight view of one row of FileTable with attributes
+    of PQFileModel, rows are created on access and hold no data
+    """
+    __slots__ = ("table", "row")
+
+    def __init__(self, table: "FileTable", row: int):
+        self.table = table
+        self.row = row
+
+    @property
+    def path(self) -> str:
+        return self.table.paths[self.row]
+
+    @property
+    def status(self) -> FileStatus:
+        return self.table.status(self.row)
+
+    @property
+    def tracked(self) -> bool:
+        return self.table.is_tracked(self.row)
+
+    @property
+    def staged(self) -> Optional[FileStatus]:
+        return code_status(self.table.staged[self.row])
+
+    @property
+    def unstaged(self) -> Optional[FileStatus]:
+        return code_status(self.table.unstaged[self.row])
+
+    @property
+    def untracked(self) -> bool:
+        return self.table.is_untracked(self.row)
+
+    @property
+    def renamed(self) -> bool:
+        return self.table.staged[self.row] == FileStatus.renamed.value
+
+    @property
+    def orig_path(self) -> Optional[str]:
+        return self.table.orig_paths.get(self.row)
+
+    def __repr__(self):
+        return "<FileRow: status={}, tracked={}, path='{}'>".format(
+            self.status.name, self.tracked, self.path
+        )
+
+
+class FileTable:
+    """
+    Immutable columnar snapshot of repository status: interned paths,
+    staged and unstaged status codes in byte arrays, tracked and
+    untracked flags in bitmasks. Tables are shared between threads and
+    controllers as is, user choices make a new table sharing columns
+    """
+    __slots__ = ("paths", "staged", "unstaged", "untracked_mask",
+                 "tracked_mask", "orig_paths", "__rows")
+
+    def __init__(self, paths: Iterable[str] = (),
+                 staged: Optional[array] = None,
+                 unstaged: Optional[array] = None,
+                 untracked_mask: bytes = b"",
+                 tracked_mask: Optional[bytes] = None,
+                 orig_paths: Optional[Dict[int, str]] = None):
+        """
+        :param paths: relative paths of files
+        :param staged: codes of changes added to index
+        :param unstaged: codes of changes in working tree
+        :param untracked_mask: bitmask of files not known to git
+        :param tracked_mask: bitmask of files added to commit,
+        files with staged changes if None
+        :param orig_paths: paths files had before rename or copy by rows
+        """
+        self.paths = tuple(paths)
+        size = len(self.paths)
+        self.staged = staged if staged is not None else array("B", bytes(size))
+        self.unstaged = unstaged if unstaged is not None \
+            else array("B", bytes(size))
+        self.untracked_mask = untracked_mask or bytes((size + 7) >> 3)
+        self.tracked_mask = tracked_mask if tracked_mask is not None \
+            else bitmask(self.staged, size)
+        self.orig_paths = orig_paths or {}
+        self.__rows = None  # type: Optional[Dict[str, int]]
+
+    @classmethod
+    def from_entries(cls, entries: Iterable) -> "FileTable":
+        """
+        :param entries: objects with path, staged, unstaged, untracked
+        and orig_path attributes: status entries, PQFileModel, FileRow
+        :return: table of entries in the same order
+        """
+        builder = FileTableBuilder()
+        builder.extend(entries)
+        return builder.table()
+
+    def with_tracked(self, tracked_mask: bytes) -> "FileTable":
+        """
+        :param tracked_mask: bitmask of files user wants to commit
+        :return: table sharing all columns except tracked flags
+        """
+        if len(tracked_mask) != len(self.tracked_mask):
+            raise ValueError("mask does not match table size")
+        table = FileTable.__new__(FileTable)
+        table.paths = self.paths
+        table.staged = self.staged
+        table.unstaged = self.unstaged
+        table.untracked_mask = self.untracked_mask
+        table.tracked_mask = bytes(tracked_mask)
+        table.orig_paths = self.orig_paths
+        table.__rows = self.__rows
+        return table
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, row: int) -> FileRow:
+        if not -len(self.paths) <= row < len(self.paths):
+            raise IndexError("row out of range")
+        return FileRow(self, row % len(self.paths))
+
+    def __iter__(self) -> Iterator[FileRow]:
+        return (FileRow(self, row) for row in range(len(self.paths)))
+
+    def status(self, row: int) -> FileStatus:
+        """
+        :return: resulting status of the file: staged one if any
+        """
+        code = self.staged[row] or self.unstaged[row]
+        return FileStatus(code) if code else FileStatus.new
+
+    def is_tracked(self, row: int) -> bool:
+        return test_bit(self.tracked_mask, row)
+
+    def is_untracked(self, row: int) -> bool:
+        return test_bit(self.untracked_mask, row)
+
+    def row(self, path: str) -> Optional[int]:
+        """
+        :param path: relative path of file
+        :return: row of file or None if it is not in table
+        """
+        if self.__rows is None:
+            self.__rows = {path: row for row, path in enumerate(self.paths)}
+        return self.__rows.get(path)
+
+    def key(self, row: int) -> Tuple[bool, bytes]:
+        """
+        :return: sort key of row: git lists tracked files first,
+        each part ordered by path bytes
+        """
+        return self.is_untracked(row), \
+            self.paths[row].encode("utf-8", "surrogateescape")
+
+    def diff(self, previous: "FileTable") -> "FileDelta":
+        """
+        Snapshots are ordered the same way, so they are merged: equal
+        runs of rows are skipped by galloping slice comparisons and rows
+        are compared one by one only where snapshots differ
+        :param previous: snapshot this one replaces
+        :return: changes turning previous snapshot into this one
+        """
+        old, new = previous.paths, self.paths
+        old_untracked = int.from_bytes(previous.untracked_mask, "little")
+        untracked = int.from_bytes(self.untracked_mask, "little")
+        removed, added, changed = [], [], []
+        old_row = row = 0
+        while old_row < len(old) and row < len(new):
+            if old[old_row] == new[row]:
+                run = equal_run(old, new, old_row, row,
+                                min(len(old) - old_row, len(new) - row))
+                changed += self.changed_rows(
+                    previous, old_row, row, run, old_untracked, untracked)
+                old_row += run
+                row += run
+            elif previous.key(old_row) < self.key(row):
+                removed.append(old_row)
+                old_row += 1
+            else:
+                added.append(row)
+                row += 1
+        removed.extend(range(old_row, len(old)))
+        added.extend(range(row, len(new)))
+        return FileDelta(previous, self, removed, added, changed)
+
+    def changed_rows(self, previous: "FileTable", old_start: int,
+                     start: int, count: int, old_untracked: int,
+                     untracked: int) -> List[int]:
+        """
+        :param previous: previous snapshot
+        :param old_start: first row of the run in previous snapshot
+        :param start: first row of the same paths in this snapshot
+        :param count: length of the run
+        :param old_untracked: untracked mask of previous snapshot as int
+        :param untracked: untracked mask of this snapshot as int
+        :return: rows of this snapshot with other status, ascending
+        """
+        rows = set()
+        for column, old_column in ((self.staged, previous.staged),
+                                   (self.unstaged, previous.unstaged)):
+            current = column[start:start + count]
+            before = old_column[old_start:old_start + count]
+            if current != before:
+                # nonzero bytes of xor are changed rows, both are
+                # found in linear time by C code
+                rows.update(compress(range(start, start + count), (
+                    int.from_bytes(current.tobytes(), "little")
+                    ^ int.from_bytes(before.tobytes(), "little")
+                ).to_bytes(count, "little")))
+        moved = (untracked >> start ^ old_untracked >> old_start) \
+            & ((1 << count) - 1)
+        if moved:
+            rows.update(start + row for row in mask_rows(
+                moved.to_bytes((count + 7) >> 3, "little")))
+        shift = start - old_start
+        for row in set(self.orig_paths).union(
+                old_row + shift for old_row in previous.orig_paths):
+            if start <= row < start + count and self.orig_paths.get(row) \
+                    != previous.orig_paths.get(row - shift):
+                rows.add(row)
+        return sorted(rows)
+
+    def __repr__(self):
+        return "<FileTable: {} files>".format(len(self.paths))
+
+
+class FileTableBuilder:
+    """
+    Collects entries into columns, so entries parsed from output of
+    a running process do not have to be kept until it finishes
+    """
+    def __init__(self):
+        self.__paths = []  # type: List[str]
+        self.__staged = array("B")
+        self.__unstaged = array("B")
+        self.__untracked = bytearray()
+        self.__orig_paths = {}  # type: Dict[int, str]
+
+    def __len__(self) -> int:
+        return len(self.__paths)
+
+    def extend(self, entries: Iterable):
+        """
+        :param entries: objects with path, staged, unstaged, untracked
+        and orig_path attributes
+        :return: None
+        """
+        paths, intern = self.__paths, sys.intern
+        untracked = self.__untracked
+        for entry in entries:
+            row = len(paths)
+            paths.append(intern(entry.path))
+            self.__staged.append(status_code(entry.staged))
+            self.__unstaged.append(status_code(entry.unstaged))
+            if row & 7 == 0:
+                untracked.append(0)
+            if entry.untracked:
+                untracked[row >> 3] |= 1 << (row & 7)
+            if entry.orig_path is not None:
+                self.__orig_paths[row] = entry.orig_path
+
+    def table(self) -> FileTable:
+        """
+        :return: snapshot of entries collected so far
+        """
+        return FileTable(self.__paths, array("B", self.__staged),
+                         array("B", self.__unstaged), bytes(self.__untracked),
+                         None, dict(self.__orig_paths))
+
+
+class FileDelta(NamedTuple):
+    """
+    Changes between two consecutive status snapshots
+    """
+    previous: FileTable  # snapshot changes are applied to
+    table: FileTable  # resulting snapshot
+    removed: List[int]  # rows of previous snapshot, ascending
+    added: List[int]  # rows of resulting snapshot, ascending
+    changed: List[int]  # rows of resulting snapshot with other status
+
+    @property
+    def empty(self) -> bool:
+        return not (self.removed or self.added or self.changed)
@@ -0,0 +1,262 @@
+from collections import Counter
+from typing import Any, List, Optional
+
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, Qt, QVariant
+
+from model.file_list import PQFileListModel
+from model.path_index import PathIndex
+
+
+class TreeNode:
+    """
+    Directory or file of the tree. Directory covers range of sorted
+    paths of PathIndex, its children are made on first access
+    """
+    __slots__ = ("parent", "name", "prefix", "start", "end", "row",
+                 "position", "children", "counts", "tracked")
+
+    def __init__(self, parent: Optional["TreeNode"], name: str, prefix: str,
+                 start: int, end: int, row: Optional[int] = None):
+        """
+        :param parent: parent directory, None for root
+        :param name: name shown, directories end with '/'
+        :param prefix: path of directory, path of file for files
+        :param start: first position of sorted paths under node
+        :param end: position after the last one
+        :param row: snapshot row of file, None for directories
+        """
+        self.parent = parent
+        self.name = name
+        self.prefix = prefix
+        self.start = start
+        self.end = end
+        self.row = row
+        self.position = 0  # row among children of parent
+        self.children = None  # type: Optional[List[TreeNode]]
+        self.counts = None  # type: Optional[Counter]
+        self.tracked = None  # type: Optional[int]
+
+
+class PQFileTreeModel(QAbstractItemModel):
+    """
+    Tree of files of PQFileListModel grouped by directory. Nodes are
+    made when their directory is expanded, directories show counts of
+    statuses under them and checking directory sets commit choice
+    of every file under it at once
+    """
+    NAME, STATUS = range(2)
+    headers = ("path", "status")
+
+    def __init__(self, source: PQFileListModel):
+        """
+        :param source: list model holding snapshot and commit choices
+        """
+        super().__init__()
+        self.__source = source
+        self.__filter = ""
+        self.__index = PathIndex(())
+        self.__root = TreeNode(None, "", "", 0, 0)
+        self.__source.dataChanged.connect(self.source_changed)
+
+    def rebuild(self):
+        """
+        build tree of current snapshot of source,
+        views lose expanded state
+        :return: None
+        """
+        self.beginResetModel()
+        paths = self.__source.table.paths
+        rows = None
+        if self.__filter:
+            rows = PathIndex(paths).search(self.__filter)
+        self.__index = PathIndex(paths, rows)
+        self.__root = TreeNode(None, "", "", 0, len(self.__index))
+        self.endResetModel()
+
+    def set_filter(self, text: str):
+        """
+        show only files which paths contain text
+        :param text: part of path, empty for all files
+        :return: None
+        """
+        self.__filter = text
+        self.rebuild()
+
+    @property
+    def size(self) -> int:
+        """
+        :return: number of files in tree
+        """
+        return len(self.__index)
+
+    def children(self, node: TreeNode) -> List[TreeNode]:
+        """
+        :param node: directory
+        :return: subdirectories and files of directory, made on demand
+        """
+        if node.children is not None:
+            return node.children
+        keys, children = self.__index.keys, []
+        position = node.start
+        while position < node.end:
+            rest = keys[position][len(node.prefix):]
+            slash = rest.find("/")
+            if 0 <= slash < len(rest) - 1:
+                prefix = node.prefix + rest[:slash + 1]
+                start, end = self.__index.prefix_range(
+                    prefix, position, node.end)
+                child = TreeNode(node, rest[:slash + 1], prefix, start, end)
+            else:  # file or untracked directory reported as one entry
+                start, end = position, position + 1
+                child = TreeNode(node, rest, keys[position], start, end,
+                                 self.__index.order[position])
+            child.position = len(children)
+            children.append(child)
+            position = end
+        node.children = children
+        return children
+
+    def rows(self, node: TreeNode) -> List[int]:
+        """
+        :return: snapshot rows of files under node
+        """
+        return self.__index.order[node.start:node.end].tolist()
+
+    def counts(self, node: TreeNode) -> Counter:
+        """
+        :return: number of files under node by status
+        """
+        if node.counts is None:
+            table = self.__source.table
+            node.counts = Counter(table.status(row) for row in self.rows(node))
+        return node.counts
+
+    def tracked(self, node: TreeNode) -> int:
+        """
+        :return: number of files under node user chose to commit
+        """
+        if node.tracked is None:
+            is_tracked = self.__source.is_tracked
+            node.tracked = sum(1 for row in self.rows(node) if is_tracked(row))
+        return node.tracked
+
+    def node(self, index: QModelIndex) -> TreeNode:
+        return index.internalPointer() if index.isValid() else self.__root
+
+    def find(self, prefix: str) -> QModelIndex:
+        """
+        :param prefix: path of directory, like 'a/b/'
+        :return: index of directory or invalid index if it is not in tree
+        """
+        node, index = self.__root, QModelIndex()
+        while node.prefix != prefix:
+            node = next((child for child in self.children(node)
+                         if child.row is None
+                         and prefix.startswith(child.prefix)), None)
+            if node is None:
+                return QModelIndex()
+            index = self.createIndex(node.position, self.NAME, node)
+        return index
+
+    def expanded_nodes(self) -> List[TreeNode]:
+        """
+        :return: directories which children are made
+        """
+        nodes, pending = [], [self.__root]
+        while pending:
+            node = pending.pop()
+            if node.children is not None:
+                nodes.append(node)
+                pending += node.children
+        return nodes
+
+    def source_changed(self, first: QModelIndex, last: QModelIndex,
+                       roles: List[int] = ()):
+        """
+        commit choices changed: counts of checked files are recounted
+        for shown directories only
+        """
+        if roles and Qt.CheckStateRole not in roles:
+            return
+        for node in self.expanded_nodes():
+            node.tracked = None
+            for child in node.children:
+                child.tracked = None
+            if node.children:
+                parent = QModelIndex() if node is self.__root \
+                    else self.createIndex(node.position, self.NAME, node)
+                self.dataChanged.emit(
+                    self.index(0, self.NAME, parent),
+                    self.index(len(node.children) - 1, self.NAME, parent),
+                    [Qt.CheckStateRole])
+
+    def index(self, row: int, column: int,
+              parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        children = self.children(self.node(parent))
+        if not 0 <= row < len(children):
+            return QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.__root:
+            return QModelIndex()
+        return self.createIndex(parent.position, self.NAME, parent)
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        node = self.node(parent)
+        return node.row is None and node.start < node.end
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.column() > 0:
+            return 0
+        node = self.node(parent)
+        return 0 if node.row is not None else len(self.children(node))
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(self.headers)
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.DisplayRole) -> Any:
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return QVariant()
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == self.NAME:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return QVariant()
+        node, column = index.internalPointer(), index.column()
+        if role == Qt.ToolTipRole:
+            return node.prefix
+        if column == self.NAME:
+            if role == Qt.DisplayRole:
+                return node.name
+            if role == Qt.CheckStateRole:
+                tracked = self.tracked(node)
+                if tracked == 0:
+                    return Qt.Unchecked
+                return Qt.Checked if tracked == node.end - node.start \
+                    else Qt.PartiallyChecked
+        elif role == Qt.DisplayRole:
+            if node.row is not None:
+                return self.__source.table.status(node.row).name
+            return ", ".join("{} {}".format(count, status.name)
+                             for status, count
+                             in self.counts(node).most_common())
+        return QVariant()
+
+    def setData(self, index: QModelIndex, value: Any,
+                role: int = Qt.EditRole) -> bool:
+        if index.column() != self.NAME or role != Qt.CheckStateRole:
+            return False
+        self.__source.set_tracked(self.rows(index.internalPointer()),
+                                  value == Qt.Checked)
+        return True
@@ -0,0 +1,62 @@
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+PREFIX_END = "\U0010ffff"  # sorts after any path character
+
+
+class PathIndex:
+    """
+    Sorted index of snapshot paths for directory grouping:
+    paths under directory are a contiguous range found by bisection,
+    substring search runs over all paths joined in one string
+    """
+    def __init__(self, paths: Sequence[str],
+                 rows: Optional[Iterable[int]] = None):
+        """
+        :param paths: paths of snapshot rows
+        :param rows: rows to index, all rows if None
+        """
+        rows = range(len(paths)) if rows is None else rows
+        self.order = array("I", sorted(rows, key=paths.__getitem__))
+        self.keys = [paths[row] for row in self.order]
+        self.__text = None  # type: Optional[str]
+        self.__offsets = None  # type: Optional[array]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def prefix_range(self, prefix: str, start: int = 0,
+                     end: Optional[int] = None) -> Tuple[int, int]:
+        """
+        :param prefix: beginning of paths, like 'a/b/'
+        :param start: first position of range to search in
+        :param end: position after range to search in, len if None
+        :return: positions of sorted paths with prefix, start and end
+        """
+        end = len(self.keys) if end is None else end
+        return bisect_left(self.keys, prefix, start, end), \
+            bisect_left(self.keys, prefix + PREFIX_END, start, end)
+
+    def search(self, text: str) -> List[int]:
+        """
+        :param text: part of path, case sensitive
+        :return: rows of paths containing text, in path order
+        """
+        if not text:
+            return self.order.tolist()
+        if self.__text is None:  # paths can't contain NUL
+            self.__text = "\0".join(self.keys)
+            self.__offsets = array("Q", accumulate(
+                (len(key) + 1 for key in self.keys[:-1]), initial=0))
+        joined, offsets = self.__text, self.__offsets
+        found = []
+        position = joined.find(text)
+        while position != -1:
+            index = bisect_left(offsets, position + 1) - 1
+            found.append(self.order[index])
+            # continue after the path, so it is listed once
+            position = joined.find(
+                text, offsets[index] + len(self.keys[index]) + 1)
+        return found
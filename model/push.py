@@ -0,0 +1,18 @@
+from enum import Enum
+from typing import NamedTuple
+
+
+PushState = Enum(
+    'PushState',
+    'idle pushing waiting pushed failed'  # waiting: retry is scheduled
+)
+
+
+class PushProgress(NamedTuple):
+    """
+    One progress line 'git push --progress' reports to stderr
+    """
+    stage: str  # like 'Writing objects'
+    percent: int
+    done: int
+    total: int
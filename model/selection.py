@@ -0,0 +1,61 @@
+"""
+Row masks for bulk commit choices over FileTable: masks are integers,
+bit i is row i like in FileTable bitmasks, so choices of all rows
+are changed by a few big integer operations instead of a loop
+"""
+import re
+from fnmatch import translate
+
+from model.file_table import FileTable, bitmask
+from model.status import FileStatus
+
+
+def all_rows(table: FileTable) -> int:
+    """
+    :return: mask of every row of table
+    """
+    return (1 << len(table)) - 1
+
+
+def mask_value(mask: bytes) -> int:
+    """
+    :param mask: FileTable bitmask
+    :return: mask as integer
+    """
+    return int.from_bytes(mask, "little")
+
+
+def value_mask(value: int, table: FileTable) -> bytearray:
+    """
+    :param value: integer mask of rows of table
+    :return: FileTable bitmask
+    """
+    return bytearray(value.to_bytes(len(table.tracked_mask), "little"))
+
+
+def pattern_rows(table: FileTable, pattern: str, regex: bool = False) -> int:
+    """
+    :param table: status snapshot
+    :param pattern: glob matched against whole path ('*' matches '/'
+    as well, so '*.py' finds files in every directory)
+    or regular expression searched in path
+    :param regex: pattern is regular expression
+    :return: mask of rows which paths match,
+    raises re.error for wrong regular expression
+    """
+    match = re.compile(pattern).search if regex \
+        else re.compile(translate(pattern)).match
+    return mask_value(bitmask(map(match, table.paths), len(table)))
+
+
+def status_rows(table: FileTable, status: FileStatus) -> int:
+    """
+    :param table: status snapshot
+    :param status: resulting status of files, like FileTable.status()
+    :return: mask of rows of files with status
+    """
+    new, code = FileStatus.new.value, status.value
+    return mask_value(bitmask(
+        ((staged or unstaged or new) == code
+         for staged, unstaged in zip(table.staged, table.unstaged)),
+        len(table)))
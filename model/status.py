@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+FileStatus = Enum(
+    'FileCondition',
+    'new modified renamed deleted copied typechanged unmerged'
+)
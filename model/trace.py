@@ -0,0 +1,80 @@
+from typing import Any, List
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QVariant
+
+from config import TRACE_HISTORY
+from git.trace import CommandTrace, TraceHistory
+
+
+class PQTraceModel(QAbstractTableModel):
+    """
+    Table model of recent command traces, newest first,
+    durations are in milliseconds, 'ahead' is number of commands
+    waiting in queue when the command was submitted
+    """
+    COMMAND, TOTAL, AHEAD = range(3)
+    phases = ("queue", "spawn", "git", "parse", "populate")
+    headers = ("command", "total", "ahead") + phases + ("output KB",)
+
+    def __init__(self, size: int = TRACE_HISTORY):
+        """
+        :param size: number of traces kept
+        """
+        super().__init__()
+        self.history = TraceHistory(size)  # oldest first
+
+    def append(self, trace: CommandTrace):
+        """
+        show trace in the first row, the oldest one is dropped
+        :param trace: finished trace
+        :return: None
+        """
+        traces = self.history.traces
+        if len(traces) == traces.maxlen:
+            last = len(traces) - 1
+            self.beginRemoveRows(QModelIndex(), last, last)
+            traces.popleft()
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.history.record(trace)
+        self.endInsertRows()
+
+    def traces(self) -> List[CommandTrace]:
+        """
+        :return: kept traces, oldest first
+        """
+        return list(self.history.traces)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.history.traces)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.DisplayRole) -> Any:
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return QVariant()
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        row, column = index.row(), index.column()
+        traces = self.history.traces
+        if row >= len(traces):
+            return QVariant()
+        trace = traces[len(traces) - 1 - row]  # newest first
+        if role == Qt.ToolTipRole and column == self.COMMAND:
+            return trace.text
+        if role == Qt.TextAlignmentRole and column != self.COMMAND:
+            return Qt.AlignRight | Qt.AlignVCenter
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if column == self.COMMAND:
+            return trace.text
+        if column == self.TOTAL:
+            return "{:.1f}".format(trace.total * 1000)
+        if column == self.AHEAD:
+            return str(trace.queue_depth)
+        if column == len(self.headers) - 1:
+            return "{:.1f}".format(trace.output_size / 1024)
+        return "{:.1f}".format(trace.duration(self.phases[column - 3]) * 1000)
@@ -0,0 +1,111 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QVariant
+
+from git.workspace import RepositorySummary
+
+
+class PQWorkspaceModel(QAbstractTableModel):
+    """
+    Table model of repositories of workspace, rows are shown as soon
+    as repositories are discovered and filled in as their status arrives
+    """
+    REPOSITORY, BRANCH, CHANGES, AHEAD, BEHIND = range(5)
+    headers = ("repository", "branch", "changes", "ahead", "behind")
+
+    def __init__(self):
+        super().__init__()
+        self.__root = ""
+        self.__paths = []  # type: List[str]
+        self.__summaries = []  # type: List[Optional[RepositorySummary]]
+        self.__rows = {}  # type: Dict[str, int]
+
+    def populate(self, root: str, paths: List[str]):
+        """
+        replace all rows with repositories which are not scanned yet
+        :param root: workspace directory, paths are shown relative to it
+        :param paths: paths of repositories
+        :return: None
+        """
+        self.beginResetModel()
+        self.__root = root
+        self.__paths = list(paths)
+        self.__summaries = [None] * len(paths)
+        self.__rows = {path: row for row, path in enumerate(paths)}
+        self.endResetModel()
+
+    def update(self, summary: RepositorySummary):
+        """
+        fill in row of scanned repository
+        :param summary: status of repository
+        :return: None
+        """
+        row = self.__rows.get(summary.path)
+        if row is None:
+            return
+        self.__summaries[row] = summary
+        self.dataChanged.emit(self.index(row, self.BRANCH),
+                              self.index(row, self.BEHIND))
+
+    def clear(self):
+        self.populate("", [])
+
+    def path(self, row: int) -> str:
+        """
+        :return: path to working tree shown in row
+        """
+        return self.__paths[row]
+
+    @property
+    def scanned(self) -> int:
+        """
+        :return: number of repositories with status
+        """
+        return len(self.__summaries) - self.__summaries.count(None)
+
+    @property
+    def dirty(self) -> int:
+        """
+        :return: number of repositories with changed files
+        """
+        return sum(1 for summary in self.__summaries
+                   if summary is not None and summary.dirty)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.__paths)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.DisplayRole) -> Any:
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return QVariant()
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        row, column = index.row(), index.column()
+        if row >= len(self.__paths):
+            return QVariant()
+        summary = self.__summaries[row]
+        if role == Qt.ToolTipRole:
+            if summary is not None and summary.error:
+                return summary.error
+            return self.__paths[row]
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if column == self.REPOSITORY:
+            return os.path.relpath(self.__paths[row], self.__root) \
+                if self.__root else self.__paths[row]
+        if summary is None:
+            return "..." if column == self.BRANCH else QVariant()
+        if summary.error:
+            return "error" if column == self.BRANCH else QVariant()
+        if column == self.BRANCH:
+            return summary.head or "(detached)"
+        if column == self.CHANGES:
+            return summary.files
+        if summary.upstream is None:
+            return QVariant()
+        return summary.ahead if column == self.AHEAD else summary.behind